@@ -21,6 +21,54 @@ function formatBaseUrl(base) {
   }
 }
 
+// POST + Server-Sent Events (EventSource cannot POST): the diagnosis arrives
+// first, then the assistant summary token by token.
+async function streamDiagnosis(body, { onDiagnosis, onSummary }) {
+  const res = await fetch(`${API_BASE}/support/diagnose/with-summary/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok || !res.body) {
+    const error = new Error(`Stream failed with status ${res.status}`);
+    error.status = res.status;
+    throw error;
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  let summary = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      const payload = data ? JSON.parse(data) : {};
+      if (event === "diagnosis") {
+        onDiagnosis(payload);
+      } else if (event === "token") {
+        summary += payload.text;
+        onSummary(summary);
+      } else if (event === "fallback") {
+        // Upstream stalled: the local summary replaces what we have so far
+        summary = "";
+        onSummary(summary);
+      } else if (event === "done") {
+        onSummary(payload.assistant_summary);
+      }
+    }
+  }
+}
+
 function Badge({ children, tone = "gray" }) {
   return <span className={`badge badge-${tone}`}>{children}</span>;
 }
@@ -113,12 +161,31 @@ export default function App() {
     setLoading(true);
     setErr("");
     setResult(null);
+    const body = {
+      error_code: errorCode.trim(),
+      message: message.trim(),
+      trace: trace || undefined,
+    };
+    let diagnosed = false;
     try {
-      const res = await client.post("/support/diagnose/with-summary", {
-        error_code: errorCode.trim(),
-        message: message.trim(),
-        trace: trace || undefined,
-      });
+      try {
+        await streamDiagnosis(body, {
+          onDiagnosis: (data) => {
+            diagnosed = true;
+            setResult(data);
+            setLoading(false);
+          },
+          onSummary: (summary) =>
+            setResult((prev) => (prev ? { ...prev, assistant_summary: summary } : prev)),
+        });
+        if (diagnosed) return;
+      } catch (streamError) {
+        // Mid-stream failure: keep the diagnosis already shown. Otherwise
+        // retry on the plain endpoint, which also reports 4xx details.
+        if (diagnosed) return;
+        console.warn(streamError);
+      }
+      const res = await client.post("/support/diagnose/with-summary", body);
       setResult(res.data);
     } catch (e) {
       console.error(e);
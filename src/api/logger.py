@@ -1,26 +1,148 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, RotatingFileHandler
 import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
 
 LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
 
 LOG_FILE = os.path.join(LOG_DIR, "api.log")
 
+# Records are written by a background thread, LOG_BATCH_SIZE at a time or
+# every LOG_FLUSH_SECONDS, so request threads never touch the file.
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+LOG_FLUSH_SECONDS = float(os.getenv("LOG_FLUSH_SECONDS", "0.5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
 logger = logging.getLogger("api_logger")
 logger.setLevel(logging.INFO)
+logger.propagate = False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp/level/message plus the record's `event` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat().replace("+00:00", "Z"),
+            "level": record.levelname,
+        }
+        event = getattr(record, "event", None)
+        if event:
+            out.update(event)
+        message = record.getMessage()
+        if message:
+            out["message"] = message
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that writes a whole batch under one lock and one flush."""
+
+    def emit_batch(self, records) -> None:
+        self.acquire()
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            for record in records:
+                try:
+                    if self.shouldRollover(record):
+                        self.doRollover()
+                    self.stream.write(self.format(record) + self.terminator)
+                except Exception:
+                    self.handleError(record)
+            self.stream.flush()
+        finally:
+            self.release()
+
+
+class _DropWhenFullQueueHandler(QueueHandler):
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Shedding log lines beats blocking a request on a stuck disk
+            self.dropped += 1
 
-handler = RotatingFileHandler(
-    LOG_FILE, maxBytes=3 * 1024 * 1024, backupCount=2
-)
 
-formatter = logging.Formatter(
-    "%(asctime)s — %(levelname)s — %(message)s"
+class BatchListener:
+    """Drains the log queue on its own thread and hands batches to the handler."""
+
+    def __init__(self, q: "queue.Queue", handler: BatchingRotatingFileHandler, batch_size: int, interval: float):
+        self.queue = q
+        self.handler = handler
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _drain(self, timeout: float):
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch) -> None:
+        try:
+            self.handler.emit_batch(batch)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._drain(self.interval)
+            if batch:
+                self._write(batch)
+        while True:
+            batch = self._drain(0)
+            if not batch:
+                return
+            self._write(batch)
+
+    def flush(self) -> None:
+        """Block until everything queued so far is on disk (shutdown, tests)."""
+        if self._thread.is_alive():
+            self.queue.join()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+handler = BatchingRotatingFileHandler(
+    LOG_FILE, maxBytes=3 * 1024 * 1024, backupCount=2, delay=True
 )
-handler.setFormatter(formatter)
+handler.setFormatter(JsonFormatter())
+
+_queue: "queue.Queue" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+listener = None
 
 if not logger.handlers:
-    logger.addHandler(handler)
+    logger.addHandler(_DropWhenFullQueueHandler(_queue))
+    listener = BatchListener(_queue, handler, LOG_BATCH_SIZE, LOG_FLUSH_SECONDS)
+    atexit.register(listener.stop)
+
+def log_event(message: str = "", **fields):
+    """Queue a structured log line; extra keyword fields become JSON keys."""
+    logger.info(message, extra={"event": fields})
 
-def log_event(message: str):
-    logger.info(message)
+def flush_logs():
+    if listener is not None:
+        listener.flush()
@@ -1,23 +1,64 @@
 # src/api/main.py
 from __future__ import annotations
 
+import asyncio
+import hmac
+import json
 import os
+import time
+import uuid
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from fastapi import FastAPI, Header, HTTPException, Request
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, List, Dict, Any, Literal
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 
 from src.core.classifier import RulesClassifier
+from src.core.extractor import SignalExtractor
+from src.rag.playbooks import PlaybookStore
 from src.rag.retriever import RAG
 from src.rag.responder import Responder
 
-from src.api.logger import log_event
+from src.api.logger import flush_logs, log_event
+from src.api.metrics import REQUEST_SECONDS, STAGE_SECONDS, registry
+from src.api.reload import SnapshotManager
+from src.api.response_cache import MESSAGE_SLOT, ResponseCache, signature
+from src.api.startup import bundle_sources, load_bundle
+from src.api.timing import StageTimer
 
 load_dotenv()
 
-app = FastAPI(title="Dev Support RAG API", version="0.1.0")
+
+async def _watch_sources(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await asyncio.to_thread(snapshots.reload)
+            if result["reloaded"]:
+                log_event("reload", event="reload", version=result["version"], changed=result["changed"])
+        except Exception as exc:
+            log_event(f"reload failed: {exc}", event="reload_failed", version=snapshots.current().version)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled async LLM client for the lifetime of the worker.
+    await responder.startup()
+    interval = float(os.getenv("RELOAD_WATCH_SECONDS", "0"))
+    watcher = asyncio.create_task(_watch_sources(interval)) if interval > 0 else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await watcher
+    await responder.aclose()
+    await asyncio.to_thread(flush_logs)
+
+
+app = FastAPI(title="Dev Support RAG API", version="0.1.0", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -27,6 +68,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# Fields copied from DiagnoseRequest.context into the log line (event_schema.json)
+_CONTEXT_LOG_FIELDS = ("account_id", "payment_method", "amount", "currency", "provider")
+# Per-stage durations in a Server-Timing response header (SERVER_TIMING=0 disables)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+
+@app.middleware("http")
+async def request_log(request: Request, call_next):
+    """
+    One structured JSON line per request (event_schema.json fields plus
+    per-stage timings), queued for the background log writer, and the same
+    timings observed into the /support/metrics histograms.
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    request.state.request_id = request_id
+    request.state.timer = StageTimer()
+    request.state.event = {}
+    status = 500
+    timer = request.state.timer
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        if SERVER_TIMING:
+            parts = [f"{name};dur={ms}" for name, ms in timer.as_dict().items()]
+            parts.append(f"total;dur={timer.elapsed_ms():.3f}")
+            response.headers["Server-Timing"] = ", ".join(parts)
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")  # route template keeps label cardinality bounded
+        REQUEST_SECONDS.observe(timer.elapsed_ms() / 1e3, path=path, status=str(status))
+        for name, ns in timer.stages.items():
+            STAGE_SECONDS.observe(ns / 1e9, stage=name)
+        log_event(
+            event="request",
+            attempt_id=request_id,
+            method=request.method,
+            path=request.url.path,
+            http_status=status,
+            latency_ms=round(timer.elapsed_ms(), 3),
+            timings_ms=timer.as_dict(),
+            **request.state.event,
+        )
+
+
+def _annotate(request: Request, req: DiagnoseRequest, category: str, severity: str, classification: dict) -> None:
+    context = req.context or {}
+    request.state.event.update(
+        raw_code=req.error_code,
+        raw_message=(req.message or "")[:500],
+        category=category,
+        severity=severity,
+        classification=classification,
+        **{k: context[k] for k in _CONTEXT_LOG_FIELDS if k in context},
+    )
+
 # ---------------------------
 # MODELS
 # ---------------------------
@@ -37,6 +136,21 @@ class DiagnoseRequest(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+class Classification(BaseModel):
+    category: str
+    confidence: float
+    source: Literal["rules", "ml", "manual"]
+
+
+class Guidance(BaseModel):
+    """Per-code fields from mappings.csv."""
+
+    user_message: Optional[str] = None
+    action_type: Optional[str] = None
+    can_autofix: bool = False
+    severity: Optional[str] = None
+
+
 class DiagnoseResponse(BaseModel):
     detected_error: str
     category: str
@@ -45,21 +159,163 @@ class DiagnoseResponse(BaseModel):
     suggested_steps: List[str]
     references: List[str]
     raw_notes: Optional[str] = None
+    classification: Optional[Classification] = None
+    guidance: Optional[Guidance] = None
     assistant_summary: Optional[str] = None
 
 
+class DiagnoseBatchRequest(BaseModel):
+    # Raw dicts: each item is validated on its own, so one bad item is a
+    # per-item error instead of a 422 for the whole batch.
+    items: List[Dict[str, Any]] = Field(..., max_length=1000)
+
+
+class DiagnoseBatchItem(BaseModel):
+    index: int
+    ok: bool
+    result: Optional[DiagnoseResponse] = None
+    error: Optional[str] = None
+
+
+class DiagnoseBatchResponse(BaseModel):
+    results: List[DiagnoseBatchItem]
+
+
 # ---------------------------
 # SINGLETON COMPONENTS
 # ---------------------------
 ROOT_DIR = Path(__file__).resolve().parents[2]
 RULES_PATH = ROOT_DIR / "config" / "rules.json"
 KNOWLEDGE_DIR = ROOT_DIR / "knowledge"
+VECTOR_DIR = ROOT_DIR / "src" / "rag" / "index"
+KB_INDEX_PATH = ROOT_DIR / "models" / "kb_index.faiss"
+MAPPINGS_PATH = ROOT_DIR / "src" / "mappings.csv"
+PLAYBOOKS_MD_PATH = ROOT_DIR / "agent_playbooks.md"
+PLAYBOOK_STORE_PATH = VECTOR_DIR / "playbooks.pkl"
+# Rules + playbooks + index metadata in one file (python -m src.api.startup)
+STARTUP_BUNDLE_PATH = VECTOR_DIR / "startup.pkl"
+# The compiled .npz export scores with NumPy alone (no sklearn/joblib at cold start)
+_ML_DEFAULT = ROOT_DIR / "models" / "tfidf_lr.npz"
+if not _ML_DEFAULT.exists():
+    _ML_DEFAULT = ROOT_DIR / "models" / "tfidf_lr.joblib"
+ML_MODEL_PATH = Path(os.getenv("ML_MODEL_PATH", str(_ML_DEFAULT)))
+# Serverless cold starts (LAZY_STARTUP=1, set by vercel_main): nothing heavy
+# is loaded up front; the index, NumPy and the ML model load on first use.
+LAZY_STARTUP = os.getenv("LAZY_STARTUP", "0") == "1"
+
+
+def _build_components():
+    """Fresh classifier + retriever from the files on disk (used by hot reload)."""
+    model_path = str(ML_MODEL_PATH) if os.getenv("ML_FALLBACK", "1") == "1" else None
+    lazy = LAZY_STARTUP or os.getenv("RAG_LAZY_INDEX", "0") == "1"
+    bundle = load_bundle(
+        STARTUP_BUNDLE_PATH,
+        bundle_sources(RULES_PATH, MAPPINGS_PATH, PLAYBOOKS_MD_PATH, KNOWLEDGE_DIR, VECTOR_DIR, KB_INDEX_PATH),
+    )
+    if bundle is not None:
+        # One read instead of rules.json + playbooks + index metadata
+        classifier = RulesClassifier(
+            model_path=model_path, rules=bundle["rules"], extractor=SignalExtractor(bundle["hints"])
+        )
+        playbooks = PlaybookStore(**bundle["playbooks"])
+        index_meta = bundle["index"]
+    else:
+        # Rule misses fall back to the TF-IDF + LR model (ML_FALLBACK=0 disables it)
+        classifier = RulesClassifier(
+            str(RULES_PATH), model_path=model_path, extractor=SignalExtractor.from_mappings(MAPPINGS_PATH)
+        )
+        # One compiled artifact (python -m src.rag.playbooks); rebuilt in memory if stale
+        playbooks = PlaybookStore.open(PLAYBOOK_STORE_PATH, MAPPINGS_PATH, PLAYBOOKS_MD_PATH, KNOWLEDGE_DIR)
+        index_meta = None
+    retriever = RAG(
+        index_dir=str(KNOWLEDGE_DIR),
+        vector_dir=str(VECTOR_DIR),
+        kb_index=str(KB_INDEX_PATH),
+        lazy=lazy,
+        playbooks=playbooks,
+        index_meta=index_meta,
+    )
+    if not lazy:
+        classifier.warm()
+    return classifier, retriever
+
+
+def _watched_sources():
+    yield RULES_PATH
+    yield from KNOWLEDGE_DIR.glob("*.txt")
+    yield MAPPINGS_PATH
+    yield PLAYBOOKS_MD_PATH
+    yield PLAYBOOK_STORE_PATH
+    yield STARTUP_BUNDLE_PATH
+    for name in ("meta.json", "rows.json", "chunks.json", "embeddings.npy", "bm25.npz"):
+        yield VECTOR_DIR / name
+    yield KB_INDEX_PATH
+    yield KB_INDEX_PATH.with_name("kb_meta.pkl")
+    yield KB_INDEX_PATH.with_suffix(".qvec")
+    yield ML_MODEL_PATH
+
+
+# Requests read one snapshot up front and use it throughout, so a reload
+# never mixes old rules with a new index mid-request.
+snapshots = SnapshotManager(
+    _build_components,
+    _watched_sources,
+    history=int(os.getenv("RELOAD_HISTORY", "10")),
+)
 
-classifier = RulesClassifier(str(RULES_PATH))
+responder = Responder()
 
-retriever = RAG(index_dir=str(KNOWLEDGE_DIR))
+# Pre-serialized /support/diagnose bodies keyed on the normalized request
+# signature; RESPONSE_CACHE_BYTES=0 disables it.
+response_cache = ResponseCache(
+    max_bytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "300")),
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "4096")),
+)
 
-responder = Responder()
+
+def _cache_samples():
+    """Counters the components already keep, read at scrape time."""
+    caches = [
+        ("summary", responder.summary_cache),
+        ("semantic_summary", responder.semantic_cache),
+        ("response", response_cache.entries),
+    ]
+    server = snapshots.current().classifier.model_server
+    if server is not None:
+        caches.append(("ml_prediction", server.cache))
+        yield ("support_ml_batches_total", "counter", "predict_proba calls made by the ML fallback.", {}, server.batches)
+    for name, cache in caches:
+        yield ("support_cache_hits_total", "counter", "Cache hits.", {"cache": name}, cache.hits)
+        yield ("support_cache_misses_total", "counter", "Cache misses.", {"cache": name}, cache.misses)
+        yield ("support_cache_entries", "gauge", "Entries currently cached.", {"cache": name}, len(cache))
+    yield ("support_response_cache_bytes", "gauge", "Bytes held by the response cache.", {}, response_cache.entries.nbytes)
+    yield ("support_response_cache_evictions_total", "counter", "Response cache LRU evictions.", {}, response_cache.entries.evictions)
+    yield (
+        "support_response_cache_invalidations_total", "counter",
+        "Response cache flushes caused by a snapshot reload.", {}, response_cache.invalidations,
+    )
+    yield (
+        "support_semantic_cache_evictions_total", "counter",
+        "Semantic summary cache LRU evictions.", {}, responder.semantic_cache.evictions,
+    )
+    flights = responder._flights
+    yield ("support_singleflight_total", "counter", "Summary calls by role.", {"role": "leader"}, flights.leaders)
+    yield ("support_singleflight_total", "counter", "Summary calls by role.", {"role": "coalesced"}, flights.coalesced)
+    for outcome, n in responder.llm_outcomes.items():
+        yield ("support_llm_calls_total", "counter", "Async LLM calls by outcome.", {"outcome": outcome}, n)
+    yield ("support_snapshot_version", "gauge", "Hot-reload snapshot version being served.", {}, snapshots.current().version)
+
+
+registry.register_collector(_cache_samples)
+
+
+def _require_admin(token: Optional[str]) -> None:
+    expected = os.getenv("ADMIN_TOKEN", "")
+    if not expected:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled (set ADMIN_TOKEN)")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=401, detail="invalid admin token")
 
 
 # ---------------------------
@@ -68,7 +324,7 @@ responder = Responder()
 @app.get("/support/categories")
 def list_categories():
     try:
-        return {"categories": list(retriever.playbook.keys())}
+        return {"categories": list(snapshots.current().retriever.playbook.keys())}
     except Exception:
         return {"categories": ["Payments", "Auth", "Networking", "Routing", "General"]}
 
@@ -81,7 +337,6 @@ def health():
 
 @app.get("/support/ping")
 def ping():
-    log_event("Ping received")
     return {
         "ok": True,
         "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
@@ -90,77 +345,263 @@ def ping():
     }
 
 
-@app.post("/support/diagnose", response_model=DiagnoseResponse)
-def diagnose(req: DiagnoseRequest):
-    log_event(f"/diagnose → {req.error_code}")
+@app.get("/support/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition: stage/request latency histograms and cache counters."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
+
+@app.post("/support/diagnose", response_model=DiagnoseResponse)
+def diagnose(req: DiagnoseRequest, request: Request):
+    timer = request.state.timer
     if not req.error_code.strip():
         raise HTTPException(status_code=400, detail="error_code is required")
 
-    category, severity, signals = classifier.classify(
-        error_code=req.error_code,
-        message=req.message or "",
-        trace=req.trace or "",
+    snap = snapshots.current()
+    key = None
+    if response_cache.enabled:
+        with timer.stage("cache"):
+            key = signature(req.error_code, req.message, req.trace)
+            cached = response_cache.get(key, snap.version)
+        request.state.event["response_cache"] = "miss" if cached is None else "hit"
+        if cached is not None:
+            _annotate(request, req, **cached.meta)
+            return Response(cached.render(req.message or ""), media_type="application/json")
+
+    with timer.stage("classify"):
+        category, severity, signals, classification = snap.classifier.classify_detailed(
+            error_code=req.error_code,
+            message=req.message or "",
+            trace=req.trace or "",
+        )
+    _annotate(request, req, category, severity, classification)
+
+    with timer.stage("retrieve"):
+        refs, steps, guidance = snap.retriever.retrieve_playbook(
+            error_code=req.error_code,
+            category=category,
+            message=req.message or "",
+        )
+
+    with timer.stage("respond"):
+        base = responder.generate(
+            error_code=req.error_code,
+            category=category,
+            severity=severity,
+            signals=signals,
+            steps=steps,
+            references=refs,
+            # Cached bodies carry a slot that each hit fills with its own message
+            message=MESSAGE_SLOT if key and req.message else req.message or "",
+            trace=req.trace or "",
+            context=req.context or {},
+            classification=classification,
+            guidance=guidance,
+        )
+        if key is None:
+            return base
+        # Validated and serialized once; hits return these bytes as they are
+        body = DiagnoseResponse.model_validate(base).model_dump_json().encode()
+        entry = response_cache.put(
+            key,
+            snap.version,
+            body,
+            {"category": category, "severity": severity, "classification": classification},
+        )
+
+    return Response(entry.render(req.message or ""), media_type="application/json")
+
+
+def _validation_error(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}" for err in exc.errors())
+
+
+@app.post("/support/diagnose/batch", response_model=DiagnoseBatchResponse)
+def diagnose_batch(req: DiagnoseBatchRequest, request: Request):
+    timer = request.state.timer
+
+    results: List[Optional[dict]] = [None] * len(req.items)
+    valid: List[int] = []
+    items: List[DiagnoseRequest] = []
+    for i, raw in enumerate(req.items):
+        try:
+            item = DiagnoseRequest.model_validate(raw)
+        except ValidationError as exc:
+            results[i] = {"index": i, "ok": False, "error": _validation_error(exc)}
+            continue
+        if not item.error_code.strip():
+            results[i] = {"index": i, "ok": False, "error": "error_code is required"}
+        else:
+            valid.append(i)
+            items.append(item)
+
+    snap = snapshots.current()
+    with timer.stage("classify"):
+        classified = snap.classifier.classify_many_detailed(
+            (it.error_code, it.message or "", it.trace or "") for it in items
+        )
+    with timer.stage("retrieve"):
+        playbooks = snap.retriever.retrieve_many(
+            (it.error_code, category, it.message or "")
+            for it, (category, _, _, _) in zip(items, classified)
+        )
+
+    with timer.stage("respond"):
+        for i, it, (category, severity, signals, classification), (refs, steps, guidance) in zip(
+            valid, items, classified, playbooks
+        ):
+            try:
+                result = responder.build_payload(
+                    error_code=it.error_code,
+                    category=category,
+                    severity=severity,
+                    signals=signals,
+                    steps=steps,
+                    references=refs,
+                    message=it.message or "",
+                    classification=classification,
+                    guidance=guidance,
+                )
+                results[i] = {"index": i, "ok": True, "result": result}
+            except Exception as exc:
+                results[i] = {"index": i, "ok": False, "error": str(exc)}
+
+    sources: Dict[str, int] = {}
+    for _, _, _, classification in classified:
+        sources[classification["source"]] = sources.get(classification["source"], 0) + 1
+    request.state.event.update(
+        items=len(req.items),
+        errors=sum(not r["ok"] for r in results),
+        classification_sources=sources,
     )
+    return {"results": results}
 
-    refs, steps = retriever.retrieve_playbook(
-        error_code=req.error_code,
-        category=category,
-        message=req.message or "",
-    )
 
-    base = responder.generate(
+def _diagnose_for_summary(req: DiagnoseRequest, request: Request):
+    """Diagnosis payload plus the (query, snippets) the summary stage is fed."""
+    timer = request.state.timer
+    if not req.error_code.strip():
+        raise HTTPException(status_code=400, detail="error_code is required")
+
+    snap = snapshots.current()
+    with timer.stage("classify"):
+        category, severity, signals, classification = snap.classifier.classify_detailed(
+            error_code=req.error_code,
+            message=req.message or "",
+            trace=req.trace or "",
+        )
+    _annotate(request, req, category, severity, classification)
+
+    with timer.stage("retrieve"):
+        refs, steps, guidance = snap.retriever.retrieve_playbook(
+            error_code=req.error_code,
+            category=category,
+            message=req.message or "",
+        )
+
+    with timer.stage("respond"):
+        base = responder.generate(
+            error_code=req.error_code,
+            category=category,
+            severity=severity,
+            signals=signals,
+            steps=steps,
+            references=refs,
+            message=req.message or "",
+            trace=req.trace or "",
+            context=req.context or {},
+            classification=classification,
+            guidance=guidance,
+        )
+
+    query, snippets = responder.compose(
         error_code=req.error_code,
         category=category,
         severity=severity,
-        signals=signals,
+        message=req.message or "",
         steps=steps,
         references=refs,
-        message=req.message or "",
-        trace=req.trace or "",
-        context=req.context or {},
     )
-
-    return base
+    return base, query, snippets
 
 
 @app.post("/support/diagnose/with-summary", response_model=DiagnoseResponse)
-def diagnose_with_summary(req: DiagnoseRequest):
-    log_event(f"/diagnose/with-summary → {req.error_code}")
+async def diagnose_with_summary(req: DiagnoseRequest, request: Request):
+    # Classify/retrieve block (ML batcher, index search, first index load):
+    # keep them off the event loop the LLM calls and SSE streams share.
+    base, query, snippets = await asyncio.to_thread(_diagnose_for_summary, req, request)
+    with request.state.timer.stage("summarize"):
+        summary = await responder.asummarize(
+            query,
+            snippets,
+            category=base["category"],
+            severity=base["severity"],
+            error_code=req.error_code,
+        )
 
-    if not req.error_code.strip():
-        raise HTTPException(status_code=400, detail="error_code is required")
-
-    category, severity, signals = classifier.classify(
-        error_code=req.error_code,
-        message=req.message or "",
-        trace=req.trace or "",
-    )
+    base["assistant_summary"] = summary
+    return base
 
-    refs, steps = retriever.retrieve_playbook(
-        error_code=req.error_code,
-        category=category,
-        message=req.message or "",
-    )
 
-    base = responder.generate(
-        error_code=req.error_code,
-        category=category,
-        severity=severity,
-        signals=signals,
-        steps=steps,
-        references=refs,
-        message=req.message or "",
-        trace=req.trace or "",
-        context=req.context or {},
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+@app.post("/support/diagnose/with-summary/stream")
+async def diagnose_with_summary_stream(req: DiagnoseRequest, request: Request):
+    """
+    Server-Sent Events: `diagnosis` (the DiagnoseResponse without a summary)
+    as soon as it is ready, then `token` events as the summary is generated,
+    then `done` with the full summary. A `fallback` event means the LLM
+    stalled or failed: discard the tokens so far, the local summary follows.
+    """
+    base, query, snippets = await asyncio.to_thread(_diagnose_for_summary, req, request)
+    diagnosis = DiagnoseResponse.model_validate(base).model_dump(mode="json")
+    request_id = request.state.request_id
+
+    async def events():
+        yield _sse("diagnosis", diagnosis)
+        start = time.perf_counter_ns()
+        parts: List[str] = []
+        fallback = None
+        async for kind, text in responder.astream_summary(
+            query, snippets, category=base["category"], severity=base["severity"], error_code=req.error_code
+        ):
+            if kind == "fallback":
+                fallback, parts = text, []
+                yield _sse("fallback", {"reason": text})
+            else:
+                parts.append(text)
+                yield _sse("token", {"text": text})
+        summary = "".join(parts).strip()
+        yield _sse("done", {"assistant_summary": summary, "fallback": fallback})
+        # The request line was logged when the headers went out; the
+        # summarize stage is only known now.
+        elapsed = time.perf_counter_ns() - start
+        STAGE_SECONDS.observe(elapsed / 1e9, stage="summarize")
+        log_event(event="stream", attempt_id=request_id, summarize_ms=round(elapsed / 1e6, 3), fallback=fallback)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    query = f"[{category}/{severity}] {req.error_code}: {req.message or 'No message'}"
-    snippets = [
-        "Steps:\n- " + "\n- ".join(steps),
-        "References:\n- " + "\n- ".join(refs),
-    ]
-    summary = responder.generate_response(query, snippets)
 
-    base["assistant_summary"] = summary
-    return base
+@app.post("/support/admin/reload")
+async def admin_reload(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Rebuild rules/knowledge/index/model off the request path and swap them in."""
+    _require_admin(x_admin_token)
+    try:
+        result = await asyncio.to_thread(snapshots.reload, force)
+    except Exception as exc:
+        log_event(f"reload failed: {exc}", event="reload_failed", version=snapshots.current().version)
+        raise HTTPException(status_code=500, detail=f"reload failed: {exc}")
+    log_event("reload", event="reload", version=result["version"], changed=result["changed"], forced=force)
+    return result
+
+
+@app.get("/support/admin/versions")
+def admin_versions(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    return {"current": snapshots.current().version, "history": snapshots.versions()}
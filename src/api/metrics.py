@@ -0,0 +1,149 @@
+# src/api/metrics.py
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers sub-millisecond rule hits up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_STRIPES = 16
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    """
+    Exposition-format number: integers in full (a counter past 1e6 must keep
+    increasing smoothly), other floats round-tripped through repr.
+    """
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _stripe() -> int:
+    # Threads mostly land on different stripes, so observers rarely contend
+    return threading.get_ident() % _STRIPES
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, striped: each stripe has its own lock and
+    counts, and collect() sums the stripes. One observe() is a bisect plus
+    two adds under an (almost always uncontended) lock.
+    """
+
+    def __init__(self, name: str, description: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._locks = [threading.Lock() for _ in range(_STRIPES)]
+        # stripe -> label key -> [bucket counts..., +Inf count, sum]
+        self._data: List[Dict[LabelKey, List[float]]] = [{} for _ in range(_STRIPES)]
+
+    def observe(self, value: float, **labels: str) -> None:
+        i = _stripe()
+        key = _labels(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._locks[i]:
+            row = self._data[i].get(key)
+            if row is None:
+                row = self._data[i][key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[slot] += 1
+            row[-1] += value
+
+    def collect(self) -> Dict[LabelKey, List[float]]:
+        out: Dict[LabelKey, List[float]] = {}
+        for lock, data in zip(self._locks, self._data):
+            with lock:
+                for key, row in data.items():
+                    acc = out.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+                    for j, v in enumerate(row):
+                        acc[j] += v
+        return out
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, row in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', repr(bound)))} {cumulative}")
+            cumulative += row[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(row[-1])}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics owned here plus "collectors": callbacks that read counters other
+    components already keep (cache hits/misses, singleflight, ...) at scrape
+    time, so the hot paths pay nothing extra for them.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+    def histogram(self, name: str, description: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, description, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]) -> None:
+        """fn() yields (name, type, description, labels, value) samples."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        # Group samples by name: a metric family must be contiguous
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for fn in self._collectors:
+            try:
+                samples = list(fn())
+            except Exception:
+                continue
+            for name, kind, description, labels, value in samples:
+                family = families.setdefault(name, (kind, description, []))
+                family[2].append(f"{name}{_fmt_labels(_labels(labels))} {_fmt_value(value)}")
+        for name, (kind, description, samples) in families.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "support_request_duration_seconds", "End-to-end request latency by path and status."
+)
+STAGE_SECONDS = registry.histogram(
+    "support_stage_duration_seconds", "Latency of one pipeline stage (classify, retrieve, respond, summarize)."
+)
@@ -0,0 +1,125 @@
+# src/api/reload.py
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def _file_sha(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Everything a request reads from config/knowledge/models, built together."""
+
+    version: int
+    classifier: Any
+    retriever: Any
+    built_at: str
+    build_seconds: float
+
+
+class SnapshotManager:
+    """
+    Copy-on-write holder for the classifier/retriever pair.
+
+    build() constructs a complete new pair off the request path; the only
+    shared mutation is rebinding self._current, so a request that grabbed
+    current() keeps a consistent snapshot until it finishes, however many
+    reloads happen meanwhile. Source files are fingerprinted by mtime/size,
+    then sha256, so touching a file without changing it does not rebuild.
+    The initial snapshot records mtime/size only (hashing every index and
+    model file would put their size on the cold start); a file's sha is
+    computed the first time its mtime/size change.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], Tuple[Any, Any]],
+        sources: Callable[[], Iterable[Path]],
+        history: int = 10,
+    ):
+        self._build = build
+        self._sources = sources
+        self._lock = threading.Lock()  # one builder at a time
+        self.history: deque = deque(maxlen=history)
+        self._current: Optional[Snapshot] = None
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self.reload(force=True)
+
+    def current(self) -> Snapshot:
+        return self._current
+
+    def _fingerprint(self, previous: Dict[str, Dict[str, Any]], content: bool = True) -> Dict[str, Dict[str, Any]]:
+        files = {}
+        for path in sorted({Path(p) for p in self._sources()}):
+            if not path.is_file():
+                continue
+            st = path.stat()
+            prev = previous.get(str(path))
+            if prev and prev["mtime_ns"] == st.st_mtime_ns and prev["size"] == st.st_size:
+                files[str(path)] = prev
+                continue
+            sha = _file_sha(path) if content else None
+            files[str(path)] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha": sha}
+        return files
+
+    @staticmethod
+    def _differs(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> bool:
+        if old is None or new is None:
+            return old is not new
+        if old["sha"] and new["sha"]:
+            return old["sha"] != new["sha"]
+        # No content hash on one side yet (initial snapshot): go by stat
+        return (old["mtime_ns"], old["size"]) != (new["mtime_ns"], new["size"])
+
+    @classmethod
+    def _changed(cls, old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> List[str]:
+        return sorted(p for p in set(old) | set(new) if cls._differs(old.get(p), new.get(p)))
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Rebuild and swap in a new snapshot if any source changed (or force).
+        A failed build leaves the current snapshot serving and re-raises.
+        """
+        with self._lock:
+            old = self._current
+            files = self._fingerprint(self._files, content=old is not None)
+            changed = self._changed(self._files, files)
+            if old is not None and not changed and not force:
+                # Remember new mtimes of touched-but-identical files
+                self._files = files
+                return {"reloaded": False, "version": old.version, "changed": []}
+
+            start = time.perf_counter()
+            classifier, retriever = self._build()
+            snapshot = Snapshot(
+                version=(old.version + 1) if old else 1,
+                classifier=classifier,
+                retriever=retriever,
+                built_at=datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+                build_seconds=round(time.perf_counter() - start, 4),
+            )
+            self._current = snapshot  # atomic rebind: the copy-on-write swap
+            self._files = files
+            self.history.append({
+                "version": snapshot.version,
+                "built_at": snapshot.built_at,
+                "build_seconds": snapshot.build_seconds,
+                "changed": changed,
+            })
+            return {"reloaded": True, "version": snapshot.version, "changed": changed}
+
+    def versions(self) -> List[Dict[str, Any]]:
+        return list(self.history)
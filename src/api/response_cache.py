@@ -0,0 +1,88 @@
+# src/api/response_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.cache import ByteLRUCache
+from src.core.normalize import normalize
+
+# Stand-in for the request's message while a response is serialized; the
+# cached bytes are split around it and each hit splices its own message in.
+MESSAGE_SLOT = "\x00message\x00"
+_SLOT_BYTES = json.dumps(MESSAGE_SLOT)[1:-1].encode()
+
+
+def signature(error_code: str, message: Optional[str], trace: Optional[str]) -> str:
+    """
+    Cache key for a diagnose request: exact code, message and trace with only
+    timestamps, amounts, card digits and uuids folded (normalize(loose=False)).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    # A blank message renders differently from a present one (raw_notes)
+    for part in (error_code, "1" if message else "0", normalize(message or "", loose=False), normalize(trace or "", loose=False)):
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """Serialized response split at the message slot, plus fields the request log needs."""
+
+    parts: Tuple[bytes, ...]
+    meta: Dict[str, Any]
+
+    def render(self, message: str) -> bytes:
+        if len(self.parts) == 1:
+            return self.parts[0]
+        value = json.dumps(message, ensure_ascii=False)[1:-1].encode("utf-8", "surrogatepass")
+        return value.join(self.parts)
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self.parts)
+
+
+class ResponseCache:
+    """
+    Pre-serialized diagnose responses keyed by signature(). Entries belong to
+    one snapshot version: the first lookup under a newer version (rules,
+    knowledge or index reloaded) drops everything cached for the old one.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 300.0, maxsize: int = 4096):
+        self.entries = ByteLRUCache(max_bytes, ttl=ttl, maxsize=maxsize)
+        self.version: Optional[int] = None
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.entries.max_bytes > 0
+
+    def _current(self, version: int) -> bool:
+        """True if version is the one being cached; a newer version clears the cache."""
+        if self.version is None or version > self.version:
+            with self._lock:
+                if self.version is None or version > self.version:
+                    if self.version is not None:
+                        self.invalidations += 1
+                    self.entries.clear()
+                    self.version = version
+        # A request still holding an older snapshot neither reads nor writes
+        return version == self.version
+
+    def get(self, key: str, version: int) -> Optional[CachedResponse]:
+        if not self._current(version):
+            return None
+        return self.entries.get(key)
+
+    def put(self, key: str, version: int, body: bytes, meta: Dict[str, Any]) -> CachedResponse:
+        """Cache a body serialized with MESSAGE_SLOT in place of the message."""
+        entry = CachedResponse(tuple(body.split(_SLOT_BYTES)), meta)
+        if self._current(version):
+            self.entries.set(key, entry)
+        return entry
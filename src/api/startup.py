@@ -0,0 +1,133 @@
+# src/api/startup.py
+from __future__ import annotations
+
+import argparse
+import json
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.extractor import read_hints
+from src.rag.playbooks import PlaybookStore
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+RULES_PATH = ROOT_DIR / "config" / "rules.json"
+MAPPINGS_PATH = ROOT_DIR / "src" / "mappings.csv"
+PLAYBOOKS_MD_PATH = ROOT_DIR / "agent_playbooks.md"
+KNOWLEDGE_DIR = ROOT_DIR / "knowledge"
+VECTOR_DIR = ROOT_DIR / "src" / "rag" / "index"
+KB_INDEX_PATH = ROOT_DIR / "models" / "kb_index.faiss"
+BUNDLE_PATH = VECTOR_DIR / "startup.pkl"
+
+BUNDLE_VERSION = 2
+
+
+def bundle_sources(
+    rules_path=RULES_PATH,
+    mappings_csv=MAPPINGS_PATH,
+    playbooks_md=PLAYBOOKS_MD_PATH,
+    knowledge_dir=KNOWLEDGE_DIR,
+    vector_dir=VECTOR_DIR,
+    kb_index=KB_INDEX_PATH,
+) -> List[Path]:
+    """Every file the bundle is compiled from; it is stale if any is newer."""
+    paths = [Path(p) for p in (rules_path, mappings_csv, playbooks_md) if p]
+    if knowledge_dir and Path(knowledge_dir).exists():
+        paths.extend(sorted(Path(knowledge_dir).glob("*.txt")))
+    if vector_dir:
+        paths.extend(Path(vector_dir) / name for name in ("meta.json", "rows.json", "chunks.json", "embeddings.npy"))
+    if kb_index:
+        paths.extend([Path(kb_index), Path(kb_index).with_name("kb_meta.pkl")])
+    return paths
+
+
+def build_bundle(
+    rules_path=RULES_PATH,
+    mappings_csv=MAPPINGS_PATH,
+    playbooks_md=PLAYBOOKS_MD_PATH,
+    knowledge_dir=KNOWLEDGE_DIR,
+    vector_dir=VECTOR_DIR,
+    kb_index=KB_INDEX_PATH,
+) -> Dict[str, Any]:
+    """
+    Rules, regex hints, compiled playbooks and index metadata (the small
+    files a cold start would otherwise read and parse one by one) as plain
+    dicts.
+    A source that is missing or unreadable is stored as None, and the
+    consumer falls back to its own default exactly as it would without
+    the bundle.
+    """
+    rules = None
+    if rules_path and Path(rules_path).exists():
+        try:
+            rules = json.loads(Path(rules_path).read_text(encoding="utf-8"))
+        except Exception:
+            rules = None
+
+    index: Dict[str, Any] = {}
+    if kb_index and Path(kb_index).exists():
+        meta_path = Path(kb_index).with_name("kb_meta.pkl")
+        if meta_path.exists():
+            with open(meta_path, "rb") as f:
+                index["kb_meta"] = pickle.load(f)
+    elif vector_dir and (Path(vector_dir) / "meta.json").exists():
+        from src.rag.vector_index import VectorIndex
+
+        index["vector_meta"] = json.loads((Path(vector_dir) / "meta.json").read_text(encoding="utf-8"))
+        index["vector_rows"] = VectorIndex.read_rows(vector_dir)
+
+    return {
+        "version": BUNDLE_VERSION,
+        "rules": rules,
+        "hints": read_hints(mappings_csv) if mappings_csv and Path(mappings_csv).exists() else [],
+        "playbooks": PlaybookStore.build(mappings_csv, playbooks_md, knowledge_dir).as_dict(),
+        "index": index,
+    }
+
+
+def save_bundle(bundle: Dict[str, Any], path: str | Path = BUNDLE_PATH) -> None:
+    """One pickle; written via temp file + rename."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+
+def load_bundle(path: str | Path = BUNDLE_PATH, sources: Optional[Iterable[Path]] = None) -> Optional[Dict[str, Any]]:
+    """
+    The bundle if it exists, is newer than every source (make-style, stat
+    calls only) and has the current version; otherwise None, and the
+    caller reads the sources directly.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    built = path.stat().st_mtime_ns
+    if any(p.exists() and p.stat().st_mtime_ns > built for p in sources or ()):
+        return None
+    try:
+        with open(path, "rb") as f:
+            bundle = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(bundle, dict) or bundle.get("version") != BUNDLE_VERSION:
+        return None
+    return bundle
+
+
+def main(out=BUNDLE_PATH):
+    bundle = build_bundle()
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    save_bundle(bundle, out)
+    index = ", ".join(sorted(bundle["index"])) or "no index metadata"
+    print(
+        f"wrote rules ({len(bundle['rules'] or {})} buckets), {len(bundle['hints'])} hints, "
+        f"playbooks, {index} → {out}"
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compile rules, hints, playbooks and index metadata into one startup bundle.")
+    ap.add_argument("--out", default=str(BUNDLE_PATH))
+    main(ap.parse_args().out)
@@ -0,0 +1,29 @@
+# src/api/timing.py
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """Wall-clock time per named request stage (classify, retrieve, ...), via perf_counter_ns."""
+
+    def __init__(self):
+        self.started = time.perf_counter_ns()
+        self.stages: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0) + time.perf_counter_ns() - start
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter_ns() - self.started) / 1e6
+
+    def as_dict(self) -> Dict[str, float]:
+        """Milliseconds per stage."""
+        return {name: round(ns / 1e6, 3) for name, ns in self.stages.items()}
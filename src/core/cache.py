@@ -0,0 +1,126 @@
+# src/core/cache.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    Lookups move an entry to the most-recently-used end; inserts beyond
+    `maxsize` evict from the least-recently-used end.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        ttl: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        now = self._clock()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = self._clock() + self.ttl
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ByteLRUCache:
+    """
+    LRU + TTL cache bounded by the total size of its values (len() of bytes,
+    or `sizeof`) as well as by entry count. An insert evicts from the
+    least-recently-used end until both limits hold; a value larger than
+    max_bytes on its own is not cached.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float = 600.0,
+        maxsize: int = 4096,
+        sizeof: Callable[[Any], int] = len,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = float(ttl)
+        self.maxsize = max(1, int(maxsize))
+        self._sizeof = sizeof
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        now = self._clock()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                    self.nbytes -= item[2]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """Store value; False if it alone exceeds max_bytes."""
+        size = int(self._sizeof(value))
+        if size > self.max_bytes:
+            return False
+        expires = self._clock() + self.ttl
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            self._data[key] = (expires, value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes or len(self._data) > self.maxsize:
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
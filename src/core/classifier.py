@@ -1,14 +1,26 @@
 # src/core/classifier.py
 from __future__ import annotations
-from typing import Tuple, List, Optional
+from typing import Iterable, Tuple, List, Optional, Dict
 import json
+import os
 from pathlib import Path
 
+from src.core.extractor import Extraction, SignalExtractor
+from src.core.matcher import TriggerMatcher
+
 _DEFAULT_RULES = {
     "Payments": {
         "match_any": ["PAYMENT", "CARD"],
         "severity": "High",
         "signals": ["payment_module", "cc_validation", "gateway_response"],
+        "ml_labels": [
+            "PAYMENT_METHOD_ERROR",
+            "FRAUD_OR_BANK_DECLINE",
+            "LIMIT_EXCEEDED",
+            "DUPLICATE_TXN",
+            "AUTOPAY_ELIGIBILITY",
+            "STATEMENT_REFERENCE_ERROR",
+        ],
     },
     "Auth": {
         "match_any": ["AUTH", "UNAUTHORIZED", "401"],
@@ -19,6 +31,7 @@ _DEFAULT_RULES = {
         "match_any": ["TIMEOUT", "TIMED OUT"],
         "severity": "Medium",
         "signals": ["upstream_timeout", "retry_needed"],
+        "ml_labels": ["NETWORK_OR_TIMEOUT", "SYSTEM_OUTAGE"],
     },
     "Routing": {
         "match_any": ["NOT FOUND", "404"],
@@ -32,14 +45,35 @@ _DEFAULT_RULES = {
     },
 }
 
+Classification = Tuple[str, str, List[str], Dict[str, object]]
+
+
 class RulesClassifier:
-    def __init__(self, mappings_path: Optional[str] = None):
+    def __init__(
+        self,
+        mappings_path: Optional[str] = None,
+        model_path: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        rules: Optional[Dict[str, Dict]] = None,
+        extractor: Optional[SignalExtractor] = None,
+    ):
         """
-        If mappings_path is provided and exists, load JSON rules from it.
-        Otherwise, use built-in defaults so the app can still run.
+        If mappings_path is provided and exists, load JSON rules from it;
+        rules already parsed (the startup bundle) are used as-is. Otherwise,
+        use built-in defaults so the app can still run.
+
+        If model_path is given, requests no rule matches are scored by the
+        TF-IDF + LR pipeline instead of going straight to General; a
+        prediction at or above min_confidence is mapped to a bucket through
+        each bucket's "ml_labels".
+
+        With an extractor (the mappings.csv regex_hints), message and trace
+        are scanned once for provider codes, HTTP statuses and gateway codes:
+        they are appended to the signals as "kind:value" strings and never
+        change the classification.
         """
-        self.rules = _DEFAULT_RULES
-        if mappings_path:
+        self.rules = rules or _DEFAULT_RULES
+        if mappings_path and not rules:
             p = Path(mappings_path)
             if p.exists():
                 try:
@@ -48,18 +82,140 @@ class RulesClassifier:
                     # If the file is bad, continue with defaults
                     self.rules = _DEFAULT_RULES
 
-    def classify(self, error_code: str, message: str, trace: str) -> Tuple[str, str, List[str]]:
+        # Compile every trigger once; bucket order in the rules file is the
+        # match priority (first matching bucket wins).
+        self._buckets = list(self.rules.items())
+        self._matcher = TriggerMatcher.from_rules(self.rules)
+
+        self.min_confidence = (
+            min_confidence
+            if min_confidence is not None
+            else float(os.getenv("ML_MIN_CONFIDENCE", "0.35"))
+        )
+        self._ml_buckets = {
+            label: bucket
+            for bucket, spec in self._buckets
+            for label in spec.get("ml_labels", [])
+        }
+        self._extractor = extractor
+        self._model = None
+        if model_path:
+            # Lazy import: sklearn/joblib are only needed once a request misses every rule
+            from src.ml.serving import get_model_server
+
+            self._model = get_model_server(model_path)
+
+    @property
+    def model_server(self):
+        """Shared ModelServer behind the ML fallback (None when disabled)."""
+        return self._model
+
+    def warm(self) -> None:
+        """Load the fallback model up front (e.g. while building a reload snapshot)."""
+        if self._model is not None:
+            self._model.load()
+
+    # ---------------------------
+    # RULES / ML STAGES
+    # ---------------------------
+    def _bucket(self, bucket: str, source: str, label: str, confidence: float) -> Classification:
+        spec = self.rules.get(bucket) or self.rules["General"]
+        return (
+            bucket,
+            spec.get("severity", "Low"),
+            spec.get("signals", ["generic_checklist"]),
+            {"category": label, "confidence": round(confidence, 4), "source": source},
+        )
+
+    def _match_rules(self, error_code: str, message: str, trace: str) -> Optional[Classification]:
         code = (error_code or "").upper().strip()
         msg = (message or "").upper()
-        # Simple rule: first matching bucket wins
-        for bucket, spec in self.rules.items():
-            triggers = [t.upper() for t in spec.get("match_any", [])]
-            if any(t in code or t in msg for t in triggers):
-                return (
-                    bucket,
-                    spec.get("severity", "Low"),
-                    spec.get("signals", ["generic_checklist"]),
-                )
+        tr = (trace or "").upper()
+        # Single pass over code, message and trace
+        hit = self._matcher.best(code, msg, tr)
+        if hit is None:
+            return None
+        bucket = self._buckets[hit][0]
+        return self._bucket(bucket, "rules", bucket, 1.0)
+
+    def _extract(self, message: str, trace: str) -> Extraction:
+        if self._extractor is None:
+            return Extraction()
+        return self._extractor.extract(message, trace)
+
+    @staticmethod
+    def _with_signals(result: Classification, extraction: Extraction) -> Classification:
+        extra = extraction.signals()
+        if not extra:
+            return result
+        category, severity, signals, classification = result
+        return category, severity, list(signals) + extra, classification
+
+    @staticmethod
+    def _ml_text(error_code: str, message: str) -> str:
+        # Same shape as the "Error {code}: {message}" training templates
+        return f"Error {(error_code or '').strip()}: {message or ''}"
+
+    def _from_prediction(self, prediction: Optional[Tuple[str, float]]) -> Classification:
+        if prediction is not None:
+            label, confidence = prediction
+            if confidence >= self.min_confidence:
+                return self._bucket(self._ml_buckets.get(label, "General"), "ml", label, confidence)
         # Fallback
-        spec = self.rules["General"]
-        return ("General", spec.get("severity", "Low"), spec.get("signals", ["generic_checklist"]))
+        return self._bucket("General", "rules", "General", 0.0)
+
+    # ---------------------------
+    # PUBLIC API
+    # ---------------------------
+    def classify_detailed(self, error_code: str, message: str, trace: str) -> Classification:
+        """
+        (category, severity, signals, classification), where classification
+        is {category, confidence, source} as in event_schema.json. For ML
+        hits its category is the model label (e.g. LIMIT_EXCEEDED).
+        """
+        extraction = self._extract(message, trace)
+        hit = self._match_rules(error_code, message, trace)
+        if hit is not None:
+            return self._with_signals(hit, extraction)
+        prediction = None
+        if self._model is not None:
+            try:
+                prediction = self._model.predict(self._ml_text(error_code, message))
+            except Exception:
+                # A broken or missing model must never fail the request
+                prediction = None
+        return self._with_signals(self._from_prediction(prediction), extraction)
+
+    def classify(self, error_code: str, message: str, trace: str) -> Tuple[str, str, List[str]]:
+        return self.classify_detailed(error_code, message, trace)[:3]
+
+    def classify_many_detailed(self, items: Iterable[Tuple[str, str, str]]) -> List[Classification]:
+        """
+        Classify (error_code, message, trace) triples in one call.
+        Identical triples inside the batch are only scanned once, and all
+        rule misses go to the model as a single predict_proba batch.
+        """
+        keys = list(items)
+        seen: Dict[Tuple[str, str, str], Optional[Classification]] = {}
+        extractions: Dict[Tuple[str, str, str], Extraction] = {}
+        for key in keys:
+            if key not in seen:
+                extractions[key] = self._extract(key[1], key[2])
+                seen[key] = self._match_rules(*key)
+        misses = [key for key, hit in seen.items() if hit is None]
+        predictions: List[Optional[Tuple[str, float]]] = [None] * len(misses)
+        if misses and self._model is not None:
+            try:
+                predictions = self._model.predict_many([self._ml_text(code, msg) for code, msg, _ in misses])
+            except Exception:
+                pass
+        for key, prediction in zip(misses, predictions):
+            seen[key] = self._from_prediction(prediction)
+        for key, extraction in extractions.items():
+            seen[key] = self._with_signals(seen[key], extraction)
+        return [seen[key] for key in keys]
+
+    def classify_many(
+        self, items: Iterable[Tuple[str, str, str]]
+    ) -> List[Tuple[str, str, List[str]]]:
+        return [c[:3] for c in self.classify_many_detailed(items)]
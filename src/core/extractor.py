@@ -0,0 +1,150 @@
+# src/core/extractor.py
+from __future__ import annotations
+
+import csv
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Message + trace beyond this many characters is not scanned; the signal in a
+# 20 KB stack trace is in its head (exception line, gateway response).
+EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "32768"))
+
+# Generic patterns scanned in the same pass as the provider hints, written
+# against lower-cased text. They come first in the alternation, so "HTTP 503"
+# is read as a status; GATEWAY_DOWN still matches on "service unavailable".
+_HTTP_STATUS = (
+    r"\bhttp(?:/\d(?:\.\d)?)?\s*[:=]?\s*(?P<http_value>[1-5]\d\d)\b"
+    r"|\bstatus(?:[ _-]?code)?\s*[:=]\s*(?P<http_value2>[1-5]\d\d)\b"
+)
+_GATEWAY_CODE = (
+    r"\b(?:decline|response|reason|result|error|gateway|processor)[ _-]?code\s*[:=]\s*[\"']?"
+    r"(?P<gateway_value>[A-Za-z0-9_]{1,40})"
+)
+
+# An upper-case letter that is not an escape such as \S or \D
+_CASED = re.compile(r"(?<!\\)[A-Z]")
+# A backreference (\1, (?P=name)): inside the alternation its number or name
+# would point at another branch's group
+_BACKREF = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?P=")
+_HINT_GROUP = re.compile(r"h\d+")
+
+Hint = Tuple[str, str, str]  # (provider_code, regex_hint, category)
+
+
+@dataclass(frozen=True)
+class Extraction:
+    """What one scan found, each in first-seen order without duplicates."""
+
+    provider_codes: Tuple[str, ...] = ()
+    http_statuses: Tuple[int, ...] = ()
+    gateway_codes: Tuple[str, ...] = ()
+
+    @property
+    def provider_code(self) -> Optional[str]:
+        return self.provider_codes[0] if self.provider_codes else None
+
+    def signals(self) -> List[str]:
+        """Flat "kind:value" strings, appended to a diagnosis' signals."""
+        return (
+            [f"provider_code:{c}" for c in self.provider_codes]
+            + [f"http_status:{s}" for s in self.http_statuses]
+            + [f"gateway_code:{g}" for g in self.gateway_codes]
+        )
+
+
+def read_hints(mappings_csv: str | Path) -> List[Hint]:
+    """(provider_code, regex_hint, category) rows of mappings.csv that have a hint."""
+    hints: List[Hint] = []
+    with open(mappings_csv, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            code = (row.get("provider_code") or "").strip().upper()
+            hint = (row.get("regex_hint") or "").strip()
+            if code and hint:
+                hints.append((code, hint, (row.get("category") or "").strip().upper()))
+    return hints
+
+
+class SignalExtractor:
+    """
+    Every regex_hint from mappings.csv, plus HTTP status and gateway-code
+    patterns, compiled once into a single alternation of named groups.
+    extract() walks the (capped) text with one finditer, and the group that
+    matched says which pattern fired, instead of running N regexes over
+    every trace.
+
+    The text is lower-cased once rather than compiling with IGNORECASE
+    (about 40% slower in sre); hints are lower-case in mappings.csv, and
+    one with an upper-case literal is wrapped in a scoped (?i:...). A hint
+    that cannot live inside the alternation (invalid, inline global flags,
+    backreferences, clashing group names) is skipped.
+    """
+
+    def __init__(self, hints: Iterable[Hint], max_chars: int = EXTRACT_MAX_CHARS):
+        self.max_chars = max_chars
+        self.codes: List[str] = []
+        self.categories: Dict[str, str] = {}
+        branches = [f"(?P<http>{_HTTP_STATUS})", f"(?P<gateway>{_GATEWAY_CODE})"]
+        names = set(re.compile("|".join(branches)).groupindex)
+        for code, pattern, category in hints:
+            # One bad hint must not disable the others (or the import)
+            branch = self._branch(pattern, len(self.codes), names)
+            if branch is None:
+                continue
+            branches.append(branch)
+            self.codes.append(code)
+            self.categories.setdefault(code, category)
+        self._pattern = re.compile("|".join(branches))
+
+    @staticmethod
+    def _branch(pattern: str, index: int, names: set) -> Optional[str]:
+        """The named group for one hint, or None if it cannot join the alternation."""
+        try:
+            groups = set(re.compile(pattern).groupindex)
+        except re.error:
+            return None
+        if _BACKREF.search(pattern) or groups & names or any(_HINT_GROUP.fullmatch(g) for g in groups):
+            return None
+        if _CASED.search(pattern):
+            pattern = f"(?i:{pattern})"
+        branch = f"(?P<h{index}>{pattern})"
+        try:
+            # Global flags such as (?i) only compile at the start of a pattern
+            re.compile(f"(?:)|{branch}")
+        except re.error:
+            return None
+        names.update(groups)
+        return branch
+
+    @classmethod
+    def from_mappings(cls, mappings_csv: str | Path, **kwargs) -> "SignalExtractor":
+        path = Path(mappings_csv)
+        return cls(read_hints(path) if path.exists() else [], **kwargs)
+
+    def extract(self, *texts: Optional[str]) -> Extraction:
+        """
+        Scan the texts (message, trace, ...) as one newline-joined string cut
+        at max_chars; hint patterns use `.` so they never span two fields.
+        """
+        text = "\n".join(t for t in texts if t)[: self.max_chars].lower()
+        if not text:
+            return Extraction()
+        # dicts as ordered sets
+        codes: Dict[str, None] = {}
+        statuses: Dict[int, None] = {}
+        gateway: Dict[str, None] = {}
+        for m in self._pattern.finditer(text):
+            name = m.lastgroup
+            if name == "http":
+                statuses[int(m.group("http_value") or m.group("http_value2"))] = None
+            elif name == "gateway":
+                value = m.group("gateway_value").upper()
+                gateway[value] = None
+                if value in self.categories:
+                    # decline_code=do_not_honor names a provider code outright
+                    codes[value] = None
+            else:
+                codes[self.codes[int(name[1:])]] = None
+        return Extraction(tuple(codes), tuple(statuses), tuple(gateway))
@@ -0,0 +1,86 @@
+# src/core/matcher.py
+from __future__ import annotations
+
+import sys
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+_NO_MATCH = sys.maxsize
+
+
+class TriggerMatcher:
+    """
+    Aho-Corasick automaton over the rule triggers.
+
+    Every trigger carries a priority (the position of its bucket in rules.json,
+    lower wins). The automaton is compiled once, so a scan walks each input
+    character exactly once no matter how many triggers are loaded.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Best (lowest) priority emitted when the automaton sits in a state,
+        # already folded over the failure chain.
+        self._out: List[int] = [_NO_MATCH]
+
+        for text, priority in patterns:
+            if text:
+                self._add(text, priority)
+        self._link()
+
+    @classmethod
+    def from_rules(cls, rules: Mapping[str, dict]) -> "TriggerMatcher":
+        """Build from a rules mapping; triggers are upper-cased here, once."""
+        return cls(
+            (str(t).upper(), priority)
+            for priority, spec in enumerate(rules.values())
+            for t in spec.get("match_any", [])
+        )
+
+    def _add(self, text: str, priority: int) -> None:
+        state = 0
+        for ch in text:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(_NO_MATCH)
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state] = min(self._out[state], priority)
+
+    def _link(self) -> None:
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = min(out[nxt], out[fail[nxt]])
+
+    def best(self, *texts: str) -> Optional[int]:
+        """
+        Scan the texts (already upper-cased) and return the lowest priority of
+        any trigger found in them, or None. Texts are scanned independently, so
+        a trigger never matches across a field boundary.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        best = _NO_MATCH
+        for text in texts:
+            state = 0
+            for ch in text:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                if out[state] < best:
+                    best = out[state]
+                    if best == 0:
+                        # Nothing can beat the first bucket; stop early.
+                        return 0
+        return None if best == _NO_MATCH else best
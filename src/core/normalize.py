@@ -0,0 +1,54 @@
+# src/core/normalize.py
+from __future__ import annotations
+
+import re
+
+# Volatile fragments of gateway messages and traces, replaced by a
+# placeholder so "declined at 10:32 for $12.50" and "declined at 11:05 for
+# $9.99" read the same to the response and summary caches. One alternation,
+# one pass; the named group that matched picks the placeholder. Three-digit
+# HTTP statuses (401, 404) and plain words are left alone because the rules
+# match on them, and a value after "response_code=" and the like is kept
+# verbatim because the extractor reports it as a gateway code.
+_KEYED = r"(?P<keyed>\b(?:decline|response|reason|result|error|gateway|processor)[ _-]?code\s*[:=]\s*[\"']?\w+)"
+_EXACT = (
+    r"|(?P<id>\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b)"
+    r"|(?P<ts>\b\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?"
+    r"|\b\d{1,2}:\d{2}(?::\d{2})?\b)"
+    r"|(?P<addr>\b0x[0-9a-f]+\b)"
+    r"|(?P<card>\b(?:ending|last ?4)(?: in)?\s*\d{4}\b|[*x]{4,}\d{4}\b)"
+    r"|(?P<amount>[$€£]\s?\d[\d,]*(?:\.\d+)?|\b\d{1,3}(?:,\d{3})+(?:\.\d+)?\b|\b\d+\.\d+\b)"
+)
+# References and digit-bearing tokens can carry meaning ("request 404",
+# "GW30000099"), so only the similarity-based summary cache folds them.
+_LOOSE = (
+    r"|(?P<ref>\b(?:ref|reference|txn|transaction|order|request|trace|charge)(?:[ _-]?id)?\s*[:#=]?\s*(?=[\w-]*\d)[\w-]+)"
+    r"|(?P<token>\b(?=[0-9a-z_]*\d)[0-9a-z_]{8,}\b)"
+)
+_VOLATILE = re.compile(_KEYED + _EXACT + _LOOSE, re.IGNORECASE)
+_VOLATILE_EXACT = re.compile(_KEYED + _EXACT, re.IGNORECASE)
+_PLACEHOLDER = {
+    "id": "<id>",
+    "ts": "<ts>",
+    "addr": "<addr>",
+    "card": "<card>",
+    "amount": "<amount>",
+    "ref": "<ref>",
+    "token": "<id>",
+}
+
+
+def _placeholder(m: re.Match) -> str:
+    return m.group() if m.lastgroup == "keyed" else _PLACEHOLDER[m.lastgroup]
+
+
+def normalize(text: str, loose: bool = True) -> str:
+    """
+    Volatile ids/amounts/timestamps replaced by placeholders, whitespace
+    collapsed. loose=False leaves references and tokens alone, for keys
+    that must not merge texts the classifier or extractor tell apart.
+    """
+    if not text:
+        return ""
+    text = (_VOLATILE if loose else _VOLATILE_EXACT).sub(_placeholder, text)
+    return " ".join(text.split())
@@ -1,65 +1,68 @@
-import random
-import re
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
-def _regex_to_hint_text(regex: str) -> str:
-    if not regex:
-        return ""
-    # make regex human-ish (good enough for weak supervision)
-    txt = re.sub(r"[\\\|\(\)\[\]\^\$\+\?\*\.]", " ", regex)
-    txt = re.sub(r"\s+", " ", txt).strip()
-    return txt
+_HINT_CHARS = r"[\\\|\(\)\[\]\^\$\+\?\*\.]"
 
-def load_training_examples(csv_path: str):
-    """Build simple text/label examples from mappings.csv rows.
+def _squash(s: pd.Series) -> pd.Series:
+    return s.str.replace(r"\s+", " ", regex=True).str.strip()
 
-    We use provider_code / user_message / regex_hint to synthesize training text,
-    with label = category.
-    """
-    df = pd.read_csv(csv_path, engine="python").fillna("")
+def build_training_frame(df: pd.DataFrame, seed: int = 42) -> pd.DataFrame:
+    """Vectorized augmentation: one (text, label) row per example.
 
+    Seeds per mapping row are the user message, the regex hint and three
+    templates; each seed yields a base, an UPPER and (if longer than 8 chars)
+    a one-character-deletion typo variant. The typo positions come from a
+    seeded generator, so the same CSV and seed always give the same data.
+    """
     required = {"provider_code", "category", "user_message", "regex_hint"}
     missing = required - set(df.columns)
     if missing:
         raise ValueError(f"mappings.csv is missing columns: {missing}")
 
-    examples = []
-    for _, row in df.iterrows():
-        code = str(row["provider_code"]).strip()
-        category = str(row["category"]).strip()
-        user_msg = str(row["user_message"]).strip()
-        regex = str(row["regex_hint"]).strip()
+    df = df.fillna("").astype(str)
+    code = df["provider_code"].str.strip()
+    label = df["category"].str.strip()
+    user_msg = df["user_message"].str.strip()
+    hint = _squash(df["regex_hint"].str.strip().str.replace(_HINT_CHARS, " ", regex=True))
+    detail = user_msg.where(user_msg != "", hint)
 
-        seed_texts = []
-        if user_msg:
-            seed_texts.append(user_msg)
-        if regex:
-            seed_texts.append(_regex_to_hint_text(regex))
+    seeds = pd.concat(
+        [
+            user_msg,
+            hint,
+            "Gateway returned code " + code,
+            "Error " + code + ": " + detail,
+            "Payment failed: " + detail,
+        ],
+        axis=1,
+        keys=range(5),
+    )
+    long = seeds.stack().rename_axis(["row", "seed"]).rename("text").reset_index()
+    long["text"] = _squash(long["text"])
+    long = long[long["text"] != ""].reset_index(drop=True)
+    long["label"] = label.to_numpy()[long["row"].to_numpy()]
 
-        # simple templates
-        seed_texts.extend([
-            f"Gateway returned code {code}",
-            f"Error {code}: {user_msg or _regex_to_hint_text(regex)}",
-            f"Payment failed: {user_msg or _regex_to_hint_text(regex)}",
-        ])
+    base = long.assign(variant=0)
+    upper = long.assign(text=long["text"].str.upper(), variant=1)
 
-        for t in seed_texts:
-            t = " ".join(t.split())
-            if not t:
-                continue
+    typo = long[long["text"].str.len() > 8].copy()
+    rng = np.random.default_rng(seed)
+    hi = np.minimum(6, typo["text"].str.len().to_numpy() - 2)
+    cut = rng.integers(1, hi + 1) if len(typo) else np.zeros(0, dtype=int)
+    typo["text"] = [t[:i] + t[i + 1:] for t, i in zip(typo["text"], cut)]
+    typo["variant"] = 2
 
-            # base
-            examples.append({"text": t, "label": category})
+    out = pd.concat([base, upper, typo], ignore_index=True)
+    out = out.sort_values(["row", "seed", "variant"], kind="stable")
+    return out[["text", "label"]].reset_index(drop=True)
 
-            # UPPER variant
-            examples.append({"text": t.upper(), "label": category})
-
-            # tiny typo variant
-            if len(t) > 8:
-                i = random.randint(1, min(6, len(t) - 2))
-                typo = t[:i] + t[i+1:i+2] + t[i+2:]
-                examples.append({"text": typo, "label": category})
+def load_training_examples(csv_path: str, seed: int = 42):
+    """Build simple text/label examples from mappings.csv rows.
 
-    return examples
+    We use provider_code / user_message / regex_hint to synthesize training text,
+    with label = category. See build_training_frame for the variants.
+    """
+    df = pd.read_csv(csv_path, engine="python")
+    return build_training_frame(df, seed=seed).to_dict("records")
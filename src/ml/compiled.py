@@ -0,0 +1,177 @@
+# src/ml/compiled.py
+from __future__ import annotations
+
+import argparse
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+MODELS_DIR = Path(__file__).resolve().parents[2] / "models"
+
+
+class CompiledModel:
+    """
+    NumPy-only scorer for the TF-IDF + LR pipeline exported by export().
+
+    Mirrors TfidfVectorizer (word analyzer, lowercase, token_pattern,
+    ngram_range, binary / sublinear tf, fitted idf or none, l1 / l2 / no
+    norm) followed by LogisticRegression's predict_proba, so probabilities
+    match the sklearn pipeline without importing sklearn, pandas or joblib.
+    export() refuses any other vectorizer setting.
+    """
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        idf: np.ndarray,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        classes: np.ndarray,
+        token_pattern: str,
+        ngram_range: Tuple[int, int] = (1, 1),
+        lowercase: bool = True,
+        sublinear_tf: bool = False,
+        norm: str = "l2",
+        binary: bool = False,
+    ):
+        self.vocabulary_: Dict[str, int] = {str(t): i for i, t in enumerate(terms)}
+        self.idf = idf.astype(np.float64)
+        # (n_features, n_classes): the rows of one document are gathered contiguously
+        self.weights = np.ascontiguousarray(coef.T, dtype=np.float64)
+        self.intercept = intercept.astype(np.float64)
+        self.classes_ = classes
+        self.token_re = re.compile(token_pattern)
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.lowercase = lowercase
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.binary = binary
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CompiledModel":
+        with np.load(path, allow_pickle=False) as z:
+            lo, hi = (int(x) for x in z["ngram_range"])
+            # Files written before binary was exported carry two flags
+            lowercase, sublinear_tf, binary = (bool(x) for x in (*z["flags"], False)[:3])
+            return cls(
+                z["terms"],
+                z["idf"],
+                z["coef"],
+                z["intercept"],
+                z["classes"],
+                token_pattern=str(z["token_pattern"]),
+                ngram_range=(lo, hi),
+                lowercase=lowercase,
+                sublinear_tf=sublinear_tf,
+                norm=str(z["norm"]),
+                binary=binary,
+            )
+
+    def _ngrams(self, text: str) -> List[str]:
+        tokens = self.token_re.findall(text.lower() if self.lowercase else text)
+        lo, hi = self.ngram_range
+        out: List[str] = []
+        for n in range(lo, min(hi, len(tokens)) + 1):
+            if n == 1:
+                out.extend(tokens)
+            else:
+                out.extend(" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+        return out
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        counts: Dict[int, int] = {}
+        for gram in self._ngrams(text):
+            j = self.vocabulary_.get(gram)
+            if j is not None:
+                counts[j] = counts.get(j, 0) + 1
+        cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.binary:
+            tf[:] = 1.0
+        elif self.sublinear_tf:
+            tf = 1.0 + np.log(tf)
+        vals = tf * self.idf[cols]
+        if self.norm == "l2" and len(vals):
+            vals /= np.sqrt(vals @ vals)
+        elif self.norm == "l1" and len(vals):
+            vals /= np.abs(vals).sum()
+        return cols, vals
+
+    def decision_function(self, texts: Iterable[str]) -> np.ndarray:
+        texts = list(texts)
+        out = np.tile(self.intercept, (len(texts), 1))
+        for i, text in enumerate(texts):
+            cols, vals = self._features(text)
+            if len(cols):
+                out[i] += vals @ self.weights[cols]
+        return out
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        if scores.shape[1] == 1:
+            # Binary LR: one logit for the positive class
+            pos = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - pos, pos])
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, texts: Iterable[str]) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
+
+
+def export(model_path: str | Path, out_path: str | Path) -> Path:
+    """Flatten a fitted TfidfVectorizer + LogisticRegression pipeline into an .npz."""
+    from src.ml.model import load_model
+
+    pipe = load_model(model_path)
+    if len(pipe.steps) != 2:
+        raise ValueError("only a two-step TfidfVectorizer + LogisticRegression pipeline can be compiled")
+    tfidf, clf = pipe.steps[0][1], pipe.steps[-1][1]
+    if type(tfidf).__name__ != "TfidfVectorizer" or type(clf).__name__ != "LogisticRegression":
+        raise ValueError(f"cannot compile {type(tfidf).__name__} + {type(clf).__name__}")
+    unsupported = {
+        "input": tfidf.input != "content",
+        "analyzer": tfidf.analyzer != "word",
+        "tokenizer": tfidf.tokenizer is not None,
+        "preprocessor": tfidf.preprocessor is not None,
+        "stop_words": tfidf.stop_words is not None,
+        "strip_accents": tfidf.strip_accents is not None,
+        "norm": tfidf.norm not in ("l1", "l2", None),
+    }
+    bad = [name for name, flag in unsupported.items() if flag]
+    if bad:
+        raise ValueError(f"TfidfVectorizer settings the compiled scorer does not reproduce: {', '.join(bad)}")
+    if getattr(clf, "multi_class", "auto") == "ovr" and len(clf.classes_) > 2:
+        raise ValueError("one-vs-rest LogisticRegression is not supported")
+
+    terms = np.empty(len(tfidf.vocabulary_), dtype=object)
+    for term, j in tfidf.vocabulary_.items():
+        terms[j] = term
+    out_path = Path(out_path)
+    with open(out_path, "wb") as f:
+        np.savez(
+            f,
+            terms=terms.astype(str),
+            # use_idf=False weighs every term 1
+            idf=tfidf.idf_ if tfidf.use_idf else np.ones(len(terms)),
+            coef=clf.coef_,
+            intercept=clf.intercept_,
+            classes=np.asarray(clf.classes_).astype(str),
+            token_pattern=np.array(tfidf.token_pattern),
+            ngram_range=np.array(tfidf.ngram_range),
+            flags=np.array([tfidf.lowercase, tfidf.sublinear_tf, tfidf.binary]),
+            norm=np.array(tfidf.norm or ""),
+        )
+    return out_path
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Export tfidf_lr.joblib to a NumPy-only .npz model.")
+    ap.add_argument("--model", default=str(MODELS_DIR / "tfidf_lr.joblib"))
+    ap.add_argument("--out", default=str(MODELS_DIR / "tfidf_lr.npz"))
+    args = ap.parse_args()
+    print(f"wrote {export(args.model, args.out)}")
@@ -0,0 +1,206 @@
+# src/ml/serving.py
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.core.cache import TTLCache
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+class ModelServer:
+    """
+    In-process serving for the TF-IDF + LR pipeline written by train_ml.py,
+    either the joblib pipeline or its NumPy-only .npz export.
+
+    - The pipeline is loaded once, on first use, and shared by every caller.
+    - Concurrent predict() calls are micro-batched: a worker thread collects
+      requests for up to `max_wait_ms` (or `max_batch` items) and scores them
+      with a single predict_proba call.
+    - Predictions are LRU-cached on the normalized text.
+    """
+
+    def __init__(
+        self,
+        model_path: str | Path,
+        max_batch: int = 32,
+        max_wait_ms: float = 2.0,
+        cache_size: int = 4096,
+    ):
+        self.model_path = Path(model_path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache = TTLCache(maxsize=cache_size, ttl=float("inf"))
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        # Guards _closed against predict() enqueueing behind the stop marker
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+
+    # ---------------------------
+    # MODEL
+    # ---------------------------
+    def _get_model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    if self.model_path.suffix == ".npz":
+                        # Exported by src/ml/compiled.py: NumPy only, no sklearn import
+                        from src.ml.compiled import CompiledModel
+
+                        self._model = CompiledModel.load(self.model_path)
+                    else:
+                        from src.ml.model import load_model
+
+                        self._model = load_model(self.model_path)
+        return self._model
+
+    def load(self) -> None:
+        """Load the pipeline now rather than on the first prediction."""
+        self._get_model()
+
+    def _score(self, texts: List[str]) -> List[Tuple[str, float]]:
+        model = self._get_model()
+        proba = model.predict_proba(texts)
+        idx = proba.argmax(axis=1)
+        self.batches += 1
+        return [(str(model.classes_[i]), float(p[i])) for i, p in zip(idx, proba)]
+
+    # ---------------------------
+    # MICRO-BATCHING
+    # ---------------------------
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            with self._load_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="ml-batcher", daemon=True)
+                    self._worker.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # close(): score what was queued before it, then exit
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                results = self._score([text for text, _ in batch])
+            except Exception as exc:
+                for _, fut in batch:
+                    fut.set_exception(exc)
+                continue
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+
+    def close(self) -> None:
+        """
+        Stop the micro-batch worker (texts already queued are still scored)
+        and drop the prediction cache. A caller still holding the server
+        afterwards is scored inline, without a new worker.
+        """
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            if worker is not None and worker.is_alive():
+                self._queue.put(None)
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+        self.cache.clear()
+
+    # ---------------------------
+    # PUBLIC API
+    # ---------------------------
+    def predict(self, text: str) -> Tuple[str, float]:
+        """(label, confidence) for one text; joins the current micro-batch."""
+        key = normalize_text(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        fut: Future = Future()
+        with self._submit_lock:
+            queued = not self._closed
+            if queued:
+                self._ensure_worker()
+                self._queue.put((key, fut))
+        if not queued:
+            return self._score([key])[0]
+        result = fut.result()
+        self.cache.set(key, result)
+        return result
+
+    def predict_many(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Score many texts directly in one batch (cached entries are skipped)."""
+        keys = [normalize_text(t) for t in texts]
+        found: Dict[str, Tuple[str, float]] = {}
+        for key in keys:
+            cached = self.cache.get(key)
+            if cached is not None:
+                found[key] = cached
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            for key, result in zip(missing, self._score(missing)):
+                self.cache.set(key, result)
+                found[key] = result
+        return [found[k] for k in keys]
+
+
+_SERVERS: Dict[str, Tuple[Tuple[int, int], ModelServer]] = {}
+_SERVERS_LOCK = threading.Lock()
+
+
+def get_model_server(model_path: str | Path) -> ModelServer:
+    """
+    One shared ModelServer per model file for the whole process. A file
+    rewritten since (new mtime/size) gets a fresh server, so hot reloads
+    pick up retrained weights; the replaced server is closed, and a
+    snapshot still holding it scores inline until it is released.
+    """
+    path = Path(model_path).resolve()
+    try:
+        st = path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = (0, 0)
+    with _SERVERS_LOCK:
+        entry = _SERVERS.get(str(path))
+        if entry is None or entry[0] != stamp:
+            server = ModelServer(
+                model_path,
+                max_batch=int(os.getenv("ML_MAX_BATCH", "32")),
+                max_wait_ms=float(os.getenv("ML_MAX_WAIT_MS", "2")),
+                cache_size=int(os.getenv("ML_CACHE_SIZE", "4096")),
+            )
+            replaced, entry = entry, (stamp, server)
+            _SERVERS[str(path)] = entry
+        else:
+            replaced = None
+    if replaced is not None:
+        replaced[1].close()
+    return entry[1]
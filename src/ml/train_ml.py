@@ -1,3 +1,8 @@
+import argparse
+import json
+import os
+import time
+from itertools import product
 from pathlib import Path
 
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -6,35 +11,130 @@ from sklearn.metrics import accuracy_score, classification_report
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 import joblib
+from joblib import Parallel, delayed
 
 from .augment import load_training_examples
+from .compiled import export
 
 CSV_PATH = Path(__file__).resolve().parents[1] / "mappings.csv"
 MODEL_PATH = Path(__file__).resolve().parents[2] / "models" / "tfidf_lr.joblib"
+REPORT_PATH = MODEL_PATH.with_name("tfidf_lr_sweep.json")
 
-def main():
-    data = load_training_examples(str(CSV_PATH))
+SEED = int(os.getenv("TRAIN_SEED", "42"))
+DEFAULT_CONFIG = {"ngram_range": (1, 2), "max_features": 5000, "C": 1.0}
+DEFAULT_GRID = {
+    "ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "max_features": [5000, 20000],
+    "C": [0.25, 1.0, 4.0],
+}
+
+def _fit_vectorizer(texts, ngram_range, max_features):
+    start = time.perf_counter()
+    vec = TfidfVectorizer(max_features=max_features, ngram_range=ngram_range)
+    X = vec.fit_transform(texts)
+    return vec, X, time.perf_counter() - start
+
+def _fit_clf(X_train, y_train, X_val, y_val, C, seed=SEED):
+    start = time.perf_counter()
+    clf = LogisticRegression(C=C, max_iter=300, class_weight="balanced", random_state=seed)
+    clf.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    return clf, accuracy_score(y_val, clf.predict(X_val)), train_seconds
+
+def _pipeline(config, seed=SEED):
+    return Pipeline([
+        ("tfidf", TfidfVectorizer(max_features=config["max_features"], ngram_range=config["ngram_range"])),
+        ("clf", LogisticRegression(C=config["C"], max_iter=300, class_weight="balanced", random_state=seed)),
+    ])
+
+def sweep(X_train, y_train, X_val, y_val, grid=None, n_jobs=-1, seed=SEED):
+    """
+    Grid search over ngram_range x max_features x C, spread across cores,
+    scored on a validation split (never the holdout test set).
+
+    Each vectorizer is fitted once per (ngram_range, max_features) and its
+    matrices are shared by every C value; only the LR fits run per config.
+    Returns (report rows sorted best first, fitted pipelines keyed by
+    (ngram_range, max_features, C)).
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    keys = [(tuple(ng), mf) for ng, mf in product(grid["ngram_range"], grid["max_features"])]
+    fitted = Parallel(n_jobs=n_jobs)(delayed(_fit_vectorizer)(X_train, ng, mf) for ng, mf in keys)
+    vectorizers = {}
+    for key, (vec, Xtr, vec_seconds) in zip(keys, fitted):
+        vectorizers[key] = (vec, Xtr, vec.transform(X_val), vec_seconds)
+
+    configs = [(key, C) for key in keys for C in grid["C"]]
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_clf)(vectorizers[key][1], y_train, vectorizers[key][2], y_val, C, seed)
+        for key, C in configs
+    )
+
+    report, pipelines = [], {}
+    for (key, C), (clf, acc, train_seconds) in zip(configs, results):
+        pipelines[(*key, C)] = Pipeline([("tfidf", vectorizers[key][0]), ("clf", clf)])
+        report.append({
+            "ngram_range": list(key[0]),
+            "max_features": key[1],
+            "C": C,
+            "accuracy": round(float(acc), 4),
+            "vectorize_seconds": round(vectorizers[key][3], 4),
+            "train_seconds": round(train_seconds, 4),
+        })
+    # Best accuracy first; ties go to the cheaper fit
+    report.sort(key=lambda r: (-r["accuracy"], r["vectorize_seconds"] + r["train_seconds"]))
+    return report, pipelines
+
+def select_config(X_train, y_train, n_jobs=-1, seed=SEED):
+    """
+    Sweep winner: a validation split is carved out of the training data, so
+    the holdout test set stays untouched until the final report. Returns
+    (config, report).
+    """
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=seed, stratify=y_train
+    )
+    report, _ = sweep(X_fit, y_fit, X_val, y_val, n_jobs=n_jobs, seed=seed)
+    best = report[0]
+    return {"ngram_range": tuple(best["ngram_range"]), "max_features": best["max_features"], "C": best["C"]}, report
+
+def main(run_sweep=False, n_jobs=-1, seed=SEED):
+    data = load_training_examples(str(CSV_PATH), seed=seed)
     texts = [d["text"] for d in data]
     labels = [d["label"] for d in data]
 
     X_train, X_test, y_train, y_test = train_test_split(
-        texts, labels, test_size=0.2, random_state=42, stratify=labels
+        texts, labels, test_size=0.2, random_state=seed, stratify=labels
     )
 
-    pipe = Pipeline([
-        ("tfidf", TfidfVectorizer(max_features=5000, ngram_range=(1, 2))),
-        ("clf", LogisticRegression(max_iter=300, class_weight="balanced")),
-    ])
+    config = dict(DEFAULT_CONFIG)
+    if run_sweep:
+        config, report = select_config(X_train, y_train, n_jobs=n_jobs, seed=seed)
+        REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        REPORT_PATH.write_text(json.dumps({"seed": seed, "scored_on": "validation", "results": report}, indent=2), encoding="utf-8")
+        print(f"{'ngram':>7} {'max_feat':>8} {'C':>6} {'val_acc':>7} {'fit_s':>7}")
+        for r in report:
+            fit = r["vectorize_seconds"] + r["train_seconds"]
+            print(f"{str(tuple(r['ngram_range'])):>7} {r['max_features']:>8} {r['C']:>6} {r['accuracy']:>7.3f} {fit:>7.3f}")
+        print(f"wrote sweep report to {REPORT_PATH}")
 
-    pipe.fit(X_train, y_train)
+    # The chosen config is refitted on the whole training split
+    pipe = _pipeline(config, seed).fit(X_train, y_train)
     preds = pipe.predict(X_test)
     acc = accuracy_score(y_test, preds)
+    print(f"config: {config}")
     print(f"holdout accuracy: {acc:.3f}")
     print(classification_report(y_test, preds))
 
     MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
     joblib.dump(pipe, str(MODEL_PATH))
     print(f"wrote model to {MODEL_PATH}")
+    print(f"wrote compiled model to {export(MODEL_PATH, MODEL_PATH.with_suffix('.npz'))}")
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Train the TF-IDF + LR fallback classifier.")
+    ap.add_argument("--sweep", action="store_true", help="grid-search ngram_range/max_features/C first")
+    ap.add_argument("--jobs", type=int, default=-1, help="parallel workers for the sweep (-1 = all cores)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    args = ap.parse_args()
+    main(run_sweep=args.sweep, n_jobs=args.jobs, seed=args.seed)
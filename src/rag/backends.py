@@ -0,0 +1,144 @@
+# src/rag/backends.py
+from __future__ import annotations
+
+import os
+import struct
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+# FAISS flat index fourccs: inner product / squared L2
+_FOURCC_IP = b"IxFI"
+_FOURCC_L2 = b"IxF2"
+_METRIC_IP = 0
+_METRIC_L2 = 1
+# fourcc, d, ntotal, 2 dummies, is_trained, metric_type, then codes size
+_HEADER = struct.Struct("<4siqqqBiQ")
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(scores, column ids) of the k best columns per row, best first."""
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        empty = np.zeros((len(scores), 0))
+        return empty.astype(np.float32), empty.astype(np.int64)
+    if k < n:
+        ids = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        ids = np.tile(np.arange(n), (len(scores), 1))
+    part = np.take_along_axis(scores, ids, axis=1)
+    order = np.argsort(-part, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+class NumpyFlatBackend:
+    """
+    Brute-force search over a (possibly memory-mapped) float32 matrix.
+    Scores are "higher is better": inner product, or negated squared L2.
+    """
+
+    def __init__(self, vectors: np.ndarray, metric: str = "ip"):
+        self.vectors = vectors
+        self.metric = metric
+        self.ntotal, self.dim = vectors.shape
+        if metric == "l2":
+            self._sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        scores = queries @ self.vectors.T
+        if self.metric == "l2":
+            scores = 2.0 * scores - self._sq_norms - np.einsum("ij,ij->i", queries, queries)[:, None]
+
+        return top_k(scores, k)
+
+
+class FaissBackend:
+    """Thin wrapper over a faiss index so scores follow the same convention."""
+
+    def __init__(self, index, nprobe: Optional[int] = None):
+        import faiss
+
+        self.index = index
+        self.ntotal, self.dim = index.ntotal, index.d
+        self.metric = "l2" if index.metric_type == faiss.METRIC_L2 else "ip"
+        if nprobe:
+            # No-op for flat indexes; sets nprobe on IVF variants.
+            try:
+                faiss.ParameterSpace().set_index_parameter(index, "nprobe", int(nprobe))
+            except Exception:
+                pass
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        scores, ids = self.index.search(queries, min(k, self.ntotal))
+        if self.metric == "l2":
+            scores = -scores
+        return scores, ids
+
+
+def read_faiss_flat(path: str | Path, mode: str = "r") -> Tuple[np.ndarray, str]:
+    """
+    Read a FAISS IndexFlatIP/IndexFlatL2 file without faiss: the vectors are
+    memory-mapped straight out of the file (mode="r+" lets the index builder
+    patch rows in place). Other index types need faiss.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise ValueError(f"{path} is not a FAISS index")
+    fourcc, d, ntotal, _, _, _, metric, size = _HEADER.unpack(raw)
+    if fourcc not in (_FOURCC_IP, _FOURCC_L2):
+        raise ValueError(f"{path}: index type {fourcc!r} needs faiss installed")
+    if size != d * ntotal:
+        raise ValueError(f"{path}: expected {d * ntotal} floats, found {size}")
+    vectors = np.memmap(path, dtype=np.float32, mode=mode, offset=_HEADER.size, shape=(ntotal, d))
+    return vectors, ("l2" if metric == _METRIC_L2 else "ip")
+
+
+def write_faiss_flat(
+    path: str | Path, vectors: np.ndarray, metric: str = "ip", block_rows: int = 4096
+) -> None:
+    """
+    Write vectors as a FAISS flat index file (readable by faiss.read_index).
+    Rows are copied in blocks, so a memory-mapped source is never fully loaded.
+    The file is written via temp file + rename: a server memory-mapping the
+    old file keeps reading the old vectors.
+    """
+    path = Path(path)
+    ntotal, d = vectors.shape
+    fourcc, metric_type = (_FOURCC_L2, _METRIC_L2) if metric == "l2" else (_FOURCC_IP, _METRIC_IP)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(fourcc, d, ntotal, 1 << 20, 1 << 20, 1, metric_type, ntotal * d))
+        for start in range(0, ntotal, block_rows):
+            f.write(np.ascontiguousarray(vectors[start : start + block_rows], dtype=np.float32).tobytes())
+    os.replace(tmp, path)
+
+
+def faiss_available() -> bool:
+    try:
+        import faiss  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def open_index(path: str | Path, nprobe: Optional[int] = None, backend: str = "auto"):
+    """
+    Load a .faiss file with faiss when it is installed (or backend="faiss"),
+    otherwise fall back to the pure-NumPy brute-force reader.
+    """
+    if backend in ("auto", "faiss"):
+        try:
+            import faiss
+        except ImportError:
+            if backend == "faiss":
+                raise
+        else:
+            return FaissBackend(faiss.read_index(str(path), faiss.IO_FLAG_MMAP), nprobe=nprobe)
+    vectors, metric = read_faiss_flat(path)
+    return NumpyFlatBackend(vectors, metric=metric)
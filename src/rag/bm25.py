@@ -0,0 +1,156 @@
+# src/rag/bm25.py
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+# Longer runs are ids/hashes; they bloat the vocabulary without helping recall
+_MAX_TOKEN = 40
+
+
+def lexical_tokens(text: str) -> List[str]:
+    """
+    Lower-cased tokens for exact matching. Gateway codes are kept whole and
+    also split on '_', so DO_NOT_HONOR matches both the code and its words.
+    """
+    out: List[str] = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        if len(word) > _MAX_TOKEN:
+            continue
+        parts = [p for p in word.split("_") if p]
+        if len(parts) > 1:
+            out.append("_".join(parts))
+        out.extend(parts)
+    return out
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of documents (index chunks, row-aligned with
+    the vector index). Postings are stored CSR-style in flat NumPy arrays:
+    for term t, doc_ids[indptr[t]:indptr[t+1]] / tfs[...] hold its postings.
+    """
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.terms = terms
+        self.vocab = {str(t): i for i, t in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.n_docs = len(doc_len)
+        self.k1, self.b = k1, b
+
+        live = doc_len[doc_len > 0]
+        avgdl = float(live.mean()) if len(live) else 1.0
+        # Per-doc length normalization, precomputed once
+        self._norm = (k1 * (1.0 - b + b * doc_len / avgdl)).astype(np.float32)
+        df = np.diff(indptr).astype(np.float64)
+        n_live = max(len(live), 1)
+        self._idf = np.log1p((n_live - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[int, str]], n_docs: int, **kwargs) -> "BM25Index":
+        """
+        Build from (row, text) pairs in any order; rows never given (e.g.
+        tombstones) stay empty. Only the posting triplets are held in memory.
+        """
+        vocab: dict = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        doc_len = np.zeros(n_docs, dtype=np.int32)
+        for row, text in docs:
+            toks = lexical_tokens(text)
+            doc_len[row] = len(toks)
+            for term, tf in Counter(toks).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(row)
+                tfs.append(tf)
+
+        t = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(t, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(t, minlength=len(vocab)), out=indptr[1:])
+        terms = np.array(sorted(vocab, key=vocab.get), dtype=str)
+        return cls(
+            terms,
+            indptr,
+            np.asarray(doc_ids, dtype=np.int32)[order],
+            np.asarray(tfs, dtype=np.float32)[order],
+            doc_len,
+            **kwargs,
+        )
+
+    def save(self, path: str | Path) -> None:
+        # Temp file + rename: a reload never reads a half-written file
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                terms=self.terms,
+                indptr=self.indptr,
+                doc_ids=self.doc_ids,
+                tfs=self.tfs,
+                doc_len=self.doc_len,
+                params=np.array([self.k1, self.b]),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as z:
+            k1, b = (float(x) for x in z["params"])
+            return cls(z["terms"], z["indptr"], z["doc_ids"], z["tfs"], z["doc_len"], k1=k1, b=b)
+
+    def scores(self, query: str) -> np.ndarray:
+        out = np.zeros(self.n_docs, dtype=np.float32)
+        for term in set(lexical_tokens(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            docs = self.doc_ids[lo:hi]
+            tf = self.tfs[lo:hi]
+            # Postings of one term never repeat a doc, so fancy += is safe
+            out[docs] += self._idf[t] * tf * (self.k1 + 1.0) / (tf + self._norm[docs])
+        return out
+
+    def search(self, query: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, rows) with a positive score, best first."""
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return scores[hits], hits
+
+
+def rrf_fuse(rankings: List[Tuple[List[int], float]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Weighted reciprocal-rank fusion: each (ranked ids, weight) list adds
+    weight / (k + rank) to an id's score. Returns (id, score), best first.
+    """
+    fused: dict = {}
+    for ids, weight in rankings:
+        if weight <= 0:
+            continue
+        for rank, i in enumerate(ids, start=1):
+            fused[i] = fused.get(i, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda kv: -kv[1])
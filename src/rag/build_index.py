@@ -1,19 +1,273 @@
+import argparse
+import hashlib
 import json
+import os
+import pickle
+from datetime import datetime, timezone
+
 import numpy as np
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+
+from src.rag.backends import read_faiss_flat, write_faiss_flat
+from src.rag.bm25 import BM25Index
+from src.rag.embeddings import HASHING_MODEL, get_embedder
+from src.rag.manifest import content_hash, load_manifest, save_manifest
+from src.rag.quantized import write_quantized
 
 INDEX_DIR = Path("src/rag/index")
+MODELS_DIR = Path("models")
+
+# Deterministic local backend by default; set EMBED_MODEL to a
+# sentence-transformers model name to build a dense index instead.
+EMBED_MODEL = os.getenv("EMBED_MODEL", HASHING_MODEL)
+EMBED_DIM = int(os.getenv("EMBED_DIM", "256"))
+# Chunks embedded per call; bounds peak memory for very large corpora.
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "256"))
+# Compact copy of the vectors served by the retriever (int8 | float16 | none)
+KB_QUANTIZE = os.getenv("KB_QUANTIZE", "int8")
+
+def iter_chunks(path):
+    """Stream chunk records from chunks.jsonl."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                chunk = json.loads(line)
+                if "sha" not in chunk:
+                    chunk["sha"] = content_hash(chunk["text"])
+                yield chunk
+
+def iter_batches(chunks, size=None):
+    size = size or EMBED_BATCH
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _source_stamp(path, previous=None):
+    """
+    size, mtime_ns and sha256 of chunks.jsonl. The sha is only recomputed
+    when size or mtime differ from the previous stamp, so an untouched file
+    costs one stat().
+    """
+    st = path.stat()
+    stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if previous and all(previous.get(k) == v for k, v in stamp.items()):
+        return {**stamp, "sha": previous.get("sha")}
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return {**stamp, "sha": h.hexdigest()}
+
+def _ref(chunk):
+    return {k: chunk.get(k) for k in ("chunk_id", "doc_id", "source")}
+
+def _quantize(models_dir, embedder, rows):
+    """
+    kb_index.qvec + kb_index.jsonl: the vectors of kb_index.faiss quantized
+    (KB_QUANTIZE) with row metadata. Rewritten whole after every build; it is
+    one streaming pass with no embedding.
+    """
+    if KB_QUANTIZE == "none":
+        return
+    vectors, _ = read_faiss_flat(models_dir / "kb_index.faiss")
+    write_quantized(models_dir / "kb_index.qvec", vectors, rows, embedder.name, dtype=KB_QUANTIZE)
+    del vectors
+
+def _publish(index_dir, models_dir, chunks_path, embedder, rows, state, manifest):
+    """
+    Stage the row-aligned metadata (rows.json, kb_meta.pkl, meta.json) and
+    BM25 postings beside the live files, then rename them in together with
+    the staged vectors, so no reader pairs new vectors with old rows for
+    longer than a few renames. The quantized store follows; the manifest is
+    written last.
+    """
+    staged = [
+        (index_dir / "embeddings.tmp.npy", index_dir / "embeddings.npy"),
+        (models_dir / "kb_index.staged.faiss", models_dir / "kb_index.faiss"),
+    ]
+
+    def stage(path, data):
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        staged.append((tmp, path))
+
+    _build_lexical(index_dir / "bm25.staged.npz", chunks_path, state["chunks"], len(rows))
+    staged.append((index_dir / "bm25.staged.npz", index_dir / "bm25.npz"))
+    stage(index_dir / "rows.json", json.dumps(rows, ensure_ascii=False).encode("utf-8"))
+    meta = {
+        "model": embedder.name,
+        "dim": embedder.dim,
+        "count": sum(r is not None for r in rows),
+        "normalized": True,
+        "built_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+    }
+    stage(index_dir / "meta.json", json.dumps(meta).encode("utf-8"))
+    kb_meta = {"model": embedder.name, "dim": embedder.dim, "chunks": rows}
+    stage(models_dir / "kb_meta.pkl", pickle.dumps(kb_meta, protocol=pickle.HIGHEST_PROTOCOL))
+    for tmp, path in staged:
+        os.replace(tmp, path)
+    # The retriever ignores a .qvec older than kb_index.faiss, so the old
+    # store is never served against the new rows.
+    _quantize(models_dir, embedder, rows)
+    manifest["index"] = state
+    save_manifest(index_dir / "manifest.json", manifest)
+
+def _build_lexical(path, chunks_path, known, n_rows):
+    """BM25 postings over the same rows as the vector index (rebuilt whole; no embedding involved)."""
+    docs = ((known[c["chunk_id"]]["row"], c["text"]) for c in iter_chunks(chunks_path) if c["chunk_id"] in known)
+    BM25Index.build(docs, n_rows).save(path)
+
+def _full_build(chunks_path, embedder, index_dir, models_dir, manifest, source):
+    n = sum(1 for _ in iter_chunks(chunks_path))
+    # Rows are stored L2-normalized float32 so the retriever can mmap and
+    # score them directly. The file is preallocated and filled batch by batch,
+    # beside the live one: a serving process keeps its mapping of the old
+    # file until _publish renames it in.
+    tmp = index_dir / "embeddings.tmp.npy"
+    matrix = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(n, embedder.dim))
+    rows, known = [], {}
+    for batch in iter_batches(iter_chunks(chunks_path)):
+        start = len(rows)
+        matrix[start : start + len(batch)] = embedder.encode(c["text"] for c in batch)
+        for c in batch:
+            known[c["chunk_id"]] = {"sha": c["sha"], "row": len(rows)}
+            rows.append(_ref(c))
+    matrix.flush()
+    # Same vectors as a FAISS flat inner-product index (cosine on unit rows).
+    write_faiss_flat(models_dir / "kb_index.staged.faiss", matrix, metric="ip")
+    del matrix
+
+    state = {"model": embedder.name, "dim": embedder.dim, "chunks": known, "free": [], "source": source}
+    _publish(index_dir, models_dir, chunks_path, embedder, rows, state, manifest)
+    print(f"embedded {n} chunks (full build)")
+
+def _stage(index_dir, models_dir, n_rows, dim):
+    """
+    Copies of embeddings.npy and kb_index.faiss (grown to n_rows if needed),
+    made block by block, for the incremental pass to patch. Serving processes
+    keep mapping the live files, so their vectors always match the rows they
+    loaded; the copies replace them in one rename each.
+    """
+    old = np.load(index_dir / "embeddings.npy", mmap_mode="r")
+    staged = np.lib.format.open_memmap(
+        index_dir / "embeddings.tmp.npy", mode="w+", dtype=np.float32, shape=(max(n_rows, old.shape[0]), dim)
+    )
+    for start in range(0, old.shape[0], EMBED_BATCH):
+        staged[start : start + EMBED_BATCH] = old[start : start + EMBED_BATCH]
+    staged.flush()
+    del old
+    write_faiss_flat(models_dir / "kb_index.staged.faiss", staged, metric="ip")
+    return staged, read_faiss_flat(models_dir / "kb_index.staged.faiss", mode="r+")[0]
+
+def _up_to_date(index_dir, models_dir, chunks_path, embedder, state, manifest, source):
+    """No chunk changed: restore a missing BM25 or quantized file and record the new stamp."""
+    if not (index_dir / "bm25.npz").exists() or not (models_dir / "kb_index.qvec").exists():
+        rows = json.loads((index_dir / "rows.json").read_text(encoding="utf-8"))
+        if not (index_dir / "bm25.npz").exists():
+            _build_lexical(index_dir / "bm25.npz", chunks_path, state["chunks"], len(rows))
+        if not (models_dir / "kb_index.qvec").exists():
+            _quantize(models_dir, embedder, rows)
+    if state.get("source") != source:
+        state["source"] = source
+        save_manifest(index_dir / "manifest.json", manifest)
+    print(f"up to date: {len(state['chunks'])} chunks")
+    return False
+
+def main(index_dir=INDEX_DIR, models_dir=MODELS_DIR, full=False):
+    """
+    Incremental, streaming embedding build.
+
+    manifest.json maps chunk_id -> (sha, row). Chunks are streamed from
+    chunks.jsonl; only new or changed ones are embedded, EMBED_BATCH at a
+    time, and their rows are patched into copies of embeddings.npy and
+    kb_index.faiss that replace the live files together with the new row
+    metadata. Rows of deleted chunks are zeroed and tombstoned (null in
+    rows.json) and reused by later inserts. When chunks.jsonl matches the
+    stamp recorded in the manifest nothing is parsed at all. Returns True
+    if anything was rewritten.
+    """
+    index_dir, models_dir = Path(index_dir), Path(models_dir)
+    models_dir.mkdir(parents=True, exist_ok=True)
+    chunks_path = index_dir / "chunks.jsonl"
+
+    embedder = get_embedder(EMBED_MODEL, dim=EMBED_DIM)
+    manifest = load_manifest(index_dir / "manifest.json")
+    state = manifest.get("index")
+    artifacts = [index_dir / "embeddings.npy", index_dir / "rows.json", models_dir / "kb_index.faiss"]
+    if (
+        full
+        or not state
+        or state.get("model") != embedder.name
+        or state.get("dim") != embedder.dim
+        or not all(p.exists() for p in artifacts)
+    ):
+        _full_build(chunks_path, embedder, index_dir, models_dir, manifest, _source_stamp(chunks_path))
+        return True
+
+    source = _source_stamp(chunks_path, state.get("source"))
+    if source["sha"] == (state.get("source") or {}).get("sha"):
+        return _up_to_date(index_dir, models_dir, chunks_path, embedder, state, manifest, source)
+
+    # Pass 1: ids and shas only, to plan row assignments
+    known = state["chunks"]
+    seen, dirty = set(), set()
+    for c in iter_chunks(chunks_path):
+        seen.add(c["chunk_id"])
+        prev = known.get(c["chunk_id"])
+        if not prev or prev["sha"] != c["sha"]:
+            dirty.add(c["chunk_id"])
+    deleted = [cid for cid in known if cid not in seen]
+    if not deleted and not dirty:
+        return _up_to_date(index_dir, models_dir, chunks_path, embedder, state, manifest, source)
+
+    rows = json.loads((index_dir / "rows.json").read_text(encoding="utf-8"))
+    free = list(state["free"])
+    zeroed = []
+    for cid in deleted:
+        row = known.pop(cid)["row"]
+        rows[row] = None
+        free.append(row)
+        zeroed.append(row)
 
-def main():
-    chunks = json.loads((INDEX_DIR / "chunks.json").read_text(encoding="utf-8"))
-    texts = [c["text"] for c in chunks]
+    free.sort(reverse=True)
+    targets = {}
+    for cid in sorted(dirty):
+        if cid in known:
+            targets[cid] = known[cid]["row"]
+        elif free:
+            targets[cid] = free.pop()
+        else:
+            targets[cid] = len(rows)
+            rows.append(None)
 
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    embeddings = model.encode(texts, show_progress_bar=True, convert_to_numpy=True)
+    # Pass 2: embed dirty chunks batch by batch into staged copies of both files
+    matrix, flat = _stage(index_dir, models_dir, len(rows), embedder.dim)
+    for target in (matrix, flat):
+        target[zeroed] = 0.0
+    for batch in iter_batches(c for c in iter_chunks(chunks_path) if c["chunk_id"] in dirty):
+        vectors = embedder.encode(c["text"] for c in batch)
+        idx = [targets[c["chunk_id"]] for c in batch]
+        matrix[idx] = vectors
+        flat[idx] = vectors
+        for c in batch:
+            known[c["chunk_id"]] = {"sha": c["sha"], "row": targets[c["chunk_id"]]}
+            rows[targets[c["chunk_id"]]] = _ref(c)
+    matrix.flush()
+    flat.flush()
+    del matrix, flat
 
-    np.save(INDEX_DIR / "embeddings.npy", embeddings)
-    print(f"wrote embeddings → {INDEX_DIR / 'embeddings.npy'} for {len(texts)} chunks")
+    state["free"] = sorted(free)
+    state["source"] = source
+    _publish(index_dir, models_dir, chunks_path, embedder, rows, state, manifest)
+    print(f"embedded {len(dirty)} chunks, tombstoned {len(deleted)}, {len(free)} free rows")
+    return True
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Embed chunks.jsonl into embeddings.npy and kb_index.faiss.")
+    ap.add_argument("--full", action="store_true", help="re-embed everything and compact tombstones")
+    main(full=ap.parse_args().full)
@@ -0,0 +1,87 @@
+# src/rag/embeddings.py
+from __future__ import annotations
+
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Iterable, List
+
+import numpy as np
+
+HASHING_MODEL = "hashing-tf"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have if in is it of on or the to was were with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric tokens; '_' splits, so CARD_EXPIRED -> card, expired."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class HashingEmbedder:
+    """
+    Deterministic, dependency-free text embedder (hashed term frequencies).
+
+    Unigrams and bigrams are hashed with CRC32 into `dim` signed buckets and
+    weighted with sublinear TF (1 + log tf). No fitted vocabulary or IDF is
+    stored, so a chunk's vector never changes when other chunks do and tests
+    need no model download. Output rows are L2-normalized float32.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = int(dim)
+        self.name = HASHING_MODEL
+
+    def _features(self, text: str) -> Counter:
+        toks = tokenize(text)
+        feats = Counter(toks)
+        feats.update(f"{a} {b}" for a, b in zip(toks, toks[1:]))
+        return feats
+
+    def encode_one(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat, tf in self._features(text).items():
+            h = zlib.crc32(feat.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vec[h % self.dim] += sign * (1.0 + math.log(tf))
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def encode(self, texts: Iterable[str]) -> np.ndarray:
+        rows = [self.encode_one(t) for t in texts]
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack(rows)
+
+
+class SentenceTransformerEmbedder:
+    """Optional dense backend; sentence-transformers is imported on first use."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self._model = SentenceTransformer(model_name)
+        self.dim = int(self._model.get_sentence_embedding_dimension())
+
+    def encode(self, texts: Iterable[str]) -> np.ndarray:
+        out = self._model.encode(
+            list(texts), convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        )
+        return np.asarray(out, dtype=np.float32)
+
+    def encode_one(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+
+def get_embedder(model: str = HASHING_MODEL, dim: int = 256):
+    """Resolve the embedder recorded in an index's meta.json."""
+    if model == HASHING_MODEL:
+        return HashingEmbedder(dim=dim)
+    return SentenceTransformerEmbedder(model)
@@ -0,0 +1,42 @@
+# src/rag/manifest.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+MANIFEST_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: str | Path) -> Dict[str, Any]:
+    """Build state shared by rebuild_docs.py ("docs") and build_index.py ("index")."""
+    path = Path(path)
+    if not path.exists():
+        return {"version": MANIFEST_VERSION}
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        # Corrupt manifest: behave as if nothing was built yet
+        return {"version": MANIFEST_VERSION}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION}
+    return manifest
+
+
+def write_atomic(path: str | Path, data: str) -> None:
+    """Write via a temp file + rename so readers never see a partial file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(data, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def save_manifest(path: str | Path, manifest: Dict[str, Any]) -> None:
+    manifest["version"] = MANIFEST_VERSION
+    write_atomic(path, json.dumps(manifest, ensure_ascii=False, sort_keys=True))
@@ -0,0 +1,259 @@
+# src/rag/playbooks.py
+from __future__ import annotations
+
+import argparse
+import csv
+import pickle
+import re
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+MAPPINGS_CSV = ROOT_DIR / "src" / "mappings.csv"
+PLAYBOOKS_MD = ROOT_DIR / "agent_playbooks.md"
+KNOWLEDGE_DIR = ROOT_DIR / "knowledge"
+STORE_PATH = ROOT_DIR / "src" / "rag" / "index" / "playbooks.pkl"
+
+STORE_VERSION = 1
+
+# Built-in fallback playbook (works even without any files on disk)
+_PLAYBOOK_FALLBACK = {
+    "Payments": {
+        "refs": [
+            "docs/payments/gateway-checks.md",
+            "docs/payments/tokenization.md",
+            "runbooks/payments/common-failures.md",
+        ],
+        "steps": [
+            "Verify payment method is allowed for the account/location.",
+            "Check tokenization response (token present, not expired).",
+            "Confirm gateway credentials & merchant config in env.",
+            "Validate currency, amount format, and CVV/AVS rules.",
+            "Retry once if upstream 5xx; otherwise surface user-safe message.",
+        ],
+    },
+    "Auth": {
+        "refs": ["docs/auth/jwt-rotation.md", "runbooks/auth/401-403.md"],
+        "steps": [
+            "Check Authorization header present and Bearer token format.",
+            "Validate token exp/nbf and audience claims.",
+            "Confirm server clock skew and refresh token logic.",
+        ],
+    },
+    "Networking": {
+        "refs": ["docs/net/retries.md", "runbooks/net/timeouts.md"],
+        "steps": [
+            "Confirm upstream host resolves and is reachable.",
+            "Increase client timeout to >= 30s for heavy operations.",
+            "Enable exponential backoff with jitter on retries.",
+        ],
+    },
+    "Routing": {
+        "refs": ["docs/api/routing.md"],
+        "steps": [
+            "Check route path and HTTP method.",
+            "Ensure service registering route on startup (import side-effects).",
+        ],
+    },
+    "General": {
+        "refs": ["docs/oncall/triage-checklist.md"],
+        "steps": [
+            "Reproduce locally with same inputs.",
+            "Check recent deploys/feature flags.",
+            "Collect logs with correlation/request IDs.",
+        ],
+    },
+}
+
+
+# Per-code mappings.csv fields served with the steps
+_GUIDANCE_FIELDS = ("user_message", "action_type", "can_autofix", "severity")
+
+
+class Playbook(NamedTuple):
+    """refs and steps for a request, plus the code's mappings.csv guidance (None for an unknown code)."""
+
+    refs: List[str]
+    steps: List[str]
+    guidance: Optional[Dict[str, Any]] = None
+
+
+_STEP_PREFIX = re.compile(r"^\s*\d+[.)]\s*")
+
+
+def _lines(path: Path) -> List[str]:
+    return [line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def _split_steps(text: str) -> List[str]:
+    """"1) Do this;2) Then that" -> ["Do this", "Then that"]."""
+    return [_STEP_PREFIX.sub("", s).strip() for s in (text or "").split(";") if s.strip()]
+
+
+def parse_playbooks_md(text: str) -> Dict[str, List[str]]:
+    """
+    Numbered steps per "## NAME" section of agent_playbooks.md. A heading
+    such as "GATEWAY_TIMEOUT / NETWORK" is stored under each name.
+    """
+    sections: Dict[str, List[str]] = {}
+    names: List[str] = []
+    for line in text.splitlines():
+        if line.startswith("## "):
+            names = [n.strip().upper() for n in line[3:].split("/") if n.strip()]
+            for name in names:
+                sections.setdefault(name, [])
+        elif names and _STEP_PREFIX.match(line):
+            step = _STEP_PREFIX.sub("", line).strip()
+            for name in names:
+                sections[name].append(step)
+    return {name: steps for name, steps in sections.items() if steps}
+
+
+def _load_knowledge(knowledge_dir: Path, categories: Dict[str, Dict[str, Any]]) -> None:
+    """<stem>_refs.txt / <stem>_steps.txt override (or add) the category named like stem."""
+    by_lower = {name.lower(): name for name in categories}
+    for path in sorted(knowledge_dir.glob("*_refs.txt")) + sorted(knowledge_dir.glob("*_steps.txt")):
+        stem, kind = path.stem.rsplit("_", 1)
+        name = by_lower.setdefault(stem.lower(), stem.capitalize())
+        entry = categories.setdefault(name, {"refs": [], "steps": []})
+        try:
+            entry[kind] = _lines(path)
+        except Exception:
+            pass
+
+
+def _sources(mappings_csv, playbooks_md, knowledge_dir) -> List[Path]:
+    paths = [Path(p) for p in (mappings_csv, playbooks_md) if p]
+    if knowledge_dir and Path(knowledge_dir).exists():
+        paths.extend(sorted(Path(knowledge_dir).glob("*.txt")))
+    return paths
+
+
+class PlaybookStore:
+    """
+    Frozen playbooks keyed by provider code, classifier label and category.
+
+    - categories: bucket -> {refs, steps} (built-ins, overridden by knowledge/*.txt)
+    - sections:   label  -> steps from agent_playbooks.md (PAYMENT_METHOD_ERROR, ...)
+    - codes:      provider code -> {steps, category, severity, action_type, ...}
+                  from mappings.csv
+
+    resolve() walks code -> code's label -> category -> General with O(1)
+    dict lookups; steps come from the most specific level that has them.
+    """
+
+    def __init__(
+        self,
+        categories: Mapping[str, Dict[str, Any]],
+        sections: Optional[Mapping[str, List[str]]] = None,
+        codes: Optional[Mapping[str, Dict[str, Any]]] = None,
+    ):
+        self.categories = MappingProxyType(dict(categories))
+        self.sections = MappingProxyType(dict(sections or {}))
+        self.codes = MappingProxyType(dict(codes or {}))
+
+    @classmethod
+    def build(
+        cls,
+        mappings_csv: Optional[str | Path] = None,
+        playbooks_md: Optional[str | Path] = None,
+        knowledge_dir: Optional[str | Path] = None,
+    ) -> "PlaybookStore":
+        categories = {name: {"refs": list(e["refs"]), "steps": list(e["steps"])} for name, e in _PLAYBOOK_FALLBACK.items()}
+        if knowledge_dir and Path(knowledge_dir).exists():
+            _load_knowledge(Path(knowledge_dir), categories)
+
+        sections: Dict[str, List[str]] = {}
+        if playbooks_md and Path(playbooks_md).exists():
+            sections = parse_playbooks_md(Path(playbooks_md).read_text(encoding="utf-8"))
+
+        codes: Dict[str, Dict[str, Any]] = {}
+        if mappings_csv and Path(mappings_csv).exists():
+            with open(mappings_csv, encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    code = (row.get("provider_code") or "").strip().upper()
+                    if not code:
+                        continue
+                    codes[code] = {
+                        "steps": _split_steps(row.get("agent_steps", "")),
+                        "category": (row.get("category") or "").strip().upper(),
+                        "severity": (row.get("severity") or "").strip() or None,
+                        "action_type": (row.get("action_type") or "").strip() or None,
+                        "can_autofix": (row.get("can_autofix") or "").strip().lower() == "true",
+                        "user_message": (row.get("user_message") or "").strip() or None,
+                    }
+
+        return cls(categories, sections, codes)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Plain-dict form (picklable); PlaybookStore(**store.as_dict()) rebuilds it."""
+        return {
+            "categories": dict(self.categories),
+            "sections": dict(self.sections),
+            "codes": dict(self.codes),
+        }
+
+    def save(self, path: str | Path) -> None:
+        """One pickle of plain dicts; written via temp file + rename."""
+        path = Path(path)
+        data = {"version": STORE_VERSION, **self.as_dict()}
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "PlaybookStore":
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != STORE_VERSION:
+            raise ValueError(f"{path}: unsupported playbook store version {data.get('version')}")
+        return cls(data["categories"], data["sections"], data["codes"])
+
+    @classmethod
+    def open(
+        cls,
+        path: Optional[str | Path] = None,
+        mappings_csv: Optional[str | Path] = None,
+        playbooks_md: Optional[str | Path] = None,
+        knowledge_dir: Optional[str | Path] = None,
+    ) -> "PlaybookStore":
+        """
+        The compiled artifact if it exists and is newer than every source
+        (make-style, stat calls only); otherwise build from the sources in memory.
+        """
+        if path and Path(path).exists():
+            built = Path(path).stat().st_mtime_ns
+            sources = _sources(mappings_csv, playbooks_md, knowledge_dir)
+            if all(not p.exists() or p.stat().st_mtime_ns <= built for p in sources):
+                try:
+                    return cls.load(path)
+                except Exception:
+                    pass
+        return cls.build(mappings_csv, playbooks_md, knowledge_dir)
+
+    def category(self, category: str) -> Dict[str, Any]:
+        return self.categories.get(category) or self.categories["General"]
+
+    def resolve(self, error_code: str, category: str) -> Playbook:
+        """Playbook for a request: code -> code's label -> category -> General."""
+        base = self.category(category)
+        entry = self.codes.get((error_code or "").strip().upper())
+        if entry is None:
+            return Playbook(base["refs"], base["steps"])
+        steps = entry["steps"] or self.sections.get(entry["category"]) or base["steps"]
+        return Playbook(base["refs"], steps, {k: entry.get(k) for k in _GUIDANCE_FIELDS})
+
+
+def main(out=STORE_PATH):
+    store = PlaybookStore.build(MAPPINGS_CSV, PLAYBOOKS_MD, KNOWLEDGE_DIR)
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    store.save(out)
+    print(f"wrote {len(store.codes)} codes, {len(store.sections)} sections, {len(store.categories)} categories → {out}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compile mappings.csv, agent_playbooks.md and knowledge/ into one store.")
+    ap.add_argument("--out", default=str(STORE_PATH))
+    main(ap.parse_args().out)
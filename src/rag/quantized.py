@@ -0,0 +1,217 @@
+# src/rag/quantized.py
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from src.rag.backends import top_k
+
+# magic, version, dtype code, reserved, dim, ntotal, then byte offsets of the
+# vectors, the per-row scales (0 for float16) and the row offset table, and
+# the length of the JSON info block that follows the header.
+_MAGIC = b"KBQV"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHBBIQQQQI")
+_DTYPES = {1: "int8", 2: "float16"}
+_CODES = {name: code for code, name in _DTYPES.items()}
+_ALIGN = 64
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def quantize(block: np.ndarray, dtype: str = "int8") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    (codes, scales) for a float32 block. int8 is symmetric per row:
+    codes = round(x / scale) with scale = max|x| / 127, so x ~ codes * scale.
+    float16 needs no scales.
+    """
+    block = np.asarray(block, dtype=np.float32)
+    if dtype == "float16":
+        return block.astype(np.float16), None
+    if dtype != "int8":
+        raise ValueError(f"unknown quantized dtype {dtype!r}")
+    scales = np.abs(block).max(axis=1) / 127.0 if len(block) else np.zeros(0, dtype=np.float32)
+    scales[scales == 0] = 1.0  # zeroed (tombstoned) rows
+    codes = np.clip(np.rint(block / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def write_quantized(
+    path: str | Path,
+    vectors: np.ndarray,
+    rows: Iterable[Optional[Dict[str, Any]]],
+    model: str,
+    dtype: str = "int8",
+    rows_path: Optional[str | Path] = None,
+    block_rows: int = 4096,
+) -> None:
+    """
+    Write vectors as a quantized store plus its row metadata: one JSON line
+    per row ("null" for a tombstone) in rows_path (default: <path>.jsonl),
+    addressed through a uint64 offset table in the store. Rows are
+    quantized block by block, so a memory-mapped source is never fully
+    loaded. Both files are written via temp file + rename.
+    """
+    path = Path(path)
+    rows_path = Path(rows_path) if rows_path else path.with_suffix(".jsonl")
+    ntotal, dim = vectors.shape
+
+    offsets = np.zeros(ntotal + 1, dtype=np.uint64)
+    tmp_rows = rows_path.with_name(rows_path.name + ".tmp")
+    count = 0
+    with open(tmp_rows, "wb") as f:
+        for row in rows:
+            if count == ntotal:
+                raise ValueError(f"more rows than the {ntotal} vectors")
+            f.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+            count += 1
+            offsets[count] = f.tell()
+    if count != ntotal:
+        raise ValueError(f"{ntotal} vectors for {count} rows")
+
+    info = json.dumps({"model": model, "dim": dim, "dtype": dtype, "rows": rows_path.name}).encode("utf-8")
+    itemsize = np.dtype(dtype).itemsize
+    vectors_off = _aligned(_HEADER.size + len(info))
+    scales_off = _aligned(vectors_off + ntotal * dim * itemsize) if dtype == "int8" else 0
+    offsets_off = _aligned((scales_off + ntotal * 4) if scales_off else vectors_off + ntotal * dim * itemsize)
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(
+            _HEADER.pack(_MAGIC, _VERSION, _CODES[dtype], 0, dim, ntotal, vectors_off, scales_off, offsets_off, len(info))
+        )
+        f.write(info)
+        f.seek(vectors_off)
+        all_scales = []
+        for start in range(0, ntotal, block_rows):
+            codes, scales = quantize(vectors[start : start + block_rows], dtype)
+            f.write(codes.tobytes())
+            if scales is not None:
+                all_scales.append(scales)
+        if scales_off:
+            f.seek(scales_off)
+            for scales in all_scales:
+                f.write(scales.tobytes())
+        f.seek(offsets_off)
+        f.write(offsets.tobytes())
+    os.replace(tmp_rows, rows_path)
+    os.replace(tmp, path)
+
+
+class RowTable(Sequence):
+    """
+    Row metadata read on demand: the JSONL file is memory-mapped and a row is
+    decoded only when a search hit needs it, so nothing is parsed at load.
+    """
+
+    def __init__(self, path: str | Path, offsets: np.ndarray):
+        self.path = Path(path)
+        self._offsets = offsets
+        with open(self.path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return json.loads(self._data[start:end])
+
+
+def read_quantized(path: str | Path) -> Tuple[Dict[str, Any], np.ndarray, Optional[np.ndarray], RowTable]:
+    """
+    (info, codes, scales, rows) of a quantized store; codes, scales and the
+    offset table are memory-mapped straight out of the file.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            raise ValueError(f"{path} is not a quantized index")
+        magic, version, code, _, dim, ntotal, vectors_off, scales_off, offsets_off, info_len = _HEADER.unpack(raw)
+        if magic != _MAGIC or version != _VERSION or code not in _DTYPES:
+            raise ValueError(f"{path}: unsupported quantized index ({magic!r} v{version})")
+        info = json.loads(f.read(info_len))
+
+    dtype = _DTYPES[code]
+    if ntotal:
+        codes = np.memmap(path, dtype=dtype, mode="r", offset=vectors_off, shape=(ntotal, dim))
+        scales = np.memmap(path, dtype=np.float32, mode="r", offset=scales_off, shape=(ntotal,)) if scales_off else None
+    else:
+        codes, scales = np.zeros((0, dim), dtype=dtype), None
+    offsets = np.memmap(path, dtype=np.uint64, mode="r", offset=offsets_off, shape=(ntotal + 1,))
+    rows = RowTable(path.with_name(info["rows"]), offsets)
+    return info, codes, scales, rows
+
+
+class QuantizedBackend:
+    """
+    Brute-force inner-product search over int8 (per-row scale) or float16
+    rows; 4x / 2x less memory than the float32 matrix. Blocks of rows are
+    widened to float32 only while they are scored.
+
+    With `rescore` (the float32 matrix, usually memory-mapped) the best
+    k * rescore_factor candidates are re-scored exactly, so ranks and scores
+    match the float32 index whenever the true top k are among them; only
+    those candidate rows of the float32 matrix are ever paged in.
+    """
+
+    metric = "ip"
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        scales: Optional[np.ndarray] = None,
+        rescore: Optional[np.ndarray] = None,
+        rescore_factor: int = 4,
+        block_rows: int = 4096,
+    ):
+        self.codes = codes
+        self.scales = scales
+        self.ntotal, self.dim = codes.shape
+        if rescore is not None and rescore.shape != codes.shape:
+            raise ValueError(f"rescore matrix {rescore.shape} != quantized {codes.shape}")
+        self.rescore = rescore
+        self.rescore_factor = max(1, int(rescore_factor))
+        self.block_rows = block_rows
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((len(queries), self.ntotal), dtype=np.float32)
+        for start in range(0, self.ntotal, self.block_rows):
+            end = start + self.block_rows
+            block = queries @ self.codes[start:end].astype(np.float32).T
+            if self.scales is not None:
+                block *= self.scales[start:end]
+            scores[:, start:end] = block
+        return scores
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, self.ntotal)
+        if self.rescore is None or k <= 0:
+            return top_k(self._scores(queries), k)
+
+        _, ids = top_k(self._scores(queries), min(self.ntotal, k * self.rescore_factor))
+        # Each candidate row is read once (in file order) however many queries share it
+        unique, inverse = np.unique(ids, return_inverse=True)
+        candidates = np.asarray(self.rescore[unique], dtype=np.float32)
+        exact = np.einsum("qd,qcd->qc", queries, candidates[inverse.reshape(ids.shape)])
+        scores, order = top_k(exact, k)
+        return scores, np.take_along_axis(ids, order, axis=1)
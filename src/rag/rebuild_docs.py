@@ -1,57 +1,160 @@
-import json, re
+import argparse
+import hashlib
+import json
+import os
 from pathlib import Path
 
+from src.rag.manifest import content_hash, load_manifest, save_manifest
+
 KB_DIR = Path("src/rag/kb")
 INDEX_DIR = Path("src/rag/index")
 INDEX_DIR.mkdir(parents=True, exist_ok=True)
 
-def split_into_chunks(text, max_len=600):
-    # simple split on headings/paragraphs; you can refine later
-    parts = re.split(r"\n{2,}", text.strip())
-    buf, chunks = [], []
-    for p in parts:
-        if len("\n\n".join(buf + [p])) > max_len and buf:
-            chunks.append("\n\n".join(buf))
-            buf = [p]
+def iter_paragraphs(lines):
+    """Paragraphs from an iterable of lines; blank lines separate them."""
+    buf = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if line:
+            buf.append(line)
+        elif buf:
+            yield "\n".join(buf)
+            buf = []
+    if buf:
+        yield "\n".join(buf)
+
+def iter_chunks(paragraphs, max_len=600):
+    """
+    Greedy packing of paragraphs into chunks of at most max_len characters
+    (a single longer paragraph becomes its own chunk). Keeps a running length
+    instead of re-joining the buffer, so it is linear in the input.
+    """
+    buf, size = [], 0
+    for p in paragraphs:
+        joined = size + (2 if buf else 0) + len(p)
+        if joined > max_len and buf:
+            chunk = "\n\n".join(buf).strip()
+            if chunk:
+                yield chunk
+            buf, size = [p], len(p)
         else:
             buf.append(p)
+            size = joined
     if buf:
-        chunks.append("\n\n".join(buf))
-    return [c.strip() for c in chunks if c.strip()]
-
-def main():
-    docs_path = INDEX_DIR / "docs.jsonl"
-    chunks_path = INDEX_DIR / "chunks.json"
-
-    all_docs = []
-    all_chunks = []
-
-    for md in KB_DIR.glob("*.md"):
-        text = md.read_text(encoding="utf-8")
-        doc = {
-            "id": md.stem,
-            "source": str(md),
-            "text": text
-        }
-        all_docs.append(doc)
-
-        for i, chunk in enumerate(split_into_chunks(text)):
-            all_chunks.append({
-                "doc_id": md.stem,
-                "source": str(md),
-                "chunk_id": f"{md.stem}#{i}",
-                "text": chunk
-            })
-
-    with open(docs_path, "w", encoding="utf-8") as f:
-        for d in all_docs:
-            f.write(json.dumps(d, ensure_ascii=False) + "\n")
-
-    with open(chunks_path, "w", encoding="utf-8") as f:
-        json.dump(all_chunks, f, ensure_ascii=False, indent=2)
-
-    print(f"wrote {len(all_docs)} docs → {docs_path}")
-    print(f"wrote {len(all_chunks)} chunks → {chunks_path}")
+        chunk = "\n\n".join(buf).strip()
+        if chunk:
+            yield chunk
+
+def split_into_chunks(text, max_len=600):
+    # simple split on headings/paragraphs; you can refine later
+    return list(iter_chunks(iter_paragraphs(text.strip().splitlines()), max_len))
+
+def _file_sha(path):
+    h = hashlib.sha256()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            h.update(line.encode("utf-8"))
+    return h.hexdigest()
+
+def _iter_jsonl(path):
+    if not path.exists():
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+def main(kb_dir=KB_DIR, index_dir=INDEX_DIR, full=False, max_len=600):
+    """
+    Incremental, streaming rebuild of docs.jsonl and chunks.jsonl.
+
+    Each markdown file is fingerprinted (mtime/size, then sha256 of the text)
+    in manifest.json; only files whose content changed are re-chunked, and
+    every chunk carries a sha so build_index.py re-embeds just those. Files
+    are read line by line and outputs written record by record, so memory
+    stays bounded by the largest single document. Returns True if anything
+    was rewritten.
+    """
+    kb_dir, index_dir = Path(kb_dir), Path(index_dir)
+    docs_path = index_dir / "docs.jsonl"
+    chunks_path = index_dir / "chunks.jsonl"
+    manifest_path = index_dir / "manifest.json"
+
+    manifest = load_manifest(manifest_path)
+    known = {} if full or not chunks_path.exists() else manifest.get("docs", {})
+
+    state = {}
+    changed = set()
+    for md in sorted(kb_dir.glob("*.md")):
+        st = md.stat()
+        prev = known.get(md.stem)
+        # Fast path: same mtime and size means we don't even read the file
+        if prev and prev["mtime_ns"] == st.st_mtime_ns and prev["size"] == st.st_size:
+            state[md.stem] = prev
+            continue
+        entry = {"source": md.as_posix(), "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha": _file_sha(md)}
+        state[md.stem] = entry
+        if not prev or prev["sha"] != entry["sha"]:
+            changed.add(md.stem)
+
+    removed = set(known) - set(state)
+    if not changed and not removed:
+        if state != known:
+            # Touched but identical files: remember the new mtimes
+            manifest["docs"] = state
+            save_manifest(manifest_path, manifest)
+        print(f"up to date: {len(state)} docs")
+        return False
+
+    keep = {doc_id for doc_id in state if doc_id not in changed}
+    n_docs = n_chunks = 0
+    docs_tmp = docs_path.with_name(docs_path.name + ".tmp")
+    chunks_tmp = chunks_path.with_name(chunks_path.name + ".tmp")
+    with open(docs_tmp, "w", encoding="utf-8") as docs_out, open(chunks_tmp, "w", encoding="utf-8") as chunks_out:
+        # Unchanged docs: copy their records over without re-chunking
+        copied = set()
+        for line in _iter_jsonl(docs_path):
+            doc_id = json.loads(line)["id"]
+            if doc_id in keep:
+                docs_out.write(line)
+                copied.add(doc_id)
+                n_docs += 1
+        for line in _iter_jsonl(chunks_path):
+            if json.loads(line)["doc_id"] in copied:
+                chunks_out.write(line)
+                n_chunks += 1
+
+        # Changed docs (and any unchanged doc missing from the old outputs)
+        for doc_id, entry in state.items():
+            if doc_id in copied:
+                continue
+            source = entry["source"]
+            text = Path(source).read_text(encoding="utf-8")
+            docs_out.write(json.dumps({"id": doc_id, "source": source, "text": text}, ensure_ascii=False) + "\n")
+            n_docs += 1
+            with open(source, encoding="utf-8") as f:
+                for i, chunk in enumerate(iter_chunks(iter_paragraphs(f), max_len)):
+                    record = {
+                        "doc_id": doc_id,
+                        "source": source,
+                        "chunk_id": f"{doc_id}#{i}",
+                        "sha": content_hash(chunk),
+                        "text": chunk,
+                    }
+                    chunks_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    n_chunks += 1
+
+    os.replace(docs_tmp, docs_path)
+    os.replace(chunks_tmp, chunks_path)
+    manifest["docs"] = state
+    save_manifest(manifest_path, manifest)
+
+    print(f"re-chunked {len(changed)} docs, removed {len(removed)}")
+    print(f"wrote {n_docs} docs → {docs_path}")
+    print(f"wrote {n_chunks} chunks → {chunks_path}")
+    return True
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Rebuild docs.jsonl/chunks.jsonl from the markdown KB.")
+    ap.add_argument("--full", action="store_true", help="ignore the manifest and re-chunk everything")
+    main(full=ap.parse_args().full)
@@ -1,17 +1,68 @@
 # src/rag/responder.py
 
+import asyncio
+import hashlib
 import os
+import re
+from typing import AsyncIterator, Optional, Tuple
+
 from dotenv import load_dotenv
 
-# Make OpenAI optional: if import fails or no key, we fall back gracefully.
-try:
-    from openai import OpenAI  # openai >= 1.x
-except Exception:
-    OpenAI = None  # type: ignore
+from src.core.cache import TTLCache
+from src.core.singleflight import SingleFlight
+from src.rag.semantic_cache import SemanticCache
 
 load_dotenv()
 
+# The openai SDK (and httpx under it) is a quarter of a cold start, and
+# requests without an API key never need it: import it on first LLM use.
+_openai_sdk = None
+
+
+def _openai():
+    """The openai module (>= 1.x), or None if it is not installed."""
+    global _openai_sdk
+    if _openai_sdk is None:
+        try:
+            import openai
+            _openai_sdk = openai
+        except Exception:
+            _openai_sdk = False
+    return _openai_sdk or None
+
+
 class Responder:
+    def __init__(self):
+        # Summaries are keyed on (category, severity, error_code, snippets
+        # digest, query), the query lower-cased with whitespace collapsed, so
+        # a repeated failure reuses its LLM answer.
+        self.summary_cache = TTLCache(
+            maxsize=int(os.getenv("SUMMARY_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("SUMMARY_CACHE_TTL", "600")),
+        )
+        # Behind it, LLM answers matched by query similarity within the same
+        # (category, severity, error_code, snippets digest) scope: a query
+        # differing only in amounts, ids, refs or times reuses the answer.
+        # SEMANTIC_CACHE_SIZE=0 disables it.
+        self.semantic_cache = SemanticCache(
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+            maxsize=int(os.getenv("SEMANTIC_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "600")),
+        )
+        # Async LLM path: one pooled client, a cap on in-flight calls and a
+        # per-request deadline after which we answer with the fallback.
+        self.llm_max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.llm_timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "10"))
+        # Streaming: a gap longer than this between tokens switches the
+        # stream to the local fallback summary.
+        self.llm_stall_timeout = float(os.getenv("LLM_STREAM_STALL_SECONDS", "3"))
+        self._async_client = None
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        # Identical summary requests arriving together share one LLM call.
+        self._flights = SingleFlight()
+        # Outcome counts of async LLM calls (read by /support/metrics)
+        self.llm_outcomes = {"ok": 0, "empty": 0, "timeout": 0, "error": 0, "disabled": 0, "stalled": 0}
+
     @staticmethod
     def _fallback_response(query: str, snippets: list[str]) -> str:
         """
@@ -46,48 +97,245 @@ class Responder:
         Original signature preserved. Uses OpenAI if available,
         otherwise falls back to a local synthesis.
         """
+        return Responder.generate_summary(query, snippets)[0]
+
+    @staticmethod
+    def generate_summary(query: str, snippets: list[str]) -> Tuple[str, bool]:
+        """
+        (text, True) for an LLM answer; (fallback text, False) without a key
+        or the SDK, on an empty answer or on an API error. The fallback
+        quotes the query (the customer's message), so callers must not
+        cache it under a key that leaves the message out.
+        """
         model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         api_key = os.getenv("OPENAI_API_KEY", "")
 
-        # If OpenAI isn't importable or no key is set, return fallback text.
-        if not OpenAI or not api_key:
-            return Responder._fallback_response(query, snippets)
+        # If no key is set or OpenAI isn't importable, return fallback text.
+        openai = _openai() if api_key else None
+        if openai is None:
+            return Responder._fallback_response(query, snippets), False
 
         try:
             # Both styles work in openai>=1.x; pass key explicitly to stay explicit.
-            client = OpenAI(api_key=api_key)
-
-            prompt = (
-                "You are a precise support assistant. "
-                "Given an error/query and relevant support snippets, produce a concise, actionable response. "
-                "Use bullet points, avoid fluff, and call out concrete checks/fixes.\n\n"
-                f"User query:\n{query}\n\n"
-                "Relevant support snippets:\n"
-            )
-            for i, snippet in enumerate(snippets or [], start=1):
-                clean = (snippet or "").strip()
-                if len(clean) > 800:
-                    clean = clean[:800].rstrip() + " ..."
-                prompt += f"{i}. {clean}\n"
-            prompt += (
-                "\nNow provide the best possible short, actionable response for the user. "
-                "If data is missing, say what to collect next."
-            )
+            client = openai.OpenAI(api_key=api_key)
 
             resp = client.chat.completions.create(
                 model=model,
                 messages=[
                     {"role": "system", "content": "You are a support assistant that writes crisp, step-by-step guidance."},
-                    {"role": "user", "content": prompt},
+                    {"role": "user", "content": Responder._build_prompt(query, snippets)},
                 ],
                 temperature=0.3,
             )
             content = (resp.choices[0].message.content or "").strip()
-            return content if content else Responder._fallback_response(query, snippets)
+            if content:
+                return content, True
+            return Responder._fallback_response(query, snippets), False
 
         except Exception:
             # Any API hiccup falls back to a deterministic local summary.
-            return Responder._fallback_response(query, snippets)
+            return Responder._fallback_response(query, snippets), False
+
+    @staticmethod
+    def _build_prompt(query: str, snippets: list[str]) -> str:
+        prompt = (
+            "You are a precise support assistant. "
+            "Given an error/query and relevant support snippets, produce a concise, actionable response. "
+            "Use bullet points, avoid fluff, and call out concrete checks/fixes.\n\n"
+            f"User query:\n{query}\n\n"
+            "Relevant support snippets:\n"
+        )
+        for i, snippet in enumerate(snippets or [], start=1):
+            clean = (snippet or "").strip()
+            if len(clean) > 800:
+                clean = clean[:800].rstrip() + " ..."
+            prompt += f"{i}. {clean}\n"
+        prompt += (
+            "\nNow provide the best possible short, actionable response for the user. "
+            "If data is missing, say what to collect next."
+        )
+        return prompt
+
+    # ---------------------------
+    # ASYNC LLM PATH
+    # ---------------------------
+    def _get_async_client(self):
+        """Shared AsyncOpenAI client; None when the SDK or the key is missing."""
+        if self._async_client is None:
+            api_key = os.getenv("OPENAI_API_KEY", "")
+            openai = _openai() if api_key else None
+            if openai is None:
+                return None
+            import httpx
+
+            limits = httpx.Limits(
+                max_connections=self.llm_max_concurrency,
+                max_keepalive_connections=self.llm_max_concurrency,
+            )
+            self._async_client = openai.AsyncOpenAI(
+                api_key=api_key,
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(limits=limits),
+            )
+        return self._async_client
+
+    async def startup(self) -> None:
+        """Create the pooled client up front (called from the app lifespan)."""
+        self._get_async_client()
+        self._llm_slots = asyncio.Semaphore(self.llm_max_concurrency)
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    def _messages(self, query: str, snippets: list[str]) -> list[dict]:
+        return [
+            {"role": "system", "content": "You are a support assistant that writes crisp, step-by-step guidance."},
+            {"role": "user", "content": self._build_prompt(query, snippets)},
+        ]
+
+    async def _call_llm(self, client, query: str, snippets: list[str]) -> str:
+        if self._llm_slots is None:
+            self._llm_slots = asyncio.Semaphore(self.llm_max_concurrency)
+        async with self._llm_slots:
+            resp = await client.chat.completions.create(
+                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+                messages=self._messages(query, snippets),
+                temperature=0.3,
+            )
+        return (resp.choices[0].message.content or "").strip()
+
+    async def agenerate_response(self, query: str, snippets: list[str]) -> str:
+        """Async counterpart of generate_response."""
+        return (await self.agenerate_summary(query, snippets))[0]
+
+    async def agenerate_summary(self, query: str, snippets: list[str]) -> Tuple[str, bool]:
+        """
+        Async counterpart of generate_summary: (text, True) only for an LLM
+        answer. Waiting for a free slot counts against the deadline, so a
+        saturated upstream degrades to the fallback instead of queueing
+        requests indefinitely.
+        """
+        client = self._get_async_client()
+        if client is None:
+            self.llm_outcomes["disabled"] += 1
+            return self._fallback_response(query, snippets), False
+        try:
+            content = await asyncio.wait_for(
+                self._call_llm(client, query, snippets), timeout=self.llm_timeout
+            )
+        except asyncio.TimeoutError:
+            self.llm_outcomes["timeout"] += 1
+            return self._fallback_response(query, snippets), False
+        except Exception:
+            # API hiccup: deterministic local summary.
+            self.llm_outcomes["error"] += 1
+            return self._fallback_response(query, snippets), False
+        self.llm_outcomes["ok" if content else "empty"] += 1
+        if content:
+            return content, True
+        return self._fallback_response(query, snippets), False
+
+    # ---------------------------
+    # STREAMING
+    # ---------------------------
+    @staticmethod
+    def _pieces(text: str) -> list[str]:
+        # Word-sized pieces (whitespace kept) for text we stream ourselves
+        return re.findall(r"\s*\S+\s*", text) or [text]
+
+    async def astream_summary(
+        self,
+        query: str,
+        snippets: list[str],
+        category: str,
+        severity: str,
+        error_code: str,
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Summary as ("token", text) events while it is generated. A cached
+        summary, or the fallback when there is no client, is streamed as
+        word-sized pieces (the local stand-in). If the upstream stalls for
+        llm_stall_timeout, errors, or runs past llm_timeout, a
+        ("fallback", reason) event is yielded and the fallback summary
+        follows: it replaces the tokens already sent. Only complete LLM
+        answers are cached.
+        """
+        key = self._summary_key(category, severity, error_code, snippets, query)
+        cached = self._cached(key, query)
+        if cached is not None:
+            for piece in self._pieces(cached):
+                yield "token", piece
+            return
+
+        client = self._get_async_client()
+        if client is None:
+            self.llm_outcomes["disabled"] += 1
+            summary = self._fallback_response(query, snippets)
+            for piece in self._pieces(summary):
+                yield "token", piece
+            return
+
+        if self._llm_slots is None:
+            self._llm_slots = asyncio.Semaphore(self.llm_max_concurrency)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.llm_timeout
+        parts: list[str] = []
+        reason = None
+        stream = None
+        completed = False
+        try:
+            async with self._llm_slots:
+                stream = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+                        messages=self._messages(query, snippets),
+                        temperature=0.3,
+                        stream=True,
+                    ),
+                    timeout=max(0.0, deadline - loop.time()),
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    wait = min(self.llm_stall_timeout, deadline - loop.time())
+                    if wait <= 0:
+                        reason = "timeout"
+                        break
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=wait)
+                    except StopAsyncIteration:
+                        completed = True
+                        break
+                    except asyncio.TimeoutError:
+                        reason = "stalled" if wait >= self.llm_stall_timeout else "timeout"
+                        break
+                    choices = getattr(chunk, "choices", None) or []
+                    text = (choices[0].delta.content or "") if choices else ""
+                    if text:
+                        parts.append(text)
+                        yield "token", text
+        except asyncio.TimeoutError:
+            reason = "timeout"
+        except Exception:
+            reason = "error"
+        finally:
+            # Stalled, failed, or the client went away: release the connection
+            close = getattr(stream, "close", None)
+            if not completed and close is not None:
+                try:
+                    await close()
+                except Exception:
+                    pass
+
+        if reason is None and "".join(parts).strip():
+            self.llm_outcomes["ok"] += 1
+            self._remember(key, query, "".join(parts).strip(), True)
+            return
+        self.llm_outcomes[reason or "empty"] += 1
+        yield "fallback", reason or "empty"
+        for piece in self._pieces(self._fallback_response(query, snippets)):
+            yield "token", piece
 
     def generate(
         self,
@@ -100,13 +348,34 @@ class Responder:
         message: str,
         trace: str,
         context: dict,
+        classification: dict | None = None,
+        guidance: dict | None = None,
     ) -> dict:
         """
         Adapter so main.py can call responder.generate(...).
-        We reuse your generate_response(query, snippets) internally.
+        Deterministic only: the LLM is never called here. Summaries are an
+        explicit, opt-in stage (see compose() and summarize()).
         """
+        return self.build_payload(
+            error_code, category, severity, signals, steps, references, message, classification, guidance
+        )
+
+    @staticmethod
+    def _query(error_code: str, category: str, severity: str, message: str) -> str:
         # Build a compact query for your LLM/fallback
-        query = f"[{category}/{severity}] {error_code} :: {message or 'No message'}"
+        return f"[{category}/{severity}] {error_code} :: {message or 'No message'}"
+
+    @staticmethod
+    def compose(
+        error_code: str,
+        category: str,
+        severity: str,
+        message: str,
+        steps: list[str],
+        references: list[str],
+    ) -> tuple[str, list[str]]:
+        """Build the (query, snippets) pair fed to generate_response."""
+        query = Responder._query(error_code, category, severity, message)
 
         # Reuse steps + refs as the snippets
         snippets: list[str] = []
@@ -114,11 +383,108 @@ class Responder:
             snippets.append("Suggested Steps:\n- " + "\n- ".join(steps))
         if references:
             snippets.append("References:\n- " + "\n- ".join(references))
+        return query, snippets
 
-        # Use your existing method (LLM or fallback)
-        _ = self.generate_response(query=query, snippets=snippets)
+    @staticmethod
+    def _digest(snippets: list[str]) -> str:
+        return hashlib.blake2b("\x1f".join(snippets).encode("utf-8"), digest_size=16).hexdigest()
 
-        # Return the structure expected by DiagnoseResponse
+    @staticmethod
+    def _summary_key(category: str, severity: str, error_code: str, snippets: list[str], query: str) -> tuple:
+        code = (error_code or "").upper().strip()
+        return (category, severity, code, Responder._digest(snippets), Responder._squash(query))
+
+    @staticmethod
+    def _squash(query: str) -> str:
+        return " ".join((query or "").lower().split())
+
+    @staticmethod
+    def _flight_key(query: str, snippets: list[str]) -> tuple:
+        return (Responder._squash(query), Responder._digest(snippets))
+
+    @staticmethod
+    def _semantic_scope(key: tuple) -> tuple:
+        # The summary key minus the query: near-duplicates are matched within it
+        return key[:-1]
+
+    def _cached(self, key: tuple, query: str) -> Optional[str]:
+        """Exact summary-cache hit, else a near-duplicate query's summary."""
+        cached = self.summary_cache.get(key)
+        if cached is None and self.semantic_cache.enabled:
+            cached = self.semantic_cache.get(query, self._semantic_scope(key))
+            if cached is not None:
+                self.summary_cache.set(key, cached)
+        return cached
+
+    def _remember(self, key: tuple, query: str, summary: str, ok: bool) -> None:
+        """Cache an LLM answer (ok from the generator); a fallback is never kept."""
+        if not ok:
+            return
+        self.summary_cache.set(key, summary)
+        self.semantic_cache.put(query, self._semantic_scope(key), summary)
+
+    def summarize(
+        self,
+        query: str,
+        snippets: list[str],
+        category: str,
+        severity: str,
+        error_code: str,
+    ) -> str:
+        """
+        Summary stage: LLM answer, served from cache when possible. The
+        fallback is rebuilt per request and never cached.
+        """
+        key = self._summary_key(category, severity, error_code, snippets, query)
+        cached = self._cached(key, query)
+        if cached is not None:
+            return cached
+        summary, ok = self.generate_summary(query, snippets)
+        self._remember(key, query, summary, ok)
+        return summary
+
+    async def asummarize(
+        self,
+        query: str,
+        snippets: list[str],
+        category: str,
+        severity: str,
+        error_code: str,
+    ) -> str:
+        """
+        Async summarize(): same caches, non-blocking LLM call. A timeout or
+        error answers with the fallback without caching it, so the next
+        request for the signature tries the LLM again.
+        """
+        key = self._summary_key(category, severity, error_code, snippets, query)
+        cached = self._cached(key, query)
+        if cached is not None:
+            return cached
+        summary, ok = await self._flights.do(
+            self._flight_key(query, snippets),
+            lambda: self.agenerate_summary(query, snippets),
+        )
+        self._remember(key, query, summary, ok)
+        return summary
+
+    @staticmethod
+    def build_payload(
+        error_code: str,
+        category: str,
+        severity: str,
+        signals: list[str],
+        steps: list[str],
+        references: list[str],
+        message: str,
+        classification: dict | None = None,
+        guidance: dict | None = None,
+    ) -> dict:
+        """
+        Structure expected by DiagnoseResponse, without touching the LLM.
+        Used directly by the batch endpoint. guidance is the code's
+        mappings.csv entry (user_message, action_type, can_autofix, severity).
+        """
+        query = Responder._query(error_code, category, severity, message)
         return {
             "detected_error": error_code,
             "category": category,
@@ -127,4 +493,6 @@ class Responder:
             "suggested_steps": steps,
             "references": references,
             "raw_notes": f"query={query}\nsteps={len(steps)} refs={len(references)}",
+            "classification": classification,
+            "guidance": guidance,
         }
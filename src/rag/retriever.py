@@ -1,101 +1,213 @@
 # src/rag/retriever.py
 from __future__ import annotations
-from typing import Tuple, List, Optional
+import os
+import threading
+from typing import Any, Dict, Iterable, Tuple, List, Optional
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-# Built-in fallback playbook (works even without any files on disk)
-_PLAYBOOK_FALLBACK = {
-    "Payments": {
-        "refs": [
-            "docs/payments/gateway-checks.md",
-            "docs/payments/tokenization.md",
-            "runbooks/payments/common-failures.md",
-        ],
-        "steps": [
-            "Verify payment method is allowed for the account/location.",
-            "Check tokenization response (token present, not expired).",
-            "Confirm gateway credentials & merchant config in env.",
-            "Validate currency, amount format, and CVV/AVS rules.",
-            "Retry once if upstream 5xx; otherwise surface user-safe message.",
-        ],
-    },
-    "Auth": {
-        "refs": ["docs/auth/jwt-rotation.md", "runbooks/auth/401-403.md"],
-        "steps": [
-            "Check Authorization header present and Bearer token format.",
-            "Validate token exp/nbf and audience claims.",
-            "Confirm server clock skew and refresh token logic.",
-        ],
-    },
-    "Networking": {
-        "refs": ["docs/net/retries.md", "runbooks/net/timeouts.md"],
-        "steps": [
-            "Confirm upstream host resolves and is reachable.",
-            "Increase client timeout to >= 30s for heavy operations.",
-            "Enable exponential backoff with jitter on retries.",
-        ],
-    },
-    "Routing": {
-        "refs": ["docs/api/routing.md"],
-        "steps": [
-            "Check route path and HTTP method.",
-            "Ensure service registering route on startup (import side-effects).",
-        ],
-    },
-    "General": {
-        "refs": ["docs/oncall/triage-checklist.md"],
-        "steps": [
-            "Reproduce locally with same inputs.",
-            "Check recent deploys/feature flags.",
-            "Collect logs with correlation/request IDs.",
-        ],
-    },
-}
+from src.rag.playbooks import Playbook, PlaybookStore
+
+if TYPE_CHECKING:
+    # Both pull in NumPy; they are imported when the index is first loaded
+    from src.rag.bm25 import BM25Index
+    from src.rag.vector_index import VectorIndex
 
 class RAG:
     """
-    Simple retriever. If index_dir is provided, we'll try to load category-specific
-    files from that folder (optional). Otherwise we use the built-in fallback map.
+    Simple retriever. Steps and refs come from a PlaybookStore (per provider
+    code, then category, then General). Without one, a store is built from
+    the <category>_refs.txt / <category>_steps.txt files in index_dir, if
+    given, over the built-in fallback map.
+
+    Semantic search comes from kb_index (a .faiss file + kb_meta.pkl, served by
+    faiss or, without it, from the int8/float16 kb_index.qvec beside it or a
+    NumPy brute-force reader over the file itself) or else from vector_dir
+    (embeddings.npy built by build_index.py). The closest knowledge-base chunks
+    to error_code + message are appended to the playbook refs. With lazy=True
+    the index (and NumPy with it) is loaded on the first query instead of at
+    startup. index_meta carries index metadata already read from the startup
+    bundle ({"kb_meta": ..., "vector_meta": ..., "vector_rows": ...}).
+
+    When vector_dir also holds bm25.npz, a lexical BM25 ranking (exact tokens
+    such as DO_NOT_HONOR, CVV or numeric codes) runs alongside the vector
+    ranking and the two are merged with reciprocal-rank fusion; the lexical
+    share is RAG_LEXICAL_WEIGHT (0 disables it, 1 is lexical only).
     """
-    def __init__(self, index_dir: Optional[str] = None):
+    def __init__(
+        self,
+        index_dir: Optional[str] = None,
+        vector_dir: Optional[str] = None,
+        kb_index: Optional[str] = None,
+        lazy: bool = False,
+        playbooks: Optional[PlaybookStore] = None,
+        index_meta: Optional[Dict[str, Any]] = None,
+    ):
         self.index_dir = Path(index_dir) if index_dir else None
-        self.playbook = dict(_PLAYBOOK_FALLBACK)  # start with fallback
-
-        # Optional: load refs/steps from files in index_dir if present
-        # Structure (all optional):
-        #   <index_dir>/
-        #       payments_refs.txt, payments_steps.txt
-        #       auth_refs.txt, auth_steps.txt
-        #       networking_refs.txt, networking_steps.txt
-        #       routing_refs.txt, routing_steps.txt
-        #       general_refs.txt, general_steps.txt
-        if self.index_dir and self.index_dir.exists():
-            self._maybe_load_category("Payments", "payments")
-            self._maybe_load_category("Auth", "auth")
-            self._maybe_load_category("Networking", "networking")
-            self._maybe_load_category("Routing", "routing")
-            self._maybe_load_category("General", "general")
-
-    def _maybe_load_category(self, bucket: str, stem: str) -> None:
-        refs_path = self.index_dir / f"{stem}_refs.txt"
-        steps_path = self.index_dir / f"{stem}_steps.txt"
-
-        refs = self.playbook[bucket]["refs"]
-        steps = self.playbook[bucket]["steps"]
-
-        if refs_path.exists():
-            try:
-                refs = [line.strip() for line in refs_path.read_text(encoding="utf-8").splitlines() if line.strip()]
-            except Exception:
-                pass
-        if steps_path.exists():
+        self.playbooks = playbooks or PlaybookStore.build(knowledge_dir=self.index_dir)
+        self.playbook = self.playbooks.categories
+
+        self.top_k = int(os.getenv("RAG_TOP_K", "3"))
+        self.min_score = float(os.getenv("RAG_MIN_SCORE", "0.1"))
+        self.nprobe = int(os.getenv("FAISS_NPROBE", "8"))
+        self.backend = os.getenv("RAG_INDEX_BACKEND", "auto")  # auto | faiss | numpy | quantized
+        self.rescore_factor = int(os.getenv("RAG_RESCORE_FACTOR", "4"))
+        self.lexical_weight = float(os.getenv("RAG_LEXICAL_WEIGHT", "0.5"))
+        self.rrf_k = int(os.getenv("RAG_RRF_K", "60"))
+        self.bm25: Optional[BM25Index] = None
+        self._vector_dir = vector_dir
+        self._kb_index = kb_index
+        self._index_meta = index_meta or {}
+        self._vector_index: Optional[VectorIndex] = None
+        self._index_loaded = False
+        self._index_lock = threading.Lock()
+        if not lazy:
+            self._load_index()
+
+    def _load_index(self) -> Optional[VectorIndex]:
+        with self._index_lock:
+            if self._index_loaded:
+                return self._vector_index
+            from src.rag.bm25 import BM25Index
+            from src.rag.vector_index import VectorIndex
+
+            meta = self._index_meta
             try:
-                steps = [line.strip() for line in steps_path.read_text(encoding="utf-8").splitlines() if line.strip()]
+                if self._kb_index and Path(self._kb_index).exists():
+                    self._vector_index = self._load_quantized() or VectorIndex.load_faiss(
+                        self._kb_index, nprobe=self.nprobe, backend=self.backend, meta=meta.get("kb_meta")
+                    )
+                elif self._vector_dir and Path(self._vector_dir).exists():
+                    self._vector_index = VectorIndex.load(
+                        self._vector_dir, meta=meta.get("vector_meta"), rows=meta.get("vector_rows")
+                    )
             except Exception:
-                pass
+                # Missing/incompatible artifacts: keep serving the playbook only
+                self._vector_index = None
+            bm25_path = Path(self._vector_dir) / "bm25.npz" if self._vector_dir else None
+            if self._vector_index is not None and bm25_path and bm25_path.exists():
+                try:
+                    bm25 = BM25Index.load(bm25_path)
+                    # Only usable if it covers the same rows as the vectors
+                    self.bm25 = bm25 if bm25.n_docs == len(self._vector_index) else None
+                except Exception:
+                    self.bm25 = None
+            self._index_loaded = True
+            return self._vector_index
+
+    def _load_quantized(self) -> Optional[VectorIndex]:
+        """
+        kb_index.qvec next to kb_index, for backend "quantized", or for "auto"
+        when faiss is not installed. Skipped (None) if it is missing or older
+        than kb_index. The float32 vectors in kb_index re-score the top
+        candidates unless RAG_RESCORE_FACTOR=0.
+        """
+        from src.rag.backends import faiss_available, read_faiss_flat
+        from src.rag.vector_index import VectorIndex
+
+        if self.backend not in ("auto", "quantized") or (self.backend == "auto" and faiss_available()):
+            return None
+        kb_index = Path(self._kb_index)
+        qvec = kb_index.with_suffix(".qvec")
+        if not qvec.exists() or qvec.stat().st_mtime_ns < kb_index.stat().st_mtime_ns:
+            return None
+        try:
+            rescore = read_faiss_flat(kb_index)[0] if self.rescore_factor > 0 else None
+            return VectorIndex.load_quantized(qvec, rescore=rescore, rescore_factor=self.rescore_factor)
+        except (OSError, ValueError, KeyError):
+            return None  # unreadable or mismatched store: serve kb_index itself
+
+    @property
+    def vector_index(self) -> Optional[VectorIndex]:
+        if self._index_loaded:
+            return self._vector_index
+        return self._load_index()
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ranked knowledge-base chunks for a free-text query (empty without an index)."""
+        if not query.strip():
+            return []
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: List[str], k: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Vector hits below RAG_MIN_SCORE are dropped; with BM25 loaded, the
+        surviving vector ranking and the lexical ranking are fused with RRF
+        and "score" becomes the fused score.
+        """
+        k = k or self.top_k
+        index = self.vector_index
+        if index is None or not queries:
+            return [[] for _ in queries]
+
+        from src.rag.bm25 import rrf_fuse  # already loaded alongside the index
+
+        hybrid = self.bm25 is not None and self.lexical_weight > 0
+        depth = max(4 * k, 20) if hybrid else k
+        results = []
+        for query, hits in zip(queries, index.search_many(queries, depth)):
+            hits = [h for h in hits if h["score"] >= self.min_score]
+            if not hybrid:
+                results.append(hits[:k])
+                continue
+
+            lex_scores, lex_rows = self.bm25.search(query, depth)
+            lexical = dict(zip(lex_rows.tolist(), lex_scores.tolist()))
+            vector = {h["row"]: h for h in hits}
+            fused = rrf_fuse(
+                [(list(vector), 1.0 - self.lexical_weight), (list(lexical), self.lexical_weight)],
+                k=self.rrf_k,
+            )
+            out = []
+            for row, score in fused:
+                hit = vector.get(row) or index.hit(row, 0.0)
+                if hit is None:
+                    continue
+                out.append({
+                    **hit,
+                    "score": score,
+                    "vector_score": vector[row]["score"] if row in vector else None,
+                    "bm25_score": lexical.get(row),
+                })
+                if len(out) == k:
+                    break
+            results.append(out)
+        return results
+
+    def _with_chunk_refs(self, refs: List[str], hits: List[Dict[str, Any]]) -> List[str]:
+        out = list(refs)
+        for hit in hits:
+            ref = f"{hit['source']}#{hit['chunk_id'].rsplit('#', 1)[-1]}"
+            if ref not in out:
+                out.append(ref)
+        return out
+
+    def retrieve_playbook(self, error_code: str, category: str, message: str) -> Playbook:
+        playbook = self.playbooks.resolve(error_code, category)
+        hits = self.search(f"{error_code} {message}")
+        if not hits:
+            return playbook
+        return playbook._replace(refs=self._with_chunk_refs(playbook.refs, hits))
+
+    def retrieve_many(self, items: Iterable[Tuple[str, str, str]]) -> List[Playbook]:
+        """
+        Batch form of retrieve_playbook over (error_code, category, message).
+        Playbook entries are resolved once per (code, category) and all
+        semantic queries are scored in a single matrix product.
+        """
+        items = list(items)
+        entries: Dict[Tuple[str, str], Playbook] = {}
+        for code, category, _ in items:
+            if (code, category) not in entries:
+                entries[(code, category)] = self.playbooks.resolve(code, category)
 
-        self.playbook[bucket] = {"refs": refs, "steps": steps}
+        if self.vector_index is None:
+            return [entries[(code, c)] for code, c, _ in items]
 
-    def retrieve_playbook(self, error_code: str, category: str, message: str) -> Tuple[List[str], List[str]]:
-        entry = self.playbook.get(category, self.playbook["General"])
-        return entry["refs"], entry["steps"]
+        queries = list(dict.fromkeys(f"{code} {msg}" for code, _, msg in items))
+        hits = dict(zip(queries, self.search_many(queries)))
+        out = []
+        for code, c, msg in items:
+            playbook = entries[(code, c)]
+            out.append(playbook._replace(refs=self._with_chunk_refs(playbook.refs, hits[f"{code} {msg}"])))
+        return out
@@ -0,0 +1,145 @@
+# src/rag/semantic_cache.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.core.normalize import normalize
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class SemanticCache:
+    """
+    Near-duplicate summary cache. A query is normalized (ids, amounts,
+    timestamps -> placeholders), embedded with the hashing embedder and
+    compared against the recent queries of the same scope (the responder
+    uses category, severity, error code and snippets digest); the best one
+    at cosine >= threshold returns its summary.
+
+    Entries live in a preallocated (maxsize, dim) matrix, so a lookup is one
+    matrix-vector product over at most maxsize rows. Expired rows are skipped
+    and freed on the next put; beyond maxsize the least recently used entry
+    is overwritten. NumPy and the embedder load on the first put.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        maxsize: int = 1024,
+        ttl: float = 600.0,
+        dim: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = float(threshold)
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl)
+        self.dim = int(dim)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._embedder = None
+        self._vectors: Optional["np.ndarray"] = None  # (maxsize, dim) unit rows
+        self._scopes: Optional["np.ndarray"] = None  # scope id per slot, -1 = free
+        self._expires: Optional["np.ndarray"] = None
+        self._summaries: List[Optional[str]] = []
+        self._scope_ids: Dict[Hashable, int] = {}
+        self._lru: "OrderedDict[int, None]" = OrderedDict()  # occupied slots, oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _embed(self, query: str) -> "np.ndarray":
+        if self._embedder is None:
+            from src.rag.embeddings import HashingEmbedder
+
+            self._embedder = HashingEmbedder(dim=self.dim)
+        return self._embedder.encode_one(normalize(query))
+
+    def _best(self, vec: "np.ndarray", scope_id: int, now: float) -> Tuple[int, float]:
+        import numpy as np
+
+        sims = self._vectors @ vec
+        sims[(self._scopes != scope_id) | (self._expires <= now)] = -np.inf
+        slot = int(np.argmax(sims))
+        return slot, float(sims[slot])
+
+    def get(self, query: str, scope: Hashable) -> Optional[str]:
+        """Summary of the most similar recent query in the same scope, or None."""
+        if not self._lru:
+            self.misses += 1
+            return None
+        vec = self._embed(query)
+        now = self._clock()
+        with self._lock:
+            scope_id = self._scope_ids.get(scope)
+            if scope_id is None or not self._lru:
+                self.misses += 1
+                return None
+            slot, score = self._best(vec, scope_id, now)
+            if score < self.threshold:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(slot)
+            self.hits += 1
+            return self._summaries[slot]
+
+    def put(self, query: str, scope: Hashable, summary: str) -> None:
+        if not self.enabled:
+            return
+        import numpy as np
+
+        vec = self._embed(query)
+        now = self._clock()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, self.dim), dtype=np.float32)
+                self._scopes = np.full(self.maxsize, -1, dtype=np.int32)
+                self._expires = np.zeros(self.maxsize, dtype=np.float64)
+                self._summaries = [None] * self.maxsize
+            for slot in np.flatnonzero((self._scopes >= 0) & (self._expires <= now)):
+                self._free(int(slot))
+            if scope not in self._scope_ids and len(self._scope_ids) >= 2 * self.maxsize:
+                self._compact_scopes()
+            scope_id = self._scope_ids.setdefault(scope, len(self._scope_ids))
+
+            if len(self._lru) < self.maxsize:
+                slot = int(np.flatnonzero(self._scopes < 0)[0])
+            else:
+                slot = next(iter(self._lru))
+                self._free(slot)
+                self.evictions += 1
+            self._vectors[slot] = vec
+            self._scopes[slot] = scope_id
+            self._expires[slot] = now + self.ttl
+            self._summaries[slot] = summary
+            self._lru[slot] = None
+
+    def _compact_scopes(self) -> None:
+        # Forget scopes no entry uses any more and renumber the rest
+        live = {old: new for new, old in enumerate(sorted({int(self._scopes[s]) for s in self._lru}))}
+        self._scope_ids = {scope: live[i] for scope, i in self._scope_ids.items() if i in live}
+        for slot in self._lru:
+            self._scopes[slot] = live[int(self._scopes[slot])]
+
+    def _free(self, slot: int) -> None:
+        self._scopes[slot] = -1
+        self._summaries[slot] = None
+        self._lru.pop(slot, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._scopes is not None:
+                self._scopes[:] = -1
+                self._summaries = [None] * self.maxsize
+            self._scope_ids.clear()
+            self._lru.clear()
+
+    def __len__(self) -> int:
+        return len(self._lru)
@@ -0,0 +1,166 @@
+# src/rag/vector_index.py
+from __future__ import annotations
+
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.rag.backends import NumpyFlatBackend, open_index
+from src.rag.embeddings import HASHING_MODEL, get_embedder
+from src.rag.quantized import QuantizedBackend, RowTable, read_quantized
+
+# kb_meta.pkl files written before the metadata carried a model name were
+# built with this encoder.
+_LEGACY_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """
+    Cosine-similarity search over the chunk embeddings built by build_index.py.
+
+    Scoring is delegated to a backend: a FAISS index when faiss is installed,
+    or brute force over a memory-mapped, pre-normalized float32 matrix (one
+    matrix-vector product plus an argpartition top-k).
+    """
+
+    def __init__(self, backend, chunks: Sequence[Dict[str, Any]], embedder):
+        if backend.ntotal != len(chunks):
+            raise ValueError(f"{backend.ntotal} embeddings for {len(chunks)} chunks")
+        if embedder.dim != backend.dim:
+            raise ValueError(f"embedder dim {embedder.dim} != index dim {backend.dim}")
+        self.backend = backend
+        # A RowTable decodes rows lazily; materializing it would defeat that
+        self.chunks = chunks if isinstance(chunks, RowTable) else list(chunks)
+        self.embedder = embedder
+
+    @classmethod
+    def load(
+        cls,
+        index_dir: str | Path,
+        meta: Optional[Dict[str, Any]] = None,
+        rows: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> "VectorIndex":
+        """
+        Load embeddings.npy + rows.json (or legacy chunks.json) + meta.json
+        from an index dir. meta/rows already read elsewhere (the startup
+        bundle) skip the JSON reads.
+        """
+        index_dir = Path(index_dir)
+        if meta is None:
+            meta = json.loads((index_dir / "meta.json").read_text(encoding="utf-8"))
+        chunks = rows if rows is not None else cls.read_rows(index_dir)
+
+        matrix = np.load(index_dir / "embeddings.npy", mmap_mode="r")
+        if not meta.get("normalized") or matrix.dtype != np.float32:
+            # Older artifacts: normalize once into memory.
+            matrix = _normalize_rows(matrix)
+
+        embedder = get_embedder(meta.get("model", HASHING_MODEL), dim=int(meta.get("dim", matrix.shape[1])))
+        return cls(NumpyFlatBackend(matrix), chunks, embedder)
+
+    @staticmethod
+    def read_rows(index_dir: str | Path) -> List[Optional[Dict[str, Any]]]:
+        # rows.json is row-aligned with the matrix (null = tombstoned row);
+        # indexes built before incremental builds only have chunks.json.
+        rows_path = Path(index_dir) / "rows.json"
+        if not rows_path.exists():
+            rows_path = Path(index_dir) / "chunks.json"
+        return json.loads(rows_path.read_text(encoding="utf-8"))
+
+    @classmethod
+    def load_faiss(
+        cls,
+        index_path: str | Path,
+        meta_path: Optional[str | Path] = None,
+        nprobe: Optional[int] = None,
+        backend: str = "auto",
+        meta: Any = None,
+    ) -> "VectorIndex":
+        """Load a .faiss index plus its pickled metadata (kb_meta.pkl, unless meta is given)."""
+        index_path = Path(index_path)
+        if meta is None:
+            meta_path = Path(meta_path) if meta_path else index_path.with_name("kb_meta.pkl")
+            with open(meta_path, "rb") as f:
+                meta = pickle.load(f)
+
+        if isinstance(meta, list):
+            # Legacy format: one {"filename": ...} per vector, no model info.
+            meta = {
+                "model": os.getenv("KB_INDEX_MODEL", _LEGACY_MODEL),
+                "chunks": [
+                    {"chunk_id": m["filename"], "doc_id": Path(m["filename"]).stem, "source": f"kb/{m['filename']}"}
+                    for m in meta
+                ],
+            }
+
+        index = open_index(index_path, nprobe=nprobe, backend=backend)
+        embedder = get_embedder(meta.get("model", HASHING_MODEL), dim=int(meta.get("dim", index.dim)))
+        return cls(index, meta["chunks"], embedder)
+
+    @classmethod
+    def load_quantized(
+        cls,
+        path: str | Path,
+        rescore: Optional[np.ndarray] = None,
+        rescore_factor: int = 4,
+    ) -> "VectorIndex":
+        """
+        Load a quantized store (kb_index.qvec + kb_index.jsonl) written by
+        build_index.py. Only the header is read; vectors, scales and rows are
+        memory-mapped. `rescore` is the float32 matrix for exact re-scoring.
+        """
+        info, codes, scales, rows = read_quantized(path)
+        backend = QuantizedBackend(codes, scales, rescore=rescore, rescore_factor=rescore_factor)
+        embedder = get_embedder(info.get("model", HASHING_MODEL), dim=int(info.get("dim", backend.dim)))
+        return cls(backend, rows, embedder)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def hit(self, row: int, score: float) -> Optional[Dict[str, Any]]:
+        """Chunk reference for a row, or None for a tombstoned row."""
+        chunk = self.chunks[row]
+        if chunk is None:
+            return None
+        return {
+            "row": row,
+            "chunk_id": chunk["chunk_id"],
+            "doc_id": chunk.get("doc_id"),
+            "source": chunk.get("source"),
+            "score": float(score),
+        }
+
+    def _hits(self, scores: np.ndarray, ids: np.ndarray) -> List[Dict[str, Any]]:
+        hits = []
+        for score, i in zip(scores, ids):
+            if i < 0:
+                continue  # padding from the backend
+            if self.backend.metric == "l2":
+                # Unit vectors: -||q - x||^2 = 2 cos - 2
+                score = 1.0 + score / 2.0
+            hit = self.hit(int(i), score)
+            if hit is not None:
+                hits.append(hit)
+        return hits
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Ranked chunk references with cosine scores, best first."""
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: Sequence[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Batch search: all queries are scored in one backend call."""
+        if not len(self) or not queries:
+            return [[] for _ in queries]
+        scores, ids = self.backend.search(self.embedder.encode(queries), k)
+        return [self._hits(s, i) for s, i in zip(scores, ids)]
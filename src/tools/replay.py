@@ -0,0 +1,230 @@
+# src/tools/replay.py
+"""
+Offline bulk replay: stream a JSONL file of payment attempts through the
+classify -> retrieve -> respond pipeline of src/api/main.py, without HTTP.
+
+    python -m src.tools.replay attempts.jsonl --out replayed.jsonl --workers 8
+    python -m src.tools.replay attempts.jsonl --out replayed.jsonl --resume
+
+Records may use the event_schema.json names (raw_code, raw_message) or the
+DiagnoseRequest names (error_code, message, trace). Output is one line per
+non-blank input line, in input order: {"line", "attempt_id", "ok",
+"result"|"error"}, where "result" is the /support/diagnose/batch payload.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = int(os.getenv("REPLAY_CHUNK_SIZE", "500"))
+
+Line = Tuple[int, bytes]  # (1-based line number, raw bytes)
+
+_snapshot = None
+
+
+def _init_worker() -> None:
+    """Build the same classifier/retriever snapshot the API serves, once per process."""
+    global _snapshot
+    from src.api.main import snapshots
+
+    _snapshot = snapshots.current()
+
+
+def _request(record: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (
+        str(record.get("error_code") or record.get("raw_code") or ""),
+        str(record.get("message") or record.get("raw_message") or ""),
+        str(record.get("trace") or ""),
+    )
+
+
+def process_chunk(lines: List[Line]) -> Tuple[List[str], int]:
+    """
+    Diagnose a chunk with the batch APIs (one classify_many_detailed and one
+    retrieve_many call) and return (serialized output lines, error count).
+    Runs in a worker process; the JSON encoding happens there too.
+    """
+    from src.rag.responder import Responder
+
+    if _snapshot is None:
+        _init_worker()
+
+    out: List[Optional[Dict[str, Any]]] = [None] * len(lines)
+    valid: List[Tuple[int, Dict[str, Any], Tuple[str, str, str]]] = []
+    for i, (lineno, raw) in enumerate(lines):
+        try:
+            record = json.loads(raw)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as exc:
+            out[i] = {"line": lineno, "ok": False, "error": f"invalid JSON: {exc}"}
+            continue
+        req = _request(record)
+        if not req[0].strip():
+            out[i] = {"line": lineno, "attempt_id": record.get("attempt_id"), "ok": False, "error": "error_code is required"}
+            continue
+        valid.append((i, record, req))
+
+    classified = _snapshot.classifier.classify_many_detailed(req for _, _, req in valid)
+    playbooks = _snapshot.retriever.retrieve_many(
+        (req[0], category, req[1]) for (_, _, req), (category, _, _, _) in zip(valid, classified)
+    )
+    for (i, record, (code, message, _)), (category, severity, signals, classification), (refs, steps, guidance) in zip(
+        valid, classified, playbooks
+    ):
+        result = Responder.build_payload(
+            error_code=code,
+            category=category,
+            severity=severity,
+            signals=signals,
+            steps=steps,
+            references=refs,
+            message=message,
+            classification=classification,
+            guidance=guidance,
+        )
+        out[i] = {"line": lines[i][0], "attempt_id": record.get("attempt_id"), "ok": True, "result": result}
+    errors = len(lines) - len(valid)
+    return [json.dumps(o, ensure_ascii=False) + "\n" for o in out], errors
+
+
+# ---------------------------
+# INPUT / CHECKPOINTS
+# ---------------------------
+def read_chunks(path: Path, offset: int, first_line: int, size: int) -> Iterator[Tuple[List[Line], int, int]]:
+    """
+    (chunk, byte offset just past it, lines consumed so far) from `offset`
+    on; blank lines are counted but not diagnosed.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk: List[Line] = []
+        lineno = first_line
+        for raw in f:
+            offset += len(raw)
+            lineno += 1
+            if raw.strip():
+                chunk.append((lineno, raw))
+            if len(chunk) >= size:
+                yield chunk, offset, lineno
+                chunk = []
+        # A trailing chunk may be empty when the file ends in blank lines;
+        # it still carries the final offset for the checkpoint.
+        yield chunk, offset, lineno
+
+
+def _checkpoint_path(out: Path) -> Path:
+    return out.with_name(out.name + ".ckpt")
+
+
+def load_checkpoint(out: Path, src: Path) -> Dict[str, int]:
+    """Where to resume: input byte offset, lines consumed and valid output size."""
+    path = _checkpoint_path(out)
+    if not path.exists():
+        return {"offset": 0, "lines": 0, "output_bytes": 0}
+    state = json.loads(path.read_text(encoding="utf-8"))
+    if state.get("input") != str(src.resolve()):
+        raise SystemExit(f"{path} belongs to {state.get('input')}, not {src}")
+    return {k: int(state[k]) for k in ("offset", "lines", "output_bytes")}
+
+
+def save_checkpoint(out: Path, src: Path, offset: int, lines: int, output_bytes: int) -> None:
+    path = _checkpoint_path(out)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(
+        json.dumps({"input": str(src.resolve()), "offset": offset, "lines": lines, "output_bytes": output_bytes}),
+        encoding="utf-8",
+    )
+    tmp.replace(path)
+
+
+# ---------------------------
+# DRIVER
+# ---------------------------
+class _InlineExecutor(Executor):
+    """--workers 1: same code path without a pool (debugging, tests)."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+def replay(
+    src: str | Path,
+    out: str | Path,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    resume: bool = False,
+) -> Dict[str, Any]:
+    """
+    Stream src through the pipeline into out. At most 2 * workers chunks are
+    in flight and results are written in input order as each chunk at the
+    head of the queue finishes, so memory does not grow with the file. After
+    every written chunk a checkpoint (out + ".ckpt") records the input offset
+    and output size; resume=True truncates out to that size and continues.
+    """
+    src, out = Path(src), Path(out)
+    workers = workers or os.cpu_count() or 1
+    state = load_checkpoint(out, src) if resume else {"offset": 0, "lines": 0, "output_bytes": 0}
+    stats = {"lines": 0, "ok": 0, "errors": 0, "resumed_from_line": state["lines"]}
+    started = time.perf_counter()
+
+    if workers > 1:
+        executor: Executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    else:
+        executor = _InlineExecutor()
+
+    mode = "r+b" if resume and out.exists() else "wb"
+    with executor, open(out, mode) as sink:
+        sink.truncate(state["output_bytes"])
+        sink.seek(state["output_bytes"])
+        pending: Deque[Tuple[Future, int, int]] = deque()
+
+        def _drain_one() -> None:
+            future, end_offset, end_line = pending.popleft()
+            rows, errors = future.result()
+            sink.write("".join(rows).encode("utf-8"))
+            sink.flush()
+            stats["lines"] += len(rows)
+            stats["ok"] += len(rows) - errors
+            stats["errors"] += errors
+            save_checkpoint(out, src, end_offset, end_line, sink.tell())
+
+        for chunk, end_offset, end_line in read_chunks(src, state["offset"], state["lines"], chunk_size):
+            pending.append((executor.submit(process_chunk, chunk), end_offset, end_line))
+            if len(pending) >= 2 * workers:
+                _drain_one()
+        while pending:
+            _drain_one()
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["lines_per_s"] = round(stats["lines"] / stats["seconds"], 1) if stats["seconds"] else None
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Replay a JSONL file of payment attempts through the diagnose pipeline.")
+    ap.add_argument("input", help="JSONL of attempts (event_schema.json or DiagnoseRequest fields)")
+    ap.add_argument("--out", required=True, help="JSONL results in input order")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores; 1 = no pool)")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="lines per unit of work")
+    ap.add_argument("--resume", action="store_true", help="continue from OUT.ckpt")
+    args = ap.parse_args(argv)
+    stats = replay(args.input, args.out, workers=args.workers, chunk_size=args.chunk_size, resume=args.resume)
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
 # src/vercel_main.py
+import os
+
+# Cold starts pay only for what a request uses: index, NumPy, ML model and
+# the openai SDK are imported on first use (see LAZY_STARTUP in src.api.main).
+os.environ.setdefault("LAZY_STARTUP", "1")
 
 from mangum import Mangum
 from src.api.main import app
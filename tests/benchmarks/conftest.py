@@ -0,0 +1,88 @@
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+_RESULTS = {}
+
+
+class Bench:
+    """
+    Minimal pytest-benchmark-style timer: calls fn repeatedly (after a
+    warm-up) until min_time has passed, then records per-call statistics.
+    """
+
+    def __init__(self, name, baseline, max_regression, min_time=0.2, max_rounds=100_000):
+        self.name = name
+        self.baseline = baseline
+        self.max_regression = max_regression
+        self.min_time = min_time
+        self.max_rounds = max_rounds
+        self.stats = None
+
+    def __call__(self, fn, *args, **kwargs):
+        result = fn(*args, **kwargs)  # warm-up (lazy loads, caches)
+        samples = []
+        deadline = time.perf_counter() + self.min_time
+        while len(samples) < self.max_rounds and (len(samples) < 5 or time.perf_counter() < deadline):
+            start = time.perf_counter_ns()
+            fn(*args, **kwargs)
+            samples.append(time.perf_counter_ns() - start)
+        self.record(samples)
+        return result
+
+    def record(self, samples_ns, **extra):
+        samples = sorted(samples_ns)
+        median = statistics.median(samples) / 1e3
+        self.stats = {
+            "rounds": len(samples),
+            "min_us": round(samples[0] / 1e3, 3),
+            "median_us": round(median, 3),
+            "mean_us": round(statistics.fmean(samples) / 1e3, 3),
+            "p99_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1e3, 3),
+            "ops_per_s": round(1e6 / median, 1) if median else None,
+            **extra,
+        }
+        _RESULTS[self.name] = self.stats
+        base = (self.baseline or {}).get(self.name)
+        if base and base.get("median_us"):
+            limit = base["median_us"] * (1.0 + self.max_regression)
+            assert median <= limit, (
+                f"{self.name}: median {median:.1f}us regressed more than "
+                f"{self.max_regression:.0%} over baseline {base['median_us']:.1f}us"
+            )
+
+
+@pytest.fixture(scope="session")
+def bench_baseline(request):
+    path = request.config.getoption("--bench-compare")
+    if not path:
+        return {}
+    return json.loads(Path(path).read_text(encoding="utf-8"))["benchmarks"]
+
+
+@pytest.fixture
+def bench(request, bench_baseline):
+    return Bench(request.node.name, bench_baseline, request.config.getoption("--bench-max-regression"))
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption("--bench-json")
+    if not path or not _RESULTS:
+        return
+    Path(path).write_text(
+        json.dumps(
+            {
+                "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "benchmarks": dict(sorted(_RESULTS.items())),
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from loadgen import run_load
+from src.api.main import app, responder, response_cache
+
+pytestmark = pytest.mark.bench
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    async def _fake(query, snippets):
+        return f"stub summary for {query}", True
+
+    monkeypatch.setattr(responder, "agenerate_summary", _fake)
+
+
+@pytest.mark.parametrize("path", ["/support/diagnose", "/support/diagnose/with-summary"])
+def test_load_diagnose(bench, stub_llm, path):
+    hits = response_cache.entries.hits
+    stats = asyncio.run(run_load(app, path=path, requests=400, concurrency=16))
+    assert stats["statuses"] == {"200": 400}
+    # Every message is distinct, so this measures diagnosis, not cache hits
+    assert response_cache.entries.hits == hits
+    # Latencies go through the same recorder, so --bench-compare gates them too
+    bench.record([int(stats["p50_ms"] * 1e6)], p99_ms=stats["p99_ms"], ops_per_s=stats["rps"])
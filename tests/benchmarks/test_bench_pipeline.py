@@ -0,0 +1,99 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from src.core.classifier import RulesClassifier
+from src.rag.embeddings import HashingEmbedder
+from src.rag.rebuild_docs import split_into_chunks
+from src.rag.responder import Responder
+from src.rag.retriever import RAG
+
+pytestmark = pytest.mark.bench
+
+_WORDS = "card gateway timeout declined issuer limit statement autopay token expired retry network".split()
+
+
+def _rules_file(tmp_path, n_buckets, triggers_per_bucket=5):
+    rng = random.Random(n_buckets)
+    rules = {
+        f"Bucket{i}": {
+            "match_any": [f"CODE_{i:05d}_{j}_{rng.choice(_WORDS).upper()}" for j in range(triggers_per_bucket)],
+            "severity": "Low",
+            "signals": [],
+        }
+        for i in range(n_buckets)
+    }
+    rules["General"] = {"match_any": [], "severity": "Low", "signals": ["generic_checklist"]}
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules), encoding="utf-8")
+    return path
+
+
+def _text(rng, n_words):
+    return " ".join(rng.choice(_WORDS) for _ in range(n_words))
+
+
+def _vector_dir(tmp_path, n_chunks, dim=256):
+    rng = random.Random(n_chunks)
+    embedder = HashingEmbedder(dim=dim)
+    chunks = [
+        {"doc_id": f"d{i // 4}", "source": f"kb/d{i // 4}.md", "chunk_id": f"d{i // 4}#{i % 4}", "text": _text(rng, 60)}
+        for i in range(n_chunks)
+    ]
+    np.save(tmp_path / "embeddings.npy", embedder.encode(c["text"] for c in chunks))
+    (tmp_path / "chunks.json").write_text(json.dumps(chunks), encoding="utf-8")
+    (tmp_path / "meta.json").write_text(
+        json.dumps({"model": embedder.name, "dim": embedder.dim, "normalized": True}), encoding="utf-8"
+    )
+    return tmp_path
+
+
+@pytest.mark.parametrize("n_buckets", [10, 100, 1000])
+def test_classify_hit(bench, tmp_path, n_buckets):
+    clf = RulesClassifier(str(_rules_file(tmp_path, n_buckets)))
+    code = f"CODE_{n_buckets - 1:05d}_4"
+    bench(clf.classify, "", f"gateway said {code} after retry", "trace line " * 50)
+
+
+@pytest.mark.parametrize("n_buckets", [10, 100, 1000])
+def test_classify_miss(bench, tmp_path, n_buckets):
+    clf = RulesClassifier(str(_rules_file(tmp_path, n_buckets)))
+    bench(clf.classify, "E_UNKNOWN", "nothing matches here", "trace line " * 50)
+
+
+@pytest.mark.parametrize("n_chunks", [100, 1000, 10000])
+def test_retrieve_playbook(bench, tmp_path, n_chunks):
+    rag = RAG(vector_dir=str(_vector_dir(tmp_path, n_chunks)))
+    bench(rag.retrieve_playbook, "CARD_EXPIRED", "Payments", "card expired token declined")
+
+
+def test_fallback_response(bench):
+    snippets = ["Verify the card expiry and CVV. " * 20] * 5
+    bench(Responder._fallback_response, "[Payments/High] CARD_EXPIRED :: card expired", snippets)
+
+
+@pytest.mark.parametrize("n_paragraphs", [10, 100, 1000])
+def test_split_into_chunks(bench, n_paragraphs):
+    rng = random.Random(n_paragraphs)
+    text = "\n\n".join(_text(rng, rng.randint(5, 80)) for _ in range(n_paragraphs))
+    bench(split_into_chunks, text)
+
+
+def test_predict_category(bench):
+    from pathlib import Path
+
+    from src.ml.model import load_model, predict_category
+
+    pipe = load_model(Path(__file__).resolve().parents[2] / "models" / "tfidf_lr.joblib")
+    bench(predict_category, pipe, "Error X1: amount too high for limit")
+
+
+def test_predict_compiled(bench):
+    from pathlib import Path
+
+    from src.ml.compiled import CompiledModel
+
+    model = CompiledModel.load(Path(__file__).resolve().parents[2] / "models" / "tfidf_lr.npz")
+    bench(model.predict_proba, ["Error X1: amount too high for limit"])
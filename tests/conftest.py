@@ -4,3 +4,31 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench", "benchmarks (tests/benchmarks)")
+    group.addoption("--bench", action="store_true", help="run the benchmark suite (skipped otherwise)")
+    group.addoption("--bench-json", default=None, help="write benchmark results to this JSON file")
+    group.addoption("--bench-compare", default=None, help="baseline JSON from a previous --bench-json run")
+    group.addoption(
+        "--bench-max-regression",
+        type=float,
+        default=0.25,
+        help="fail a benchmark whose median is this fraction slower than the baseline",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench: performance benchmark, only run with --bench")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--bench"):
+        return
+    import pytest
+
+    skip = pytest.mark.skip(reason="benchmark: pass --bench to run")
+    for item in items:
+        if "bench" in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,58 @@
+import asyncio
+
+from httpx import AsyncClient, ASGITransport
+
+from src.api.main import app
+
+
+def _post_batch(payload):
+    async def _call():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await ac.post("/support/diagnose/batch", json=payload)
+
+    return asyncio.run(_call())
+
+
+def test_batch_keeps_input_order_and_item_errors():
+    resp = _post_batch(
+        {
+            "items": [
+                {"error_code": "CARD_EXPIRED"},
+                {"error_code": "  "},
+                {"error_code": "E1", "message": "request timed out"},
+                {"error_code": "CARD_EXPIRED"},
+            ]
+        }
+    )
+
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["ok"] for r in results] == [True, False, True, True]
+    assert results[1]["error"] == "error_code is required"
+    assert results[0]["result"]["category"] == "Payments"
+    assert results[2]["result"]["category"] == "Networking"
+    assert results[3]["result"] == results[0]["result"]
+    assert results[0]["result"]["guidance"]["action_type"] == "request_new_card"
+    assert results[2]["result"]["guidance"] is None
+
+
+def test_invalid_item_does_not_fail_the_batch():
+    resp = _post_batch(
+        {
+            "items": [
+                {"error_code": "CARD_EXPIRED"},
+                {"message": "no code"},
+                {"error_code": "E1", "trace": "x" * 20001},
+                {"error_code": "E1", "message": "request timed out"},
+            ]
+        }
+    )
+
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["ok"] for r in results] == [True, False, False, True]
+    assert results[1]["error"].startswith("error_code:")
+    assert results[2]["error"].startswith("trace:")
+    assert results[3]["result"]["category"] == "Networking"
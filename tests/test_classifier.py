@@ -1,4 +1,5 @@
 
+import json
 from pathlib import Path
 
 from src.core.classifier import RulesClassifier
@@ -36,3 +37,217 @@ def test_unknown_falls_back_to_general():
     assert category == "General"
     assert severity == "Low"
     assert signals == ["generic_checklist"]
+
+
+def test_trace_match():
+    category, _, _ = _clf().classify(
+        error_code="E42", message="", trace="upstream call TIMED OUT after 30s"
+    )
+    assert category == "Networking"
+
+
+def test_first_bucket_wins_regardless_of_position():
+    # "401" (Auth) appears before "card" (Payments) in the text, but Payments
+    # is listed first in rules.json.
+    category, _, _ = _clf().classify(
+        error_code="", message="got 401 while charging card", trace=""
+    )
+    assert category == "Payments"
+
+
+def test_many_triggers_keep_priority(tmp_path):
+    rules = {
+        f"Bucket{i}": {"match_any": [f"PROVIDER_CODE_{i:04d}"], "severity": "Low", "signals": []}
+        for i in range(2000)
+    }
+    rules["General"] = {"match_any": [], "severity": "Low", "signals": ["generic_checklist"]}
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps(rules), encoding="utf-8")
+
+    category, _, _ = RulesClassifier(str(rules_path)).classify(
+        error_code="", message="provider_code_1999 then provider_code_0042", trace=""
+    )
+    assert category == "Bucket42"
+
+
+MODEL_PATH = Path(__file__).resolve().parents[1] / "models" / "tfidf_lr.joblib"
+
+
+def _ml_clf() -> RulesClassifier:
+    rules_path = Path(__file__).resolve().parents[1] / "config" / "rules.json"
+    return RulesClassifier(str(rules_path), model_path=str(MODEL_PATH), min_confidence=0.35)
+
+
+def test_ml_fallback_on_rule_miss():
+    category, severity, _, info = _ml_clf().classify_detailed(
+        error_code="X1", message="amount too high for limit", trace=""
+    )
+    assert category == "Payments"
+    assert severity == "High"
+    assert info["source"] == "ml"
+    assert info["category"] == "LIMIT_EXCEEDED"
+    assert info["confidence"] >= 0.35
+
+
+def test_rules_win_and_low_confidence_stays_general():
+    clf = _ml_clf()
+    _, _, _, info = clf.classify_detailed(error_code="CARD_EXPIRED", message="", trace="")
+    assert info == {"category": "Payments", "confidence": 1.0, "source": "rules"}
+
+    category, _, _, info = clf.classify_detailed(error_code="", message="some totally new error", trace="")
+    assert category == "General"
+    assert info["source"] == "rules"
+
+
+def test_model_server_batches_and_caches():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src.ml.serving import ModelServer
+
+    server = ModelServer(MODEL_PATH, max_batch=64, max_wait_ms=50)
+    texts = [f"error {i}: amount too high for limit" for i in range(40)]
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        results = list(pool.map(server.predict, texts))
+    assert len(results) == 40
+    assert server.batches < 40
+
+    batches = server.batches
+    assert server.predict("ERROR 3:  amount too high for LIMIT") == results[3]
+    assert server.batches == batches
+
+
+def test_replaced_model_server_is_closed(tmp_path):
+    import os
+    import shutil
+
+    from src.ml.serving import get_model_server
+
+    model = tmp_path / MODEL_PATH.name
+    shutil.copy(MODEL_PATH, model)
+    old = get_model_server(model)
+    label = old.predict("amount too high for limit")
+    worker = old._worker
+    assert worker.is_alive()
+
+    st = model.stat()
+    os.utime(model, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    new = get_model_server(model)
+    assert new is not old and get_model_server(model) is new
+    assert not worker.is_alive() and len(old.cache) == 0
+    # A snapshot still holding the old server scores inline, no new thread
+    assert old.predict("amount too high for limit") == label
+    assert old._worker is worker
+
+
+def test_compiled_model_matches_pipeline(tmp_path):
+    import numpy as np
+
+    from src.ml.compiled import CompiledModel, export
+    from src.ml.model import load_model
+
+    pipe = load_model(MODEL_PATH)
+    compiled = CompiledModel.load(export(MODEL_PATH, tmp_path / "model.npz"))
+    texts = ["", "zzz", "Error X1: amount too high for limit", "CARD DECLINED: do not honor", "gateway timed out"]
+    assert list(compiled.classes_) == list(pipe.classes_)
+    assert np.allclose(compiled.predict_proba(texts), pipe.predict_proba(texts), atol=1e-12)
+
+
+def test_compiled_model_matches_non_default_vectorizer(tmp_path):
+    import joblib
+    import numpy as np
+    import pytest
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    from src.ml.compiled import CompiledModel, export
+
+    texts = ["card declined do not honor", "gateway timed out", "token expired 401", "card expired card expired"] * 3
+    labels = ["Payments", "Gateway", "Auth", "Payments"] * 3
+    test = ["card card declined", "token timed out twice", "", "unknown words only"]
+    for options in (
+        {"binary": True, "ngram_range": (1, 2), "norm": "l1"},
+        {"sublinear_tf": True, "use_idf": False, "norm": None, "lowercase": False},
+    ):
+        pipe = Pipeline([("tfidf", TfidfVectorizer(**options)), ("clf", LogisticRegression())]).fit(texts, labels)
+        joblib.dump(pipe, tmp_path / "model.joblib")
+        compiled = CompiledModel.load(export(tmp_path / "model.joblib", tmp_path / "model.npz"))
+        assert np.allclose(compiled.predict_proba(test), pipe.predict_proba(test), atol=1e-12)
+
+    pipe = Pipeline([("tfidf", TfidfVectorizer(strip_accents="unicode")), ("clf", LogisticRegression())])
+    joblib.dump(pipe.fit(texts, labels), tmp_path / "model.joblib")
+    with pytest.raises(ValueError, match="strip_accents"):
+        export(tmp_path / "model.joblib", tmp_path / "model.npz")
+
+
+def test_compiled_model_needs_no_sklearn():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys; from src.ml.compiled import CompiledModel; "
+        "CompiledModel.load('models/tfidf_lr.npz').predict_proba(['card declined']); "
+        "print(any(m in sys.modules for m in ('sklearn', 'pandas', 'joblib')))"
+    )
+    root = Path(__file__).resolve().parents[1]
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_extractor_reads_message_and_trace():
+    from src.core.extractor import SignalExtractor
+
+    extractor = SignalExtractor.from_mappings(Path(__file__).resolve().parents[1] / "src" / "mappings.csv")
+    trace = "\n".join(["  at com.example.Gateway.charge(Gateway.java:88)"] * 400) + (
+        "\nGatewayError: HTTP 503 Service Unavailable\n  decline_code=do_not_honor\n  response code: 05"
+    )
+    found = extractor.extract("charge failed", trace)
+    assert found.provider_codes == ("GATEWAY_DOWN", "DO_NOT_HONOR")
+    assert found.http_statuses == (503,)
+    assert found.gateway_codes == ("DO_NOT_HONOR", "05")
+
+    # Nothing past the cap is scanned
+    capped = SignalExtractor.from_mappings(
+        Path(__file__).resolve().parents[1] / "src" / "mappings.csv", max_chars=100
+    )
+    assert capped.extract("charge failed", trace).provider_codes == ()
+
+
+def test_extractor_skips_hints_that_break_the_alternation():
+    from src.core.extractor import SignalExtractor
+
+    extractor = SignalExtractor(
+        [
+            ("FLAGGED", "(?i)foo", "X"),  # compiles alone, not mid-alternation
+            ("BACKREF", r"(a)\1", "X"),  # \1 would be the http group
+            ("CLASH", "(?P<gateway_value>zz)", "X"),
+            ("ESCAPED", r"c:\\1", "X"),  # a literal backslash, not a backref
+            ("KEPT", "do.*not.*honou?r", "X"),
+        ]
+    )
+    assert extractor.codes == ["ESCAPED", "KEPT"]
+    found = extractor.extract("foo aa zz c:\\1 do not honor", "HTTP 503")
+    assert found.provider_codes == ("ESCAPED", "KEPT")
+    assert found.http_statuses == (503,)
+
+
+def test_hints_add_signals_without_reclassifying():
+    from src.core.extractor import SignalExtractor
+
+    rules_path = Path(__file__).resolve().parents[1] / "config" / "rules.json"
+    clf = RulesClassifier(
+        str(rules_path),
+        extractor=SignalExtractor.from_mappings(Path(__file__).resolve().parents[1] / "src" / "mappings.csv"),
+    )
+    plain = RulesClassifier(str(rules_path))
+    for args in (("E_UNKNOWN", "issuer said do not honour", "upstream status_code: 402"), ("E1", "JWT token expired", "")):
+        category, severity, signals, classification = clf.classify_detailed(*args)
+        base = plain.classify_detailed(*args)
+        assert (category, severity, classification) == (base[0], base[1], base[3])
+        assert signals[: len(base[2])] == base[2]
+        assert clf.classify_many_detailed([args]) == [(category, severity, signals, classification)]
+    assert signals[-1] == "provider_code:CARD_EXPIRED"
+    assert clf.classify_detailed("E_UNKNOWN", "issuer said do not honour", "upstream status_code: 402")[2][-2:] == [
+        "provider_code:DO_NOT_HONOR",
+        "http_status:402",
+    ]
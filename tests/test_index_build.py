@@ -0,0 +1,154 @@
+import json
+
+import numpy as np
+
+from src.rag import build_index, rebuild_docs
+from src.rag.embeddings import HashingEmbedder
+from src.rag.vector_index import VectorIndex
+
+
+def _build(kb, index_dir, models_dir):
+    changed_docs = rebuild_docs.main(kb_dir=kb, index_dir=index_dir)
+    changed_index = build_index.main(index_dir=index_dir, models_dir=models_dir)
+    return changed_docs, changed_index
+
+
+def test_incremental_rebuild_patches_only_changed_chunks(tmp_path, monkeypatch):
+    kb, index_dir, models_dir = tmp_path / "kb", tmp_path / "index", tmp_path / "models"
+    kb.mkdir()
+    index_dir.mkdir()
+    (kb / "cvv.md").write_text("# CVV\n\nInvalid CVV: ask the customer to re-enter it.", encoding="utf-8")
+    (kb / "outage.md").write_text("# Outage\n\nGateway down, HTTP 503. Stop retries.", encoding="utf-8")
+    assert _build(kb, index_dir, models_dir) == (True, True)
+
+    # No-op rebuild touches nothing
+    assert _build(kb, index_dir, models_dir) == (False, False)
+
+    # Count embedder calls from here on
+    encoded = []
+    real_encode = HashingEmbedder.encode
+
+    def _counting_encode(self, texts):
+        texts = list(texts)
+        encoded.extend(texts)
+        return real_encode(self, texts)
+
+    monkeypatch.setattr(HashingEmbedder, "encode", _counting_encode)
+    serving = VectorIndex.load_faiss(models_dir / "kb_index.faiss")
+    serving_vectors = np.array(serving.backend.vectors)
+
+    (kb / "outage.md").unlink()
+    (kb / "funds.md").write_text("# Funds\n\nInsufficient funds: balance too low.", encoding="utf-8")
+    assert _build(kb, index_dir, models_dir) == (True, True)
+    assert len(encoded) == 1 and "Insufficient funds" in encoded[0]
+
+    rows = json.loads((index_dir / "rows.json").read_text(encoding="utf-8"))
+    # funds#0 reused the tombstoned row of outage#0
+    assert [r["chunk_id"] for r in rows] == ["cvv#0", "funds#0"]
+
+    # The snapshot loaded before the rebuild still pairs its old rows with its old vectors
+    assert np.array_equal(serving.backend.vectors, serving_vectors)
+    assert serving.search("gateway down 503")[0]["chunk_id"] == "outage#0"
+
+    index = VectorIndex.load_faiss(models_dir / "kb_index.faiss")
+    assert index.search("insufficient funds")[0]["chunk_id"] == "funds#0"
+    npy = VectorIndex.load(index_dir)
+    assert np.allclose(npy.backend.vectors, index.backend.vectors)
+    quantized = VectorIndex.load_quantized(models_dir / "kb_index.qvec")
+    assert list(quantized.chunks) == rows
+    assert quantized.search("insufficient funds")[0]["chunk_id"] == "funds#0"
+
+
+def test_split_into_chunks_packs_paragraphs():
+    text = "# Title\n\nfirst para\nstill first\n\n\nsecond para\n\n" + "x" * 30
+    assert rebuild_docs.split_into_chunks(text, max_len=40) == [
+        "# Title\n\nfirst para\nstill first",
+        "second para",
+        "x" * 30,
+    ]
+
+
+def test_small_embed_batches_match_single_batch(tmp_path, monkeypatch):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    for i in range(5):
+        (kb / f"doc{i}.md").write_text(f"# Doc {i}\n\nparagraph about topic {i}", encoding="utf-8")
+
+    results = []
+    for batch in (1, 256):
+        monkeypatch.setattr(build_index, "EMBED_BATCH", batch)
+        index_dir, models_dir = tmp_path / f"index{batch}", tmp_path / f"models{batch}"
+        index_dir.mkdir()
+        _build(kb, index_dir, models_dir)
+        results.append(np.load(index_dir / "embeddings.npy"))
+
+    assert results[0].shape == (5, HashingEmbedder().dim)
+    assert np.array_equal(results[0], results[1])
+
+
+def test_full_rebuild_leaves_live_mappings_intact(tmp_path):
+    kb, index_dir, models_dir = tmp_path / "kb", tmp_path / "index", tmp_path / "models"
+    kb.mkdir()
+    index_dir.mkdir()
+    (kb / "cvv.md").write_text("# CVV\n\nInvalid CVV: ask the customer to re-enter it.", encoding="utf-8")
+    _build(kb, index_dir, models_dir)
+    serving = [VectorIndex.load(index_dir), VectorIndex.load_faiss(models_dir / "kb_index.faiss")]
+    before = [np.array(i.backend.vectors) for i in serving]
+
+    (kb / "cvv.md").write_text("# CVV\n\nSecurity code rejected by the issuer.", encoding="utf-8")
+    rebuild_docs.main(kb_dir=kb, index_dir=index_dir)
+    build_index.main(index_dir=index_dir, models_dir=models_dir, full=True)
+
+    # The files were replaced, not rewritten under the server's mappings
+    for index, vectors in zip(serving, before):
+        assert np.array_equal(index.backend.vectors, vectors)
+    assert not np.array_equal(VectorIndex.load(index_dir).backend.vectors, before[0])
+    assert not list(index_dir.glob("*.tmp*")) and not list(models_dir.glob("*.tmp"))
+    assert not list(index_dir.glob("*staged*")) and not list(models_dir.glob("*staged*"))
+
+
+def test_unchanged_chunks_file_is_not_parsed(tmp_path, monkeypatch):
+    kb, index_dir, models_dir = tmp_path / "kb", tmp_path / "index", tmp_path / "models"
+    kb.mkdir()
+    index_dir.mkdir()
+    (kb / "cvv.md").write_text("# CVV\n\nInvalid CVV: ask the customer to re-enter it.", encoding="utf-8")
+    _build(kb, index_dir, models_dir)
+
+    def _no_parse(path):
+        raise AssertionError("chunks.jsonl must not be parsed")
+
+    monkeypatch.setattr(build_index, "iter_chunks", _no_parse)
+    assert build_index.main(index_dir=index_dir, models_dir=models_dir) is False
+    # Touched but identical: hashed once, still not parsed
+    chunks = index_dir / "chunks.jsonl"
+    chunks.write_bytes(chunks.read_bytes())
+    assert build_index.main(index_dir=index_dir, models_dir=models_dir) is False
+
+
+def test_failed_rebuild_keeps_vectors_and_rows_paired(tmp_path, monkeypatch):
+    kb, index_dir, models_dir = tmp_path / "kb", tmp_path / "index", tmp_path / "models"
+    kb.mkdir()
+    index_dir.mkdir()
+    (kb / "cvv.md").write_text("# CVV\n\nInvalid CVV: ask the customer to re-enter it.", encoding="utf-8")
+    _build(kb, index_dir, models_dir)
+    live = [index_dir / "embeddings.npy", index_dir / "rows.json", models_dir / "kb_index.faiss", models_dir / "kb_meta.pkl"]
+    before = [p.read_bytes() for p in live]
+
+    def _crash(*args):
+        raise RuntimeError("killed mid-build")
+
+    # Dies after the new vectors are staged, before the metadata is
+    (kb / "funds.md").write_text("# Funds\n\nInsufficient funds: balance too low.", encoding="utf-8")
+    rebuild_docs.main(kb_dir=kb, index_dir=index_dir)
+    monkeypatch.setattr(build_index, "_build_lexical", _crash)
+    try:
+        build_index.main(index_dir=index_dir, models_dir=models_dir)
+    except RuntimeError:
+        pass
+    assert [p.read_bytes() for p in live] == before
+
+    monkeypatch.undo()
+    assert build_index.main(index_dir=index_dir, models_dir=models_dir) is True
+    rows = json.loads((index_dir / "rows.json").read_text(encoding="utf-8"))
+    assert [r["chunk_id"] for r in rows] == ["cvv#0", "funds#0"]
+    assert VectorIndex.load(index_dir).search("insufficient funds")[0]["chunk_id"] == "funds#0"
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import logging
+import queue
+import uuid
+from logging.handlers import QueueHandler
+
+from httpx import AsyncClient, ASGITransport
+
+from src.api import logger as api_logger
+from src.api.logger import BatchingRotatingFileHandler, BatchListener, JsonFormatter
+from src.api.main import app, response_cache
+
+
+def _lines_for(request_id):
+    api_logger.flush_logs()
+    with open(api_logger.handler.baseFilename, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if request_id in line]
+
+
+def test_request_is_logged_as_structured_json():
+    request_id = f"req-{uuid.uuid4().hex}"
+    response_cache.entries.clear()  # a miss runs every stage
+
+    async def _call():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await ac.post(
+                "/support/diagnose",
+                json={"error_code": "CARD_EXPIRED", "message": "card expired", "context": {"currency": "USD"}},
+                headers={"X-Request-ID": request_id},
+            )
+
+    resp = asyncio.run(_call())
+    assert resp.headers["X-Request-ID"] == request_id
+
+    (line,) = _lines_for(request_id)
+    assert line["attempt_id"] == request_id
+    assert line["http_status"] == 200
+    assert line["raw_code"] == "CARD_EXPIRED"
+    assert line["currency"] == "USD"
+    assert line["classification"] == {"category": "Payments", "confidence": 1.0, "source": "rules"}
+    assert set(line["timings_ms"]) == {"cache", "classify", "retrieve", "respond"}
+    assert line["response_cache"] == "miss"
+    assert line["latency_ms"] >= sum(line["timings_ms"].values())
+
+
+def test_listener_writes_batches(tmp_path):
+    handler = BatchingRotatingFileHandler(tmp_path / "x.log", maxBytes=1 << 20, backupCount=1, delay=True)
+    handler.setFormatter(JsonFormatter())
+    q = queue.Queue()
+    log = logging.getLogger("test_listener_writes_batches")
+    log.addHandler(QueueHandler(q))
+    log.propagate = False
+    listener = BatchListener(q, handler, batch_size=4, interval=0.05)
+
+    for i in range(10):
+        log.warning("", extra={"event": {"n": i}})
+    listener.stop()
+
+    rows = [json.loads(line) for line in (tmp_path / "x.log").read_text(encoding="utf-8").splitlines()]
+    assert [r["n"] for r in rows] == list(range(10))
+    assert rows[0]["level"] == "WARNING"
@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from httpx import AsyncClient, ASGITransport
+
+from src.api.main import app
+from src.api.metrics import Registry
+
+
+def test_histogram_is_cumulative_across_threads():
+    registry = Registry()
+    hist = registry.histogram("t_seconds", "test", buckets=(0.1, 1.0))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda v: hist.observe(v, stage="x"), [0.05] * 100 + [0.5] * 50 + [5.0] * 10))
+
+    text = registry.render()
+    assert 't_seconds_bucket{stage="x",le="0.1"} 100' in text
+    assert 't_seconds_bucket{stage="x",le="1.0"} 150' in text
+    assert 't_seconds_bucket{stage="x",le="+Inf"} 160' in text
+    assert 't_seconds_count{stage="x"} 160' in text
+
+
+def test_large_and_fractional_samples_keep_full_precision():
+    registry = Registry()
+    registry.register_collector(
+        lambda: [
+            ("t_total", "counter", "test", {}, 1234567),
+            ("t_bytes", "gauge", "test", {}, 16 * 1024 * 1024.0),
+            ("t_ratio", "gauge", "test", {}, 0.1234567891),
+        ]
+    )
+    text = registry.render()
+    assert "t_total 1234567\n" in text
+    assert "t_bytes 16777216\n" in text
+    assert "t_ratio 0.1234567891\n" in text
+
+
+def test_metrics_endpoint_and_server_timing():
+    async def _calls():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            diag = await ac.post("/support/diagnose", json={"error_code": "CARD_EXPIRED"})
+            return diag, await ac.get("/support/metrics")
+
+    diag, metrics = asyncio.run(_calls())
+    timing = diag.headers["Server-Timing"]
+    for stage in ("classify;dur=", "retrieve;dur=", "respond;dur=", "total;dur="):
+        assert stage in timing
+
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = metrics.text
+    assert 'support_stage_duration_seconds_count{stage="classify"}' in text
+    assert 'support_request_duration_seconds_count{path="/support/diagnose",status="200"}' in text
+    assert 'support_cache_hits_total{cache="summary"}' in text
+    assert 'support_llm_calls_total{outcome="timeout"}' in text
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+
+from httpx import AsyncClient, ASGITransport
+
+from src.api.main import app, snapshots
+from src.api.reload import SnapshotManager
+from src.core.classifier import RulesClassifier
+
+
+def _rules(trigger):
+    return {
+        "Payments": {"match_any": [trigger], "severity": "High", "signals": ["payment_module"]},
+        "General": {"match_any": [], "severity": "Low", "signals": ["generic_checklist"]},
+    }
+
+
+def test_reload_swaps_only_on_content_change(tmp_path):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps(_rules("CARD")), encoding="utf-8")
+    builds = []
+
+    def build():
+        builds.append(1)
+        return RulesClassifier(str(rules_path)), None
+
+    mgr = SnapshotManager(build, lambda: [rules_path])
+    v1 = mgr.current()
+    assert v1.classifier.classify("", "zelle failed", "")[0] == "General"
+
+    # Startup only stats the sources; the first change hashes them
+    assert mgr._files[str(rules_path)]["sha"] is None
+    rules_path.write_text(json.dumps(_rules("ZELLE")), encoding="utf-8")
+    result = mgr.reload()
+    assert result["reloaded"] and result["version"] == 2
+    assert mgr._files[str(rules_path)]["sha"] is not None
+    assert mgr.current().classifier.classify("", "zelle failed", "")[0] == "Payments"
+    # A request still holding v1 keeps its own rules
+    assert v1.classifier.classify("", "zelle failed", "")[0] == "General"
+
+    # Touched but identical: no rebuild
+    os.utime(rules_path, ns=(1, 1))
+    assert mgr.reload() == {"reloaded": False, "version": 2, "changed": []}
+    assert len(builds) == 2
+    assert [h["version"] for h in mgr.versions()] == [1, 2]
+
+
+def test_startup_does_not_hash_sources(tmp_path, monkeypatch):
+    from src.api import reload as reload_module
+
+    big = tmp_path / "embeddings.npy"
+    big.write_bytes(b"x" * 1024)
+    hashed = []
+    real_sha = reload_module._file_sha
+    monkeypatch.setattr(reload_module, "_file_sha", lambda p: hashed.append(p) or real_sha(p))
+
+    mgr = SnapshotManager(lambda: ("clf", "rag"), lambda: [big])
+    assert hashed == []
+    assert mgr.reload() == {"reloaded": False, "version": 1, "changed": []}
+    assert hashed == []
+
+
+def test_failed_build_keeps_serving(tmp_path):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text("{}", encoding="utf-8")
+    calls = []
+
+    def build():
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("bad rules")
+        return "clf", "rag"
+
+    mgr = SnapshotManager(build, lambda: [rules_path])
+    rules_path.write_text('{"x": 1}', encoding="utf-8")
+    try:
+        mgr.reload()
+    except RuntimeError:
+        pass
+    assert mgr.current().version == 1
+    assert mgr.current().classifier == "clf"
+
+
+def test_admin_reload_endpoint(monkeypatch):
+    async def _call(headers):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await ac.post("/support/admin/reload?force=true", headers=headers)
+
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert asyncio.run(_call({})).status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert asyncio.run(_call({"X-Admin-Token": "nope"})).status_code == 401
+
+    before = snapshots.current().version
+    resp = asyncio.run(_call({"X-Admin-Token": "s3cret"}))
+    assert resp.status_code == 200
+    assert resp.json()["version"] == before + 1
+    assert snapshots.current().version == before + 1
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from src.tools import replay as replay_mod
+
+CODES = [("CARD_EXPIRED", "card expired"), ("GATEWAY_TIMEOUT", "upstream timed out"), ("X_UNKNOWN", "")]
+
+
+def _attempts(path, n=10):
+    lines = [json.dumps({"attempt_id": f"a{i}", "raw_code": CODES[i % 3][0], "raw_message": CODES[i % 3][1]}) for i in range(n)]
+    lines[4] = "{not json"
+    lines.insert(6, "")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _rows(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_replay_is_ordered_and_matches_api_shape(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _attempts(src)
+    stats = replay_mod.replay(src, out, workers=1, chunk_size=3)
+
+    rows = _rows(out)
+    assert stats["lines"] == len(rows) == 10 and stats["errors"] == 1
+    assert [r["line"] for r in rows] == [1, 2, 3, 4, 5, 6, 8, 9, 10, 11]
+    assert rows[4]["ok"] is False and rows[4]["error"].startswith("invalid JSON")
+    assert rows[0]["attempt_id"] == "a0"
+    assert rows[0]["result"]["category"] == "Payments"
+    assert rows[1]["result"]["category"] == "Networking"
+
+
+def test_replay_resumes_from_checkpoint(tmp_path, monkeypatch):
+    src = tmp_path / "in.jsonl"
+    _attempts(src)
+    replay_mod.replay(src, tmp_path / "full.jsonl", workers=1, chunk_size=3)
+
+    out = tmp_path / "out.jsonl"
+    real = replay_mod.process_chunk
+    calls = []
+
+    def flaky(lines):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("worker died")
+        return real(lines)
+
+    monkeypatch.setattr(replay_mod, "process_chunk", flaky)
+    with pytest.raises(RuntimeError):
+        replay_mod.replay(src, out, workers=1, chunk_size=3)
+    monkeypatch.setattr(replay_mod, "process_chunk", real)
+
+    stats = replay_mod.replay(src, out, workers=1, chunk_size=3, resume=True)
+    assert stats["resumed_from_line"] > 0
+    assert out.read_bytes() == (tmp_path / "full.jsonl").read_bytes()
+
+
+def test_replay_with_process_pool(tmp_path):
+    src = tmp_path / "in.jsonl"
+    _attempts(src, n=40)
+    replay_mod.replay(src, tmp_path / "inline.jsonl", workers=1, chunk_size=4)
+    replay_mod.replay(src, tmp_path / "pool.jsonl", workers=2, chunk_size=4)
+    assert (tmp_path / "pool.jsonl").read_bytes() == (tmp_path / "inline.jsonl").read_bytes()
@@ -0,0 +1,213 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.core.cache import TTLCache
+from src.rag.responder import Responder
+from src.rag.semantic_cache import SemanticCache
+
+
+def _boom(*args, **kwargs):
+    raise AssertionError("LLM must not be called")
+
+
+def test_generate_does_not_call_llm(monkeypatch):
+    monkeypatch.setattr(Responder, "generate_response", staticmethod(_boom))
+    monkeypatch.setattr(Responder, "generate_summary", staticmethod(_boom))
+    out = Responder().generate(
+        error_code="CARD_EXPIRED",
+        category="Payments",
+        severity="High",
+        signals=["payment_module"],
+        steps=["Check card"],
+        references=["docs/payments.md"],
+        message="",
+        trace="",
+        context={},
+    )
+    assert out["category"] == "Payments"
+    assert out["suggested_steps"] == ["Check card"]
+
+
+def test_summarize_is_cached_per_signature(monkeypatch):
+    calls = []
+
+    def _fake(query, snippets):
+        calls.append(query)
+        return f"summary #{len(calls)}", True
+
+    monkeypatch.setattr(Responder, "generate_summary", staticmethod(_fake))
+    responder = Responder()
+    query, snippets = responder.compose("CARD_EXPIRED", "Payments", "High", "", ["Check card"], [])
+
+    first = responder.summarize(query, snippets, category="Payments", severity="High", error_code="CARD_EXPIRED")
+    again = responder.summarize(query, snippets, category="Payments", severity="High", error_code="card_expired ")
+    other = responder.summarize(query, ["other"], category="Payments", severity="High", error_code="CARD_EXPIRED")
+
+    assert first == again == "summary #1"
+    assert other == "summary #2"
+
+
+def test_near_duplicate_queries_share_an_llm_summary(monkeypatch):
+    calls = []
+
+    def _fake(query, snippets):
+        calls.append(query)
+        return f"llm summary #{len(calls)}", True
+
+    monkeypatch.setattr(Responder, "generate_summary", staticmethod(_fake))
+    responder = Responder()
+
+    def _summarize(code, message, severity="High"):
+        query, snippets = responder.compose(code, "Payments", severity, message, ["Call the issuer"], [])
+        return responder.summarize(query, snippets, category="Payments", severity=severity, error_code=code)
+
+    first = _summarize("DO_NOT_HONOR_05", "card ending 4242 declined at 10:32 ref 8f2a91c3 for $1,200.50")
+    # Only the amount, time, card digits and ref differ: the exact tier
+    # misses, the semantic tier answers
+    again = _summarize("DO_NOT_HONOR_05", "card ending 1881 declined at 11:05 ref 77b0e1d4 for $19.99")
+    assert first == again == "llm summary #1"
+    assert responder.semantic_cache.hits == 1 and len(responder.summary_cache) == 2
+    # A verbatim repeat is an exact hit
+    assert _summarize("DO_NOT_HONOR_05", "card ending 1881 declined at 11:05 ref 77b0e1d4 for $19.99") == first
+    assert responder.semantic_cache.hits == 1
+
+    # Same code, unrelated message: its own answer
+    assert _summarize("DO_NOT_HONOR_05", "issuer unreachable, retry the authorization later") == "llm summary #2"
+    # Another provider code normalizes alike but must get its own answer
+    assert _summarize("DO_NOT_HONOR_51", "card ending 1881 declined at 11:05 ref 77b0e1d4 for $19.99") == "llm summary #3"
+    assert _summarize("DO_NOT_HONOR_05", "card declined", severity="Low") == "llm summary #4"
+    assert responder.semantic_cache.hits == 1
+
+
+def test_fallback_summaries_are_not_cached(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    responder = Responder()  # no API key: fallback only
+
+    def _summarize(message):
+        query, snippets = responder.compose("DO_NOT_HONOR", "Payments", "High", message, ["Call bank"], [])
+        return responder.summarize(query, snippets, category="Payments", severity="High", error_code="DO_NOT_HONOR")
+
+    assert "alice@x.com" in _summarize("customer alice@x.com card declined")
+    # Same code and snippets: the fallback must quote this request, not the last one
+    second = _summarize("customer bob@y.com card declined")
+    assert "bob@y.com" in second and "alice@x.com" not in second
+    assert len(responder.summary_cache) == 0 and len(responder.semantic_cache) == 0
+
+
+def test_semantic_cache_expires_and_evicts():
+    now = [0.0]
+    cache = SemanticCache(threshold=0.9, maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put("gateway down 503", "a", "one")
+    cache.put("card expired", "a", "two")
+    assert cache.get("gateway down 503", "b") is None  # other scope
+    assert cache.get("gateway down 503", "a") == "one"
+    cache.put("invalid cvv", "a", "three")  # evicts "card expired", the least recently used
+    assert cache.get("card expired", "a") is None and cache.evictions == 1
+    now[0] = 11
+    assert cache.get("gateway down 503", "a") is None
+    cache.put("card expired", "a", "four")  # frees the expired rows
+    assert len(cache) == 1 and (cache.hits, cache.misses) == (1, 3)
+
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+class _SlowCompletions:
+    def __init__(self, delay, tracker):
+        self.delay = delay
+        self.tracker = tracker
+
+    async def create(self, **kwargs):
+        self.tracker["active"] += 1
+        self.tracker["peak"] = max(self.tracker["peak"], self.tracker["active"])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.tracker["active"] -= 1
+        message = SimpleNamespace(content="llm answer")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _fake_client(delay, tracker):
+    return SimpleNamespace(chat=SimpleNamespace(completions=_SlowCompletions(delay, tracker)))
+
+
+def test_async_llm_calls_are_capped():
+    tracker = {"active": 0, "peak": 0}
+    responder = Responder()
+    responder.llm_max_concurrency = 2
+    responder._async_client = _fake_client(0.01, tracker)
+
+    async def _run():
+        await responder.startup()
+        return await asyncio.gather(*(responder.agenerate_response("q", []) for _ in range(6)))
+
+    answers = asyncio.run(_run())
+    assert answers == ["llm answer"] * 6
+    assert tracker["peak"] == 2
+
+
+def test_async_deadline_falls_back():
+    responder = Responder()
+    responder.llm_timeout = 0.01
+    responder._async_client = _fake_client(1.0, {"active": 0, "peak": 0})
+
+    answer = asyncio.run(responder.agenerate_response("q", ["Suggested Steps:\n- Check card"]))
+    assert answer == Responder._fallback_response("q", ["Suggested Steps:\n- Check card"])
+
+
+def test_failed_llm_call_is_not_cached():
+    responder = Responder()
+    responder.llm_timeout = 0.01
+    responder._async_client = _fake_client(1.0, {"active": 0, "peak": 0})
+    query, snippets = responder.compose("DO_NOT_HONOR", "Payments", "High", "issuer declined", ["Call bank"], [])
+
+    def _summarize():
+        return asyncio.run(
+            responder.asummarize(query, snippets, category="Payments", severity="High", error_code="DO_NOT_HONOR")
+        )
+
+    assert _summarize() == Responder._fallback_response(query, snippets)
+    assert len(responder.summary_cache) == 0
+    # The upstream recovers: the next request reaches the LLM
+    responder.llm_timeout = 1.0
+    responder._async_client = _fake_client(0.0, {"active": 0, "peak": 0})
+    assert _summarize() == "llm answer"
+    assert len(responder.summary_cache) == 1
+
+
+def test_concurrent_identical_summaries_share_one_call():
+    tracker = {"active": 0, "peak": 0}
+    responder = Responder()
+    responder._async_client = _fake_client(0.05, tracker)
+    query, snippets = responder.compose("DO_NOT_HONOR", "Payments", "High", "issuer declined", ["Call bank"], [])
+
+    async def _run():
+        return await asyncio.gather(
+            *(
+                responder.asummarize(
+                    query if i % 2 else query.upper(),
+                    snippets,
+                    category="Payments",
+                    severity="High",
+                    error_code="DO_NOT_HONOR",
+                )
+                for i in range(50)
+            )
+        )
+
+    answers = asyncio.run(_run())
+    assert set(answers) == {"llm answer"}
+    assert responder._flights.leaders == 1
+    assert responder._flights.coalesced == 49
+    assert len(responder._flights) == 0
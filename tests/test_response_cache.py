@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+from httpx import AsyncClient, ASGITransport
+
+from src.api.main import app, response_cache, snapshots
+from src.api.response_cache import ResponseCache, normalize, signature
+from src.core.cache import ByteLRUCache
+
+
+def _post(*payloads):
+    async def _call():
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            return [await ac.post("/support/diagnose", json=p) for p in payloads]
+
+    return asyncio.run(_call())
+
+
+def test_signature_ignores_volatile_fragments():
+    a = "card ending 4242 declined at 10:32 ref 8f2a91c3 for $1,200.50"
+    b = "card ending 1881 declined at 11:05 ref 77b0e1d4 for $19.99"
+    assert normalize(a) == "card <card> declined at <ts> <ref> for <amount>"
+    assert normalize(a, loose=False) == "card <card> declined at <ts> ref 8f2a91c3 for <amount>"
+    assert signature("DO_NOT_HONOR", a.replace(" ref 8f2a91c3", ""), "") == signature(
+        "DO_NOT_HONOR", b.replace(" ref 77b0e1d4", ""), ""
+    )
+    # HTTP statuses and codes are part of the signature
+    assert signature("AUTH", "HTTP 401", "") != signature("AUTH", "HTTP 404", "")
+    assert signature("DO_NOT_HONOR", a, "") != signature("do_not_honor", a, "")
+    assert signature("X", "", "") != signature("X", " ", "")
+
+
+def test_hit_serves_cached_bytes_with_own_message():
+    response_cache.entries.clear()
+    first, second = _post(
+        {"error_code": "CARD_EXPIRED", "message": "card expired at 10:32 for $12.50"},
+        {"error_code": "CARD_EXPIRED", "message": "card expired at 11:05 for $9.99"},
+    )
+    assert first.status_code == second.status_code == 200
+    assert response_cache.entries.hits >= 1
+    a, b = first.json(), second.json()
+    assert "11:05 for $9.99" in b["raw_notes"] and "10:32" not in b["raw_notes"]
+    assert {**a, "raw_notes": None} == {**b, "raw_notes": None}
+    assert b["classification"] == {"category": "Payments", "confidence": 1.0, "source": "rules"}
+    assert b["assistant_summary"] is None  # same shape as the validated response model
+    assert b["guidance"] == {
+        "user_message": "Your card has expired. Please update the card and try again.",
+        "action_type": "request_new_card",
+        "can_autofix": False,
+        "severity": "medium",
+    }
+
+
+def test_signature_keeps_what_classification_reads():
+    response_cache.entries.clear()
+    hits = response_cache.entries.hits
+    auth, routing, first, second = _post(
+        {"error_code": "UPSTREAM", "message": "upstream request 401"},
+        {"error_code": "UPSTREAM", "message": "upstream request 404"},
+        {"error_code": "X_UNKNOWN", "message": "response_code=GW20000051 declined"},
+        {"error_code": "X_UNKNOWN", "message": "response_code=GW30000099 declined"},
+    )
+    # The loose form merges both pairs; the response cache must not
+    assert normalize("upstream request 401") == normalize("upstream request 404")
+    assert response_cache.entries.hits == hits
+    assert auth.json()["classification"]["category"] == "Auth"
+    assert routing.json()["classification"]["category"] == "Routing"
+    assert "gateway_code:GW20000051" in first.json()["signals"]
+    assert "gateway_code:GW30000099" in second.json()["signals"]
+    assert "gateway_code:GW20000051" not in second.json()["signals"]
+
+
+def test_snapshot_reload_invalidates():
+    _post({"error_code": "CARD_EXPIRED", "message": "card expired"})
+    assert len(response_cache.entries) > 0
+    before = response_cache.invalidations
+    snapshots.reload(force=True)
+    (resp,) = _post({"error_code": "CARD_EXPIRED", "message": "card expired"})
+    assert resp.status_code == 200
+    assert response_cache.invalidations == before + 1
+    assert response_cache.version == snapshots.current().version
+
+
+def test_stale_snapshot_does_not_write():
+    cache = ResponseCache(max_bytes=1 << 20)
+    cache.put("k", 2, b'{"a":1}', {})
+    assert cache.get("k", 1) is None
+    cache.put("j", 1, b'{"a":2}', {})
+    assert cache.version == 2 and cache.get("j", 2) is None
+    assert json.loads(cache.get("k", 2).render("")) == {"a": 1}
+
+
+def test_byte_budget_evicts_lru():
+    cache = ByteLRUCache(max_bytes=10, ttl=60)
+    assert cache.set("a", b"xxxx") and cache.set("b", b"yyyy")
+    cache.get("a")
+    assert cache.set("c", b"zzzz")
+    assert cache.get("b") is None and cache.get("a") == b"xxxx"
+    assert cache.nbytes == 8 and cache.evictions == 1
+    assert not cache.set("big", b"x" * 11)
@@ -0,0 +1,209 @@
+import json
+import pickle
+import sys
+
+import numpy as np
+
+from src.rag.backends import NumpyFlatBackend, write_faiss_flat
+from src.rag.bm25 import BM25Index
+from src.rag.embeddings import HashingEmbedder
+from src.rag.quantized import QuantizedBackend, RowTable, write_quantized
+from src.rag.retriever import RAG
+from src.rag.vector_index import VectorIndex
+
+_CHUNKS = [
+    ("outage#0", "Gateway down: service unavailable, HTTP 503 from the provider. Stop retries."),
+    ("funds#0", "Insufficient funds: the bank declined because the balance is too low."),
+    ("autopay#0", "AutoPay eligibility requires account age of 90 days and no NSF."),
+    ("cvv#0", "Invalid CVV: security code mismatch, ask the customer to re-enter it."),
+]
+
+
+def _write_index(tmp_path):
+    embedder = HashingEmbedder(dim=128)
+    chunks = [
+        {"doc_id": cid.split("#")[0], "source": f"kb/{cid.split('#')[0]}.md", "chunk_id": cid, "text": text}
+        for cid, text in _CHUNKS
+    ]
+    np.save(tmp_path / "embeddings.npy", embedder.encode(c["text"] for c in chunks))
+    (tmp_path / "chunks.json").write_text(json.dumps(chunks), encoding="utf-8")
+    (tmp_path / "meta.json").write_text(
+        json.dumps({"model": embedder.name, "dim": embedder.dim, "normalized": True}), encoding="utf-8"
+    )
+    return tmp_path
+
+
+def test_embedder_is_deterministic_and_normalized():
+    a = HashingEmbedder(dim=64).encode_one("CARD_EXPIRED card expired")
+    b = HashingEmbedder(dim=64).encode_one("CARD_EXPIRED card expired")
+    assert np.array_equal(a, b)
+    assert abs(float(np.linalg.norm(a)) - 1.0) < 1e-5
+
+
+def test_search_ranks_relevant_chunk_first(tmp_path):
+    index = VectorIndex.load(_write_index(tmp_path))
+
+    hits = index.search("INSUFFICIENT_FUNDS balance too low", k=2)
+    assert [h["chunk_id"] for h in hits][:1] == ["funds#0"]
+    assert len(hits) == 2
+    assert hits[0]["score"] >= hits[1]["score"]
+
+    batched = index.search_many(["INSUFFICIENT_FUNDS balance too low", "invalid cvv"], k=2)
+    assert batched[0] == hits
+    assert batched[1][0]["chunk_id"] == "cvv#0"
+
+
+def test_retriever_appends_chunk_refs(tmp_path):
+    rag = RAG(vector_dir=str(_write_index(tmp_path)))
+    playbook = rag.retrieve_playbook("GATEWAY_DOWN", "Payments", "service unavailable 503")
+    assert playbook.refs[-1] == "kb/outage.md#0"
+    assert playbook.steps == rag.playbook["Payments"]["steps"]
+    assert rag.retrieve_many([("GATEWAY_DOWN", "Payments", "service unavailable 503")]) == [playbook]
+
+
+def test_faiss_file_served_without_faiss(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "faiss", None)  # import faiss -> ImportError
+    embedder = HashingEmbedder(dim=128)
+    chunks = [{"chunk_id": cid, "doc_id": cid.split("#")[0], "source": f"kb/{cid}"} for cid, _ in _CHUNKS]
+    write_faiss_flat(tmp_path / "kb_index.faiss", embedder.encode(t for _, t in _CHUNKS), metric="l2")
+    with open(tmp_path / "kb_meta.pkl", "wb") as f:
+        pickle.dump({"model": embedder.name, "dim": embedder.dim, "chunks": chunks}, f)
+
+    index = VectorIndex.load_faiss(tmp_path / "kb_index.faiss")
+    assert isinstance(index.backend, NumpyFlatBackend)
+    hits = index.search("invalid cvv security code", k=3)
+    assert hits[0]["chunk_id"] == "cvv#0"
+    # L2 distances are reported back as cosine similarities
+    assert 0.0 < hits[0]["score"] <= 1.0
+
+    rag = RAG(kb_index=str(tmp_path / "kb_index.faiss"), lazy=True)
+    assert rag._vector_index is None
+    assert rag.search("invalid cvv security code")[0]["chunk_id"] == "cvv#0"
+
+
+def test_quantized_store_matches_float32(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(2000, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[:20] + 0.3 * rng.normal(size=(20, 64)).astype(np.float32)
+    rows = [{"chunk_id": f"c{i}"} for i in range(len(vectors))]
+    rows[7] = None
+    exact_scores, exact_ids = NumpyFlatBackend(vectors).search(queries, 5)
+
+    for dtype, ratio in (("int8", 0.27), ("float16", 0.5)):
+        write_quantized(tmp_path / "kb.qvec", vectors, rows, "hashing-tf", dtype=dtype)
+        index = VectorIndex.load_quantized(tmp_path / "kb.qvec", rescore=vectors)
+        assert isinstance(index.chunks, RowTable) and index.chunks[7] is None and index.chunks[8] == {"chunk_id": "c8"}
+        assert index.backend.nbytes <= ratio * vectors.nbytes
+
+        approx = QuantizedBackend(index.backend.codes, index.backend.scales)
+        scores, ids = approx.search(queries, 5)
+        assert np.mean(ids[:, 0] == exact_ids[:, 0]) >= 0.95
+        assert np.abs(scores - exact_scores).max() < 0.02
+        # float32 re-scoring of the candidates gives back the exact ranking
+        scores, ids = index.backend.search(queries, 5)
+        assert np.array_equal(ids, exact_ids) and np.allclose(scores, exact_scores, atol=1e-6)
+
+
+def test_retriever_prefers_quantized_store_without_faiss(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "faiss", None)
+    embedder = HashingEmbedder(dim=128)
+    chunks = [{"chunk_id": cid, "doc_id": cid.split("#")[0], "source": f"kb/{cid}"} for cid, _ in _CHUNKS]
+    vectors = embedder.encode(t for _, t in _CHUNKS)
+    write_faiss_flat(tmp_path / "kb_index.faiss", vectors)
+    with open(tmp_path / "kb_meta.pkl", "wb") as f:
+        pickle.dump({"model": embedder.name, "dim": embedder.dim, "chunks": chunks}, f)
+    write_quantized(tmp_path / "kb_index.qvec", vectors, chunks, embedder.name)
+
+    rag = RAG(kb_index=str(tmp_path / "kb_index.faiss"))
+    assert isinstance(rag.vector_index.backend, QuantizedBackend)
+    assert rag.search("invalid cvv security code")[0]["chunk_id"] == "cvv#0"
+
+    monkeypatch.setenv("RAG_INDEX_BACKEND", "numpy")
+    assert isinstance(RAG(kb_index=str(tmp_path / "kb_index.faiss")).vector_index.backend, NumpyFlatBackend)
+
+
+def test_bm25_matches_exact_gateway_tokens():
+    texts = [
+        "Issuer returned DO_NOT_HONOR; ask the customer to call the bank.",
+        "Do not retry honor-system payments twice.",
+        "HTTP 503 from the gateway means an outage.",
+    ]
+    bm25 = BM25Index.build(enumerate(texts), len(texts) + 1)  # last row: tombstone
+    scores, rows = bm25.search("DO_NOT_HONOR", k=3)
+    assert rows[0] == 0
+    assert bm25.search("503", k=3)[1].tolist() == [2]
+    assert bm25.search("nothing matches", k=3)[1].tolist() == []
+
+
+def test_hybrid_search_fuses_lexical_hits(tmp_path, monkeypatch):
+    index_dir = _write_index(tmp_path)
+    texts = [t for _, t in _CHUNKS]
+    BM25Index.build(enumerate(texts), len(texts)).save(index_dir / "bm25.npz")
+
+    monkeypatch.setenv("RAG_LEXICAL_WEIGHT", "1.0")
+    rag = RAG(vector_dir=str(index_dir))
+    assert rag.bm25 is not None
+    hits = rag.search("503")
+    assert hits[0]["chunk_id"] == "outage#0"
+    assert hits[0]["bm25_score"] > 0
+
+    monkeypatch.setenv("RAG_LEXICAL_WEIGHT", "0")
+    vector_only = RAG(vector_dir=str(index_dir)).search("503")
+    assert all("bm25_score" not in h for h in vector_only)
+
+
+def _playbook_sources(tmp_path):
+    csv_path = tmp_path / "mappings.csv"
+    csv_path.write_text(
+        "provider_code,category,user_message,agent_steps,severity,can_autofix,action_type\n"
+        'CARD_EXPIRED,PAYMENT_METHOD_ERROR,"Card expired.","1) Confirm expiry;2) Update card",medium,false,request_new_card\n'
+        "LIMIT_EXCEEDED,LIMIT_EXCEEDED,Too high.,,low,false,suggest_alternative\n",
+        encoding="utf-8",
+    )
+    md_path = tmp_path / "playbooks.md"
+    md_path.write_text("# Playbooks\n\n## LIMIT_EXCEEDED / OVER_LIMIT\n1. Check thresholds.\n2. Offer ACH.\n", encoding="utf-8")
+    knowledge = tmp_path / "knowledge"
+    knowledge.mkdir()
+    (knowledge / "payments_steps.txt").write_text("Verify method.\n", encoding="utf-8")
+    return csv_path, md_path, knowledge
+
+
+def test_playbook_store_fallback_chain(tmp_path):
+    from src.rag.playbooks import PlaybookStore
+
+    store = PlaybookStore.build(*_playbook_sources(tmp_path))
+    refs, steps, guidance = store.resolve("card_expired", "Payments")
+    assert steps == ["Confirm expiry", "Update card"]
+    assert refs == store.categories["Payments"]["refs"]
+    assert guidance == {
+        "user_message": "Card expired.", "action_type": "request_new_card", "can_autofix": False, "severity": "medium"
+    }
+    # code without its own steps -> its label's section in the playbooks markdown
+    assert store.resolve("LIMIT_EXCEEDED", "Payments")[1] == ["Check thresholds.", "Offer ACH."]
+    assert store.sections["OVER_LIMIT"] == store.sections["LIMIT_EXCEEDED"]
+    # unknown code -> category (knowledge file) -> General
+    assert store.resolve("NOPE", "Payments")[1] == ["Verify method."]
+    assert store.resolve("NOPE", "Unknown") == (
+        store.categories["General"]["refs"], store.categories["General"]["steps"], None
+    )
+    assert store.codes["CARD_EXPIRED"]["action_type"] == "request_new_card"
+
+
+def test_playbook_store_artifact_round_trip(tmp_path):
+    import os
+
+    from src.rag.playbooks import PlaybookStore
+
+    csv_path, md_path, knowledge = _playbook_sources(tmp_path)
+    artifact = tmp_path / "playbooks.pkl"
+    PlaybookStore.build(csv_path, md_path, knowledge).save(artifact)
+
+    store = PlaybookStore.open(artifact, csv_path, md_path, knowledge)
+    assert store.resolve("CARD_EXPIRED", "Payments")[1] == ["Confirm expiry", "Update card"]
+
+    # A source newer than the artifact is read directly instead
+    csv_path.write_text("provider_code,category,agent_steps\nCARD_EXPIRED,X,1) New step\n", encoding="utf-8")
+    later = artifact.stat().st_mtime_ns + 10**9
+    os.utime(csv_path, ns=(later, later))
+    assert PlaybookStore.open(artifact, csv_path, md_path, knowledge).resolve("CARD_EXPIRED", "Payments")[1] == ["New step"]
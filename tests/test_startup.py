@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from src.api.startup import build_bundle, bundle_sources, load_bundle, save_bundle
+from src.rag.playbooks import PlaybookStore
+
+ROOT = Path(__file__).resolve().parents[1]
+# Cumulative import time of src.api.main in lazy startup mode; generous so a
+# loaded CI box passes, tight enough to catch a heavy SDK creeping back in.
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+HEAVY_MODULES = ("openai", "httpx", "numpy", "sklearn", "pandas", "joblib")
+
+
+def _importtime(module):
+    env = {**os.environ, "LAZY_STARTUP": "1", "OPENAI_API_KEY": ""}
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    # "import time: self [us] | cumulative | imported package"
+    times = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e3
+    return times
+
+
+def test_lazy_startup_import_budget():
+    times = _importtime("src.api.main")
+    loaded = sorted(m for m in HEAVY_MODULES if m in times)
+    assert loaded == [], f"imported at startup: {loaded}"
+    assert times["src.api.main"] <= IMPORT_BUDGET_MS, f"src.api.main took {times['src.api.main']:.0f} ms"
+
+
+def test_bundle_matches_sources(tmp_path):
+    path = tmp_path / "startup.pkl"
+    save_bundle(build_bundle(), path)
+    bundle = load_bundle(path, bundle_sources())
+
+    assert bundle["rules"]["Payments"]["severity"] == "High"
+    store = PlaybookStore(**bundle["playbooks"])
+    assert store.resolve("DO_NOT_HONOR", "Payments") == PlaybookStore.build(
+        ROOT / "src" / "mappings.csv", ROOT / "agent_playbooks.md", ROOT / "knowledge"
+    ).resolve("DO_NOT_HONOR", "Payments")
+    assert bundle["index"]
+
+
+def test_stale_bundle_is_ignored(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text('{"General": {"match_any": [], "severity": "Low", "signals": []}}', encoding="utf-8")
+    path = tmp_path / "startup.pkl"
+    save_bundle(build_bundle(rules_path=rules), path)
+    assert load_bundle(path, [rules]) is not None
+
+    st = path.stat()
+    os.utime(rules, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert load_bundle(path, [rules]) is None
+    assert load_bundle(tmp_path / "missing.pkl", [rules]) is None
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+import src.api.main as api
+from src.api.main import app, responder
+from src.rag.responder import Responder
+
+
+@pytest.fixture(autouse=True)
+def _fresh_semantic_cache():
+    # The random E_xxxxxxxx codes normalize alike, so one test's LLM answer
+    # would be a near-duplicate hit in the next.
+    responder.semantic_cache.clear()
+
+
+def _events(body):
+    out = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def _stream(payload):
+    async def _call():
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            return await ac.post("/support/diagnose/with-summary/stream", json=payload)
+
+    return asyncio.run(_call())
+
+
+class _FakeStream:
+    def __init__(self, pieces, stall_after=None):
+        self.pieces = list(pieces)
+        self.stall_after = stall_after
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.stall_after is not None and not self.pieces:
+            await asyncio.sleep(60)
+        if not self.pieces:
+            raise StopAsyncIteration
+        text = self.pieces.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    async def close(self):
+        self.closed = True
+
+
+def _fake_client(stream):
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_diagnosis_is_the_first_event():
+    resp = _stream({"error_code": "CARD_EXPIRED", "message": "card expired"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _events(resp.text)
+    kind, diagnosis = events[0]
+    assert kind == "diagnosis"
+    assert diagnosis["category"] == "Payments" and diagnosis["suggested_steps"]
+    assert {k for k, _ in events[1:-1]} == {"token"}
+    kind, done = events[-1]
+    assert kind == "done" and done["fallback"] is None
+    assert done["assistant_summary"] == "".join(d["text"] for k, d in events[1:-1]).strip()
+
+
+def test_tokens_stream_from_the_llm(monkeypatch):
+    stream = _FakeStream(["Check ", "the ", "card."])
+    monkeypatch.setattr(responder, "_get_async_client", lambda: _fake_client(stream))
+    events = _events(_stream({"error_code": f"E_{uuid.uuid4().hex[:8]}", "message": "x"}).text)
+    assert [d["text"] for k, d in events if k == "token"] == ["Check ", "the ", "card."]
+    assert events[-1][1] == {"assistant_summary": "Check the card.", "fallback": None}
+
+
+def test_stall_switches_to_fallback(monkeypatch):
+    stream = _FakeStream(["Partial "], stall_after=1)
+    monkeypatch.setattr(responder, "_get_async_client", lambda: _fake_client(stream))
+    monkeypatch.setattr(responder, "llm_stall_timeout", 0.05)
+    stalled = responder.llm_outcomes["stalled"]
+
+    events = _events(_stream({"error_code": f"E_{uuid.uuid4().hex[:8]}", "message": "x"}).text)
+    kinds = [k for k, _ in events]
+    assert kinds[:3] == ["diagnosis", "token", "fallback"]
+    assert events[2][1] == {"reason": "stalled"}
+    done = events[-1][1]
+    assert done["fallback"] == "stalled"
+    assert done["assistant_summary"].startswith("Summary for:") and "Partial" not in done["assistant_summary"]
+    assert stream.closed and responder.llm_outcomes["stalled"] == stalled + 1
+
+
+def test_pieces_round_trip():
+    text = "Summary for: x\n\n- one\n- two"
+    assert "".join(Responder._pieces(text)) == text
+
+
+def test_diagnosis_runs_off_the_event_loop(monkeypatch):
+    threads = []
+    real = api._diagnose_for_summary
+
+    def _recording(req, request):
+        threads.append(threading.current_thread())
+        return real(req, request)
+
+    monkeypatch.setattr(api, "_diagnose_for_summary", _recording)
+    assert _stream({"error_code": "CARD_EXPIRED", "message": "card expired"}).status_code == 200
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pandas as pd
+
+from src.ml.augment import build_training_frame, load_training_examples
+from src.ml import train_ml
+from src.ml.train_ml import select_config, sweep
+
+CSV_PATH = Path(__file__).resolve().parents[1] / "src" / "mappings.csv"
+
+
+def test_augmentation_is_seeded():
+    a = load_training_examples(str(CSV_PATH), seed=7)
+    assert a == load_training_examples(str(CSV_PATH), seed=7)
+    assert a != load_training_examples(str(CSV_PATH), seed=8)
+
+
+def test_augmentation_variants():
+    df = pd.DataFrame([{
+        "provider_code": "DO_NOT_HONOR",
+        "category": "FRAUD_OR_BANK_DECLINE",
+        "user_message": "Bank  declined\tthe charge.",
+        "regex_hint": "do.*not.*honor",
+    }])
+    texts = list(build_training_frame(df, seed=1)["text"])
+    assert texts[:2] == ["Bank declined the charge.", "BANK DECLINED THE CHARGE."]
+    # typo variant drops exactly one character
+    assert len(texts[2]) == len(texts[0]) - 1
+    assert "Error DO_NOT_HONOR: Bank declined the charge." in texts
+    assert "do not honor" in texts
+
+
+def test_sweep_reports_every_config():
+    data = load_training_examples(str(CSV_PATH))
+    texts = [d["text"] for d in data]
+    labels = [d["label"] for d in data]
+    grid = {"ngram_range": [(1, 1), (1, 2)], "max_features": [500], "C": [0.5, 2.0]}
+
+    report, pipelines = sweep(texts, labels, texts, labels, grid=grid, n_jobs=1)
+
+    assert len(report) == len(pipelines) == 4
+    assert report[0]["accuracy"] == max(r["accuracy"] for r in report)
+    best = report[0]
+    pipe = pipelines[(tuple(best["ngram_range"]), best["max_features"], best["C"])]
+    assert abs(pipe.score(texts, labels) - best["accuracy"]) < 1e-4
+    # One vectorizer per (ngram_range, max_features), shared by every C
+    assert pipelines[((1, 1), 500, 0.5)].steps[0][1] is pipelines[((1, 1), 500, 2.0)].steps[0][1]
+
+
+def test_sweep_winner_is_chosen_without_the_test_set(monkeypatch):
+    texts = [f"text {i}" for i in range(50)]
+    labels = ["a", "b"] * 25
+    seen = []
+
+    def _sweep(X_fit, y_fit, X_val, y_val, **kwargs):
+        seen.extend(X_fit + X_val)
+        return [{"ngram_range": [1, 2], "max_features": 500, "C": 0.5}], {}
+
+    monkeypatch.setattr(train_ml, "sweep", _sweep)
+    config, _ = select_config(texts[:40], labels[:40], n_jobs=1)
+    assert config == {"ngram_range": (1, 2), "max_features": 500, "C": 0.5}
+    assert sorted(seen) == sorted(texts[:40])